@@ -0,0 +1,86 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.core import entitlements
+from .tokens import ENTITLEMENT_CLAIM, VERSION_CLAIM, auth_state, load_user
+
+
+def _parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication que carga usuario, compañía, suscripción y plan desde cache."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('El token no identifica a un usuario')
+        user = load_user(user_id)
+        if user is None:
+            raise AuthenticationFailed('Usuario no encontrado', code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed('Usuario inactivo', code='user_inactive')
+        return user
+
+
+class EntitlementJWTAuthentication(CachedJWTAuthentication):
+    """JWT que, si el token trae claims de entitlements, arma el usuario sin leer la base.
+
+    Los tokens sin claims se resuelven como en `CachedJWTAuthentication`. Solo se consulta
+    la versión de autorización del usuario, que vive en el cache compartido.
+    """
+
+    def get_user(self, validated_token):
+        if not validated_token.get(ENTITLEMENT_CLAIM):
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('El token no identifica a un usuario')
+
+        state = auth_state(user_id)
+        if state is None:
+            raise AuthenticationFailed('Usuario no encontrado', code='user_not_found')
+        version, is_active = state
+        if not is_active:
+            raise AuthenticationFailed('Usuario inactivo', code='user_inactive')
+        if validated_token.get(VERSION_CLAIM) != version:
+            raise AuthenticationFailed('El token está desactualizado, solicita uno nuevo', code='token_stale')
+        return self.build_user(validated_token, user_id)
+
+    def build_user(self, token, user_id):
+        User = get_user_model()
+        user = User(
+            id=user_id,
+            username=token.get('username', ''),
+            email=token.get('email', ''),
+            role=token.get('role'),
+            company_id=token.get('company_id'),
+            is_active=True,
+            auth_version=token.get(VERSION_CLAIM),
+        )
+        user._state.adding = False
+        user._state.db = User.objects.db
+        user.from_token_claims = True
+        if user.role != User.ROLE_SUPER_ADMIN and user.company_id:
+            codes = token.get('features') or []
+            bits = {code: 1 << index for index, code in enumerate(codes)}
+            snapshot = entitlements.Entitlements(
+                company_id=user.company_id,
+                has_subscription=token.get('sub_status') is not None,
+                start_date=_parse_date(token.get('sub_start')),
+                end_date=_parse_date(token.get('sub_end')),
+                status=token.get('sub_status'),
+                plan_code=token.get('plan'),
+                plan_branch_limit=token.get('branch_limit'),
+                feature_mask=(1 << len(codes)) - 1,
+                feature_bits=bits,
+            )
+            user._entitlements_snapshot = (entitlements._generation, snapshot)
+        return user
@@ -0,0 +1,11 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .tokens import load_user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend que resuelve el usuario de la sesión desde el cache compartido."""
+
+    def get_user(self, user_id):
+        user = load_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
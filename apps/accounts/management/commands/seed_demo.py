@@ -17,6 +17,7 @@ from apps.inventory.models import (
     PurchaseItem,
     Supplier,
 )
+from apps.inventory.supplier_stats import rebuild_supplier_stats
 from apps.sales.models import CartItem, Order, OrderItem, Sale, SaleItem
 
 
@@ -475,6 +476,7 @@ class Command(BaseCommand):
             PurchaseItem.objects.bulk_create(purchase_items)
         if movements:
             InventoryMovement.objects.bulk_create(movements)
+        rebuild_supplier_stats(company.id)
 
     def _create_sales(self, company, branches, products, inventory_cache, seller, options):
         rng = random.Random(901)
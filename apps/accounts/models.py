@@ -21,13 +21,35 @@ class User(AbstractUser):
     rut = models.CharField(max_length=20, validators=[validate_rut])
     company = models.ForeignKey(Company, null=True, blank=True, on_delete=models.SET_NULL, related_name='users')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Versión de autorización: los JWT con claims la incluyen y se rechazan si cambia.
+    auth_version = models.PositiveIntegerField(default=1, editable=False)
 
     REQUIRED_FIELDS = ['email', 'rut']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_auth_state = instance._auth_state()
+        return instance
+
+    def _auth_state(self):
+        if 'role' not in self.__dict__ or 'company_id' not in self.__dict__:
+            return None
+        return (self.role, self.company_id)
+
     def save(self, *args, **kwargs):
+        if getattr(self, 'from_token_claims', False):
+            raise ValueError('Un usuario construido desde un token no puede guardarse')
         if self.role == self.ROLE_SUPER_ADMIN:
             self.company = None
+        loaded = getattr(self, '_loaded_auth_state', None)
+        if loaded is not None and loaded != self._auth_state():
+            self.auth_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'auth_version'}
         super().save(*args, **kwargs)
+        self._loaded_auth_state = self._auth_state()
 
     def __str__(self):
         return self.username
@@ -0,0 +1,50 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.models import Company, Plan, PlanFeature, Subscription
+from .models import User
+from .tokens import bump_auth_version, forget_auth_state
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_auth_state([instance.pk])
+
+
+@receiver(post_save, sender=Company)
+def company_changed(sender, instance, created, **kwargs):
+    if not created:
+        forget_auth_state(User.objects.filter(company=instance).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def subscription_changed(sender, instance, **kwargs):
+    bump_auth_version(User.objects.filter(company_id=instance.company_id))
+
+
+@receiver(post_save, sender=Plan)
+def plan_changed(sender, instance, created, **kwargs):
+    if not created:
+        bump_auth_version(User.objects.filter(company__subscription__plan=instance))
+
+
+@receiver(m2m_changed, sender=Plan.features.through)
+def plan_features_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in {'post_add', 'post_remove', 'post_clear'}:
+        return
+    if not reverse:
+        users = User.objects.filter(company__subscription__plan=instance)
+    elif pk_set:
+        users = User.objects.filter(company__subscription__plan_id__in=pk_set)
+    else:
+        users = User.objects.exclude(company=None)
+    bump_auth_version(users)
+
+
+@receiver(post_save, sender=PlanFeature)
+@receiver(post_delete, sender=PlanFeature)
+def plan_feature_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        bump_auth_version(User.objects.exclude(company__subscription=None))
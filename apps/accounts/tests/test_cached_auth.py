@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.accounts.tokens import load_user
+from apps.core.models import Company, Plan, Subscription
+
+User = get_user_model()
+
+
+class CachedUserLoadingTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        self.plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        Subscription.objects.create(
+            company=self.company,
+            plan=self.plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+
+    def _user_queries(self, queries):
+        return [q for q in queries if 'FROM "accounts_user" WHERE' in q['sql']]
+
+    def test_user_is_loaded_with_subscription_and_plan(self):
+        load_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = load_user(self.user.pk)
+            self.assertEqual(user.company.subscription.plan.code, 'PRUEBA')
+
+    def test_user_save_invalidates_cached_user(self):
+        load_user(self.user.pk)
+        self.user.first_name = 'Gabriela'
+        self.user.save()
+        self.assertEqual(load_user(self.user.pk).first_name, 'Gabriela')
+
+    def test_jwt_requests_reuse_cached_user(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        client.get(reverse('user-me'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(reverse('user-me'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._user_queries(ctx.captured_queries), [])
+
+    def test_session_requests_reuse_cached_user(self):
+        self.client.login(username='gerente', password='pass1234')
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._user_queries(ctx.captured_queries), [])
+
+    def test_sessions_from_previous_backend_stay_logged_in(self):
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user, self.user)
@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.accounts.tokens import EntitlementRefreshToken
+from apps.core.models import Company, Plan, PlanFeature, Subscription
+from apps.reports.cache import clear_report_caches
+
+User = get_user_model()
+
+
+class EntitlementTokenTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        self.reports, _ = PlanFeature.objects.get_or_create(code='reports', defaults={'label': 'Reportes'})
+        self.plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        self.plan.features.add(self.reports)
+        Subscription.objects.create(
+            company=self.company,
+            plan=self.plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.client = APIClient()
+
+    def _authenticate(self):
+        token = EntitlementRefreshToken.for_user(User.objects.get(pk=self.user.pk))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+        return token
+
+    def test_access_token_carries_entitlement_claims(self):
+        access = self._authenticate().access_token
+        self.assertEqual(access['role'], User.ROLE_GERENTE)
+        self.assertEqual(access['company_id'], self.company.id)
+        self.assertIn('reports', access['features'])
+        self.assertEqual(access['sub_end'], (date.today() + timedelta(days=30)).isoformat())
+
+    def test_report_permission_is_resolved_without_user_queries(self):
+        self._authenticate()
+        self.client.get(reverse('report-stock'))  # calienta el estado de autorización en cache
+        clear_report_caches()
+        with self.assertNumQueries(1):  # solo la consulta del propio reporte
+            response = self.client.get(reverse('report-stock'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_is_rejected_after_role_change(self):
+        self._authenticate()
+        user = User.objects.get(pk=self.user.pk)
+        user.role = User.ROLE_VENDEDOR
+        user.save()
+        response = self.client.get(reverse('report-stock'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_token_is_rejected_after_plan_change(self):
+        self._authenticate()
+        self.plan.features.remove(self.reports)
+        response = self.client.get(reverse('report-stock'))
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(JWT_ENTITLEMENT_CLAIMS=True)
+    def test_session_token_view_issues_claims_when_enabled(self):
+        self.client.force_authenticate(user=None)
+        self.client.login(username='gerente', password='pass1234')
+        response = self.client.post(reverse('token-session'))
+        self.assertEqual(response.status_code, 200)
+        self.client.logout()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get(reverse('user-me')).data['username'], 'gerente')
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.core.entitlements import get_entitlements
+
+ENTITLEMENT_CLAIM = 'ent'
+VERSION_CLAIM = 'ver'
+
+
+def _cache():
+    return caches[getattr(settings, 'ENTITLEMENTS_CACHE_ALIAS', 'default')]
+
+
+def _auth_state_key(user_id) -> str:
+    return f'auth:user:{user_id}:state'
+
+
+def _user_key(user_id) -> str:
+    return f'auth:user:{user_id}:object'
+
+
+def load_user(user_id):
+    """Usuario con compañía, suscripción y plan en una consulta, cacheado brevemente por id."""
+    cache = _cache()
+    key = _user_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = (
+            get_user_model()
+            .objects.select_related('company__subscription__plan')
+            .filter(pk=user_id)
+            .first()
+        )
+        if user is None:
+            return None
+        cache.set(key, user, timeout=getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+    return user
+
+
+def auth_state(user_id):
+    """Devuelve `(auth_version, is_active)` del usuario desde cache, o None si no existe."""
+    cache = _cache()
+    key = _auth_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        row = get_user_model().objects.filter(pk=user_id).values_list('auth_version', 'is_active').first()
+        if row is None:
+            return None
+        state = tuple(row)
+        cache.set(key, state, timeout=getattr(settings, 'ENTITLEMENTS_CACHE_TIMEOUT', 300))
+    return state
+
+
+def forget_auth_state(user_ids):
+    """Descarta la versión de autorización y el usuario cacheado de cada id."""
+    keys = [key for user_id in user_ids for key in (_auth_state_key(user_id), _user_key(user_id))]
+    if not keys:
+        return
+    _cache().delete_many(keys)
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def bump_auth_version(users):
+    """Invalida los tokens con claims emitidos para los usuarios del queryset."""
+    user_ids = list(users.values_list('id', flat=True))
+    if not user_ids:
+        return
+    get_user_model().objects.filter(id__in=user_ids).update(auth_version=F('auth_version') + 1)
+    forget_auth_state(user_ids)
+
+
+class EntitlementRefreshToken(RefreshToken):
+    """Refresh token cuyo access incluye rol, compañía y entitlements del plan."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        entitlements = get_entitlements(user)
+        token[ENTITLEMENT_CLAIM] = 1
+        token[VERSION_CLAIM] = user.auth_version
+        token['username'] = user.username
+        token['email'] = user.email
+        token['role'] = user.role
+        token['company_id'] = user.company_id
+        token['plan'] = entitlements.plan_code
+        token['features'] = sorted(entitlements.features)
+        token['branch_limit'] = entitlements.plan_branch_limit
+        token['sub_status'] = entitlements.status
+        token['sub_start'] = entitlements.start_date.isoformat() if entitlements.start_date else None
+        token['sub_end'] = entitlements.end_date.isoformat() if entitlements.end_date else None
+        return token
+
+
+class EntitlementTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = EntitlementRefreshToken
+
+
+def token_for_user(user) -> RefreshToken:
+    """Emite el par de tokens según `JWT_ENTITLEMENT_CLAIMS`."""
+    if getattr(settings, 'JWT_ENTITLEMENT_CLAIMS', False):
+        return EntitlementRefreshToken.for_user(user)
+    return RefreshToken.for_user(user)
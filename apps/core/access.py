@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Iterable
 
-from django.contrib.auth import get_user_model
+from django.db.models import F, Q
+from django.utils import timezone
 
-User = get_user_model()
+from .entitlements import feature_bits, get_entitlements
 
-# Mapeo de funcionalidades por plan. Las claves deben existir como PlanFeature.code.
+# Mapeo de funcionalidades por plan. Las claves deben existir como PlanFeature.code;
+# se compila a la máscara de bits de cada PlanFeature al cargar los entitlements.
 DEFAULT_PLAN_MATRIX = {
     'BASICO': {'inventory', 'sales', 'orders', 'pos', 'user_management'},
     'ESTANDAR': {'inventory', 'sales', 'orders', 'pos', 'reports', 'user_management'},
@@ -17,24 +18,7 @@ DEFAULT_PLAN_MATRIX = {
 
 def plan_allows(user, feature_code: str) -> bool:
     """Evalúa si el usuario puede acceder a una funcionalidad según su plan y rol."""
-    if not user or not getattr(user, 'is_authenticated', False):
-        return False
-    if getattr(user, 'role', None) == getattr(user, 'ROLE_SUPER_ADMIN', 'super_admin'):
-        return True
-
-    company = getattr(user, 'company', None)
-    subscription = getattr(company, 'subscription', None) if company else None
-    if not subscription or not subscription.is_active:
-        return False
-    plan = getattr(subscription, 'plan', None)
-    if not plan:
-        return False
-    if hasattr(plan, 'has_feature') and plan.has_feature(feature_code):
-        return True
-
-    # fallback para planes iniciales basados en código
-    feature_set: Iterable[str] = DEFAULT_PLAN_MATRIX.get(plan.code, set())
-    return feature_code in feature_set
+    return get_entitlements(user).allows(feature_code)
 
 
 def plan_window_active(subscription) -> bool:
@@ -42,3 +26,27 @@ def plan_window_active(subscription) -> bool:
         return False
     today = date.today()
     return subscription.start_date <= today <= subscription.end_date and subscription.status == subscription.STATUS_ACTIVE
+
+
+def companies_with_feature(feature_code: str, queryset=None):
+    """Compañías con suscripción vigente que habilita la funcionalidad, con las reglas de `Entitlements.allows`.
+
+    La funcionalidad puede venir de la máscara desnormalizada o del respaldo de DEFAULT_PLAN_MATRIX.
+    """
+    from .models import Company, Subscription
+
+    queryset = Company.objects.all() if queryset is None else queryset
+    bit = feature_bits().get(feature_code)
+    if not bit:
+        return queryset.none()
+    today = timezone.now().date()
+    matrix_plans = [code for code, features in DEFAULT_PLAN_MATRIX.items() if feature_code in features]
+    return queryset.alias(
+        _feature_bit=F('subscription__feature_mask').bitand(bit),
+    ).filter(
+        Q(_feature_bit=bit) | Q(subscription__plan__code__in=matrix_plans),
+        subscription__status=Subscription.STATUS_ACTIVE,
+        subscription__start_date__lte=today,
+        subscription__end_date__gte=today,
+        subscription__plan__isnull=False,
+    )
@@ -1,6 +1,28 @@
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def warn_if_local_cache():
+    """Avisa si producción usa un cache por proceso: con varios workers las invalidaciones no se comparten."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if not settings.DEBUG and backend.endswith('LocMemCache'):
+        logger.error(
+            'CACHES usa LocMemCache con DEBUG=0: cada worker tiene su propio cache y no ve las invalidaciones '
+            'de los demás (entitlements, tokens, reportes, locks). Configura CACHE_BACKEND con un backend compartido.'
+        )
+        return True
+    return False
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        warn_if_local_cache()
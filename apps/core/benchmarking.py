@@ -0,0 +1,45 @@
+"""Utilidades compartidas por los comandos `bench_*`."""
+from __future__ import annotations
+
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .models import Company, Plan, PlanFeature, Subscription
+
+
+def measure(fn, iterations: int) -> dict:
+    """Ejecuta `fn` `iterations` veces y devuelve operaciones por segundo y latencia media."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    return {
+        'iterations': iterations,
+        'ops_per_sec': iterations / elapsed if elapsed else float('inf'),
+        'mean_us': elapsed / iterations * 1_000_000 if iterations else 0,
+    }
+
+
+def create_bench_tenant(plan_code: str = 'PREMIUM', role: str | None = None):
+    """Crea una compañía con suscripción activa y un usuario para pruebas de carga."""
+    User = get_user_model()
+    suffix = uuid.uuid4().hex[:8]
+    company = Company.objects.create(name=f'Bench {suffix}', rut=f'bench-{suffix}')
+    plan, created = Plan.objects.get_or_create(code=plan_code, defaults={'name': plan_code.title()})
+    if created:
+        plan.features.set(PlanFeature.objects.all())
+    today = timezone.now().date()
+    Subscription.objects.create(company=company, plan=plan, start_date=today, end_date=today + timedelta(days=30))
+    user = User.objects.create_user(
+        username=f'bench-{suffix}',
+        email=f'bench-{suffix}@example.com',
+        password=None,
+        rut='11111111-1',
+        role=role or User.ROLE_GERENTE,
+        company=company,
+    )
+    return company, user
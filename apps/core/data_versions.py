@@ -0,0 +1,84 @@
+"""Versión de los datos de cada compañía, para caches de resultados derivados (reportes).
+
+Las escrituras de inventario, ventas y compras renuevan la versión al confirmar su
+transacción, una sola vez por compañía aunque la transacción toque muchas filas. Quien
+guarde resultados los indexa por versión, así que nunca hace falta borrarlos: una versión
+nueva simplemente deja de encontrar los anteriores.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def _cache():
+    return caches[getattr(settings, 'DATA_VERSION_CACHE_ALIAS', 'default')]
+
+
+def _key(company_id) -> str:
+    return f'data:company:{company_id}:version'
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12], int(time.time())
+
+
+def data_version(company_id) -> tuple[str, int]:
+    """`(versión opaca, timestamp del último cambio en segundos)` de la compañía."""
+    cache = _cache()
+    key = _key(company_id)
+    current = cache.get(key)
+    if current is None:
+        current = _new_version()
+        if not cache.add(key, current, timeout=None):
+            current = cache.get(key, current)
+    return current
+
+
+# Renovación pendiente por compañía en este hilo (cada hilo usa su propia conexión).
+_pending = threading.local()
+
+
+class _Bump:
+    """Renovación pendiente de una compañía; se ejecuta una sola vez."""
+
+    def __init__(self, company_id):
+        self.company_id = company_id
+        self.done = False
+
+    def __call__(self):
+        if not self.done:
+            self.done = True
+            if _pending_bumps().get(self.company_id) is self:
+                del _pending_bumps()[self.company_id]
+            _cache().set(_key(self.company_id), _new_version(), timeout=None)
+
+
+def _pending_bumps() -> dict:
+    if not hasattr(_pending, 'bumps'):
+        _pending.bumps = {}
+    return _pending.bumps
+
+
+def bump_data_version(company_id):
+    """Renueva la versión de la compañía al confirmar la transacción (de inmediato sin transacción).
+
+    Una venta guarda varias filas y registra movimientos; todos los avisos de la compañía
+    agendan la misma renovación, así el commit escribe una vez en el cache.
+    """
+    if not company_id:
+        return
+    if not transaction.get_connection().in_atomic_block:
+        _Bump(company_id)()
+        return
+    bump = _pending_bumps().get(company_id)
+    if bump is None or bump.done:
+        bump = _pending_bumps()[company_id] = _Bump(company_id)
+    # Se agenda en cada aviso: si un savepoint se revierte, otro registro sobrevive. Si la
+    # transacción completa se revierte, la renovación sigue pendiente y la reutiliza la siguiente.
+    transaction.on_commit(bump)
@@ -0,0 +1,36 @@
+"""Filtros por día sobre DateTimeField que aprovechan índices."""
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def as_date(value) -> date | None:
+    """Acepta `date` o texto `AAAA-MM-DD`; lanza `ValueError` si el texto es inválido."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def day_start(day: date) -> datetime:
+    """Primer instante del día en la zona horaria actual."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_days(qs, field, date_from=None, date_to=None):
+    """Filtra `field` con el rango semiabierto [date_from 00:00, date_to + 1 día 00:00).
+
+    A diferencia de `field__date__gte/lte`, no convierte cada fila a fecha local, por lo
+    que la base puede usar los índices sobre `field`.
+    """
+    date_from, date_to = as_date(date_from), as_date(date_to)
+    if date_from:
+        qs = qs.filter(**{f'{field}__gte': day_start(date_from)})
+    if date_to:
+        qs = qs.filter(**{f'{field}__lt': day_start(date_to + timedelta(days=1))})
+    return qs
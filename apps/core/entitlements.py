@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PlanFeature, Subscription
+
+# Generación local de entitlements: se incrementa cuando cambian planes,
+# funcionalidades o suscripciones para descartar snapshots ya memorizados.
+_generation = 0
+
+
+@dataclass(frozen=True)
+class Entitlements:
+    """Snapshot de la suscripción y plan de una compañía, construido una vez por request."""
+
+    company_id: int | None = None
+    has_subscription: bool = False
+    start_date: date | None = None
+    end_date: date | None = None
+    status: str | None = None
+    plan_code: str | None = None
+    plan_branch_limit: int | None = None
+    feature_mask: int = 0
+    feature_bits: dict = field(default_factory=dict, compare=False, repr=False)
+    unrestricted: bool = False
+
+    @property
+    def is_active(self) -> bool:
+        if self.unrestricted:
+            return True
+        if not self.has_subscription or self.status != Subscription.STATUS_ACTIVE:
+            return False
+        today = timezone.now().date()
+        return self.start_date <= today <= self.end_date
+
+    @property
+    def branch_limit(self):
+        if not self.is_active or not self.plan_code:
+            return 0
+        return self.plan_branch_limit
+
+    @property
+    def features(self) -> frozenset:
+        return frozenset(code for code, bit in self.feature_bits.items() if self.feature_mask & bit)
+
+    def allows(self, feature_code: str) -> bool:
+        if self.unrestricted:
+            return True
+        if not self.is_active or not self.plan_code:
+            return False
+        return bool(self.feature_mask & self.feature_bits.get(feature_code, 0))
+
+
+NO_ENTITLEMENTS = Entitlements()
+SUPER_ADMIN_ENTITLEMENTS = Entitlements(unrestricted=True)
+
+
+PLANS_VERSION_KEY = 'entitlements:plans:version'
+
+
+def _cache():
+    return caches[getattr(settings, 'ENTITLEMENTS_CACHE_ALIAS', 'default')]
+
+
+def _company_version_key(company_id) -> str:
+    return f'entitlements:company:{company_id}:version'
+
+
+def _new_version() -> str:
+    # Versiones opacas: si la llave se pierde del cache nunca se reutiliza un valor anterior.
+    return uuid.uuid4().hex[:12]
+
+
+def _version(cache, key, current=None):
+    if current is None:
+        current = _new_version()
+        if not cache.add(key, current, timeout=None):
+            current = cache.get(key, current)
+    return current
+
+
+_feature_bits = (None, {})
+
+
+def feature_bits(plans_version=None) -> dict:
+    """Mapa código -> máscara de cada PlanFeature, memorizado por versión del catálogo."""
+    global _feature_bits
+    if plans_version is None:
+        cache = _cache()
+        plans_version = _version(cache, PLANS_VERSION_KEY, cache.get(PLANS_VERSION_KEY))
+    if _feature_bits[0] != plans_version:
+        rows = PlanFeature.objects.exclude(bit=None).values_list('code', 'bit')
+        _feature_bits = (plans_version, {code: 1 << bit for code, bit in rows})
+    return _feature_bits[1]
+
+
+def plan_code_mask(plan_code, bits) -> int:
+    """Máscara de respaldo de DEFAULT_PLAN_MATRIX para los planes iniciales."""
+    from .access import DEFAULT_PLAN_MATRIX
+
+    mask = 0
+    for code in DEFAULT_PLAN_MATRIX.get(plan_code, ()):
+        mask |= bits.get(code, 0)
+    return mask
+
+
+def load_entitlements(user) -> Entitlements:
+    """Resuelve el snapshot del usuario; el de su compañía se toma del cache compartido."""
+    if not user or not getattr(user, 'is_authenticated', False):
+        return NO_ENTITLEMENTS
+    if getattr(user, 'role', None) == getattr(user, 'ROLE_SUPER_ADMIN', 'super_admin'):
+        return SUPER_ADMIN_ENTITLEMENTS
+    company_id = getattr(user, 'company_id', None)
+    if not company_id:
+        return NO_ENTITLEMENTS
+    return company_entitlements(company_id)
+
+
+def load_company_entitlements(company_id, bits=None) -> Entitlements:
+    """Carga suscripción, plan y máscara de funcionalidades en una sola consulta."""
+    row = (
+        Subscription.objects.filter(company_id=company_id)
+        .values_list('start_date', 'end_date', 'status', 'plan__code', 'plan__branch_limit', 'feature_mask')
+        .first()
+    )
+    if row is None:
+        return Entitlements(company_id=company_id)
+    if bits is None:
+        bits = feature_bits()
+    start_date, end_date, status, plan_code, branch_limit, mask = row
+    return Entitlements(
+        company_id=company_id,
+        has_subscription=True,
+        start_date=start_date,
+        end_date=end_date,
+        status=status,
+        plan_code=plan_code,
+        plan_branch_limit=branch_limit,
+        feature_mask=mask | plan_code_mask(plan_code, bits),
+        feature_bits=bits,
+    )
+
+
+def company_entitlements(company_id) -> Entitlements:
+    """Entitlements de la compañía desde el cache versionado, cargándolos si no están."""
+    cache = _cache()
+    company_key = _company_version_key(company_id)
+    versions = cache.get_many([PLANS_VERSION_KEY, company_key])
+    plans_version = _version(cache, PLANS_VERSION_KEY, versions.get(PLANS_VERSION_KEY))
+    company_version = _version(cache, company_key, versions.get(company_key))
+
+    entry_key = f'entitlements:company:{company_id}:{plans_version}:{company_version}'
+    snapshot = cache.get(entry_key)
+    if snapshot is None:
+        snapshot = load_company_entitlements(company_id, feature_bits(plans_version))
+        cache.set(entry_key, snapshot, timeout=getattr(settings, 'ENTITLEMENTS_CACHE_TIMEOUT', 300))
+    return snapshot
+
+
+def get_entitlements(user) -> Entitlements:
+    """Devuelve el snapshot memorizado en la instancia del usuario (una por request)."""
+    if not user or not getattr(user, 'is_authenticated', False):
+        return NO_ENTITLEMENTS
+    cached = getattr(user, '_entitlements_snapshot', None)
+    if cached is not None and cached[0] == _generation and cached[1].company_id == getattr(user, 'company_id', None):
+        return cached[1]
+    snapshot = load_entitlements(user)
+    setattr(user, '_entitlements_snapshot', (_generation, snapshot))
+    return snapshot
+
+
+def invalidate_entitlements(company_id=None):
+    """Invalida los entitlements de una compañía o, sin compañía, los de todos los planes.
+
+    La versión se renueva de inmediato y otra vez al confirmar la transacción, para
+    que otro worker no deje en cache datos leídos antes del commit.
+    """
+    key = _company_version_key(company_id) if company_id else PLANS_VERSION_KEY
+
+    def bump():
+        global _generation
+        _generation += 1
+        _cache().set(key, _new_version(), timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
@@ -0,0 +1,59 @@
+import copy
+
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils.functional import SimpleLazyObject
+
+from apps.accounts.models import User
+from apps.core.access import plan_allows
+from apps.core.benchmarking import create_bench_tenant, measure
+from apps.core.entitlements import get_entitlements, invalidate_entitlements
+from apps.inventory.web_views import _guard_role
+
+
+class Command(BaseCommand):
+    help = 'Mide plan_allows y _guard_role con el cache de entitlements frío y caliente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with transaction.atomic():
+            company, user = create_bench_tenant()
+            factory = RequestFactory()
+
+            def fresh_user():
+                # Cada request carga su propia instancia del usuario.
+                clone = copy.copy(user)
+                clone.__dict__.pop('_entitlements_snapshot', None)
+                return clone
+
+            def check_plan(cold):
+                if cold:
+                    invalidate_entitlements(company.id)
+                plan_allows(fresh_user(), 'reports')
+
+            def guard(cold):
+                if cold:
+                    invalidate_entitlements(company.id)
+                request = factory.get('/reports/stock/')
+                request.user = fresh_user()
+                request.entitlements = SimpleLazyObject(lambda: get_entitlements(request.user))
+                request._messages = CookieStorage(request)
+                _guard_role(request, {User.ROLE_ADMIN_CLIENTE, User.ROLE_GERENTE}, required_feature='reports')
+
+            for label, fn in (('plan_allows', check_plan), ('_guard_role', guard)):
+                for cold in (True, False):
+                    fn(cold)  # calentamiento
+                    with CaptureQueriesContext(connection) as ctx:
+                        result = measure(lambda: fn(cold), iterations)
+                    self.stdout.write(
+                        f"{label:<12} cache={'frío' if cold else 'caliente':<8} "
+                        f"{result['ops_per_sec']:>10.0f} ops/s {result['mean_us']:>8.1f} µs/op "
+                        f"{len(ctx.captured_queries) / iterations:.2f} consultas/op"
+                    )
+            transaction.set_rollback(True)
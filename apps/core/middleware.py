@@ -0,0 +1,37 @@
+from django.utils.functional import SimpleLazyObject
+
+from .entitlements import get_entitlements
+from .transactions import current_view
+
+
+class EntitlementsMiddleware:
+    """Expone `request.entitlements`, evaluado a lo más una vez por request.
+
+    Se resuelve de forma perezosa para que en la API se use el usuario ya
+    autenticado por DRF (JWT) y no el usuario anónimo de la sesión.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.entitlements = SimpleLazyObject(lambda: get_entitlements(request.user))
+        return self.get_response(request)
+
+
+class RetryViewMiddleware:
+    """Asocia los reintentos de transacciones a la vista que atiende el request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_view.set('')
+        try:
+            return self.get_response(request)
+        finally:
+            current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        current_view.set(match.view_name if match and match.view_name else view_func.__name__)
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:13
+
+from django.db import migrations, models
+
+
+def compile_feature_masks(apps, schema_editor):
+    PlanFeature = apps.get_model('core', 'PlanFeature')
+    Plan = apps.get_model('core', 'Plan')
+    Subscription = apps.get_model('core', 'Subscription')
+
+    for bit, feature in enumerate(PlanFeature.objects.order_by('id')):
+        feature.bit = bit
+        feature.save(update_fields=['bit'])
+    for plan in Plan.objects.all():
+        mask = 0
+        for bit in plan.features.values_list('bit', flat=True):
+            mask |= 1 << bit
+        Plan.objects.filter(pk=plan.pk).update(feature_mask=mask)
+        Subscription.objects.filter(plan=plan).update(feature_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_planfeature_remove_subscription_active_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='feature_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='planfeature',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='feature_mask',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(compile_feature_masks, migrations.RunPython.noop),
+    ]
@@ -37,6 +37,8 @@ class Subscription(models.Model):
     end_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
     canceled_at = models.DateTimeField(null=True, blank=True)
+    # Copia desnormalizada de Plan.feature_mask para filtrar compañías sin unir tablas.
+    feature_mask = models.BigIntegerField(default=0, editable=False, db_index=True)
 
     def __str__(self):
         plan_name = self.plan.name if self.plan else 'Sin plan'
@@ -55,6 +57,17 @@ class Subscription(models.Model):
             return 0
         return self.plan.branch_limit
 
+    def save(self, *args, **kwargs):
+        self.feature_mask = (
+            Plan.objects.filter(pk=self.plan_id).values_list('feature_mask', flat=True).first() or 0
+            if self.plan_id
+            else 0
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'plan' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'feature_mask'}
+        super().save(*args, **kwargs)
+
     def reports_enabled(self):
         return bool(self.is_active and self.plan and self.plan.has_feature('reports'))
 
@@ -66,9 +79,12 @@ class Subscription(models.Model):
 
 
 class PlanFeature(models.Model):
+    MAX_BITS = 63
+
     code = models.CharField(max_length=50, unique=True)
     label = models.CharField(max_length=100)
     description = models.TextField(blank=True)
+    bit = models.PositiveSmallIntegerField(unique=True, null=True, editable=False)
 
     class Meta:
         ordering = ['code']
@@ -76,6 +92,19 @@ class PlanFeature(models.Model):
     def __str__(self):
         return self.label
 
+    @property
+    def mask(self) -> int:
+        return 1 << self.bit if self.bit is not None else 0
+
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            used = set(PlanFeature.objects.exclude(bit=None).values_list('bit', flat=True))
+            free = [bit for bit in range(self.MAX_BITS) if bit not in used]
+            if not free:
+                raise ValueError('No quedan bits disponibles para nuevas funcionalidades')
+            self.bit = free[0]
+        super().save(*args, **kwargs)
+
 
 class Plan(models.Model):
     code = models.CharField(max_length=20, unique=True)
@@ -84,6 +113,7 @@ class Plan(models.Model):
     monthly_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     branch_limit = models.PositiveIntegerField(null=True, blank=True, help_text='Límite de sucursales (vacío para ilimitado)')
     features = models.ManyToManyField(PlanFeature, related_name='plans', blank=True)
+    feature_mask = models.BigIntegerField(default=0, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -95,4 +125,16 @@ class Plan(models.Model):
         return self.name
 
     def has_feature(self, code: str) -> bool:
-        return self.features.filter(code=code).exists()
+        from .entitlements import feature_bits
+
+        return bool(self.feature_mask & feature_bits().get(code, 0))
+
+    def sync_feature_mask(self) -> int:
+        """Recalcula la máscara desde `features` y la propaga a las suscripciones del plan."""
+        mask = 0
+        for bit in self.features.exclude(bit=None).values_list('bit', flat=True):
+            mask |= 1 << bit
+        self.feature_mask = mask
+        Plan.objects.filter(pk=self.pk).update(feature_mask=mask)
+        Subscription.objects.filter(plan=self).update(feature_mask=mask)
+        return mask
@@ -0,0 +1,103 @@
+"""Paginación por llave (keyset) para la API y las páginas HTML.
+
+Ninguno de los dos modos ejecuta `COUNT(*)` ni `OFFSET`: cada página filtra a partir de la
+última fila vista sobre columnas indexadas, por lo que una página profunda cuesta lo mismo
+que la primera.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.pagination import CursorPagination
+
+
+def _page_size(value, default):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, settings.LIST_MAX_PAGE_SIZE))
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor opaco sobre `cursor_ordering` de la vista (`id` si no lo define).
+
+    El cursor de DRF guarda solo el valor del primer campo y desempata con un offset, así
+    que ese campo debe ser único o casi único (`id`, `created_at`); `?page_size=` ajusta el
+    tamaño hasta `LIST_MAX_PAGE_SIZE`.
+    """
+
+    page_size_query_param = 'page_size'
+    ordering = 'id'
+
+    def get_page_size(self, request):
+        return _page_size(request.query_params.get(self.page_size_query_param), settings.LIST_PAGE_SIZE)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', self.ordering)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: int | None
+    previous_cursor: int | None
+
+
+def _flip(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def _after(ordering, values):
+    """Filas que van después de `values` en `ordering`."""
+    condition, equal = Q(), Q()
+    for field in ordering:
+        name = field.lstrip('-')
+        lookup = f'{name}__lt' if field.startswith('-') else f'{name}__gt'
+        condition |= equal & Q(**{lookup: values[name]})
+        equal &= Q(**{name: values[name]})
+    return condition
+
+
+def keyset_page(queryset, ordering, after=None, before=None, size=None):
+    """Página de `queryset` en `ordering` que sigue a la fila `after` o precede a la fila `before`.
+
+    Los cursores son el id de la fila límite; `ordering` debe terminar en `id` (o `-id`).
+    """
+    size = size or settings.LIST_PAGE_SIZE
+    ordering = tuple(ordering)
+    cursor = before or after
+    values = None
+    if cursor:
+        names = [field.lstrip('-') for field in ordering]
+        values = queryset.filter(pk=cursor).values(*names).first()
+    backwards = bool(before) and values is not None
+    if backwards:
+        ordering = tuple(_flip(field) for field in ordering)
+    if values is not None:
+        queryset = queryset.filter(_after(ordering, values))
+    rows = list(queryset.order_by(*ordering)[:size + 1])
+    more = len(rows) > size
+    rows = rows[:size]
+    if backwards:
+        rows.reverse()
+        return KeysetPage(rows, rows[-1].pk if rows else None, rows[0].pk if more and rows else None)
+    return KeysetPage(rows, rows[-1].pk if more else None, rows[0].pk if values is not None and rows else None)
+
+
+def _cursor(value):
+    return int(value) if value and value.isdigit() else None
+
+
+def paginate_keyset(request, queryset, ordering):
+    """`keyset_page` con `after`, `before` y `page_size` tomados del querystring."""
+    return keyset_page(
+        queryset,
+        ordering,
+        after=_cursor(request.GET.get('after')),
+        before=_cursor(request.GET.get('before')),
+        size=_page_size(request.GET.get('page_size'), settings.LIST_PAGE_SIZE),
+    )
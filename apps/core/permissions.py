@@ -16,4 +16,7 @@ class IsSuperAdmin(BasePermission):
 
 class CompanyPlanAllowsReports(BasePermission):
     def has_permission(self, request, view):
+        entitlements = getattr(request, 'entitlements', None)
+        if entitlements is not None:
+            return entitlements.allows('reports')
         return plan_allows(request.user, 'reports')
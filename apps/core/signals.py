@@ -0,0 +1,47 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .entitlements import invalidate_entitlements
+from .models import Plan, PlanFeature, Subscription
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+@receiver(post_save, sender=PlanFeature)
+def plans_changed(sender, **kwargs):
+    invalidate_entitlements()
+
+
+@receiver(m2m_changed, sender=Plan.features.through)
+def plan_features_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_plan_ids = list(instance.plans.values_list('id', flat=True))
+        return
+    if action not in {'post_add', 'post_remove', 'post_clear'}:
+        return
+    if not reverse:
+        instance.sync_feature_mask()
+    else:
+        plan_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_plan_ids', [])
+        for plan in Plan.objects.filter(pk__in=plan_ids):
+            plan.sync_feature_mask()
+    invalidate_entitlements()
+
+
+@receiver(pre_delete, sender=PlanFeature)
+def plan_feature_deleting(sender, instance, **kwargs):
+    instance._affected_plan_ids = list(instance.plans.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=PlanFeature)
+def plan_feature_deleted(sender, instance, **kwargs):
+    # El borrado en cascada de la tabla intermedia no emite m2m_changed.
+    for plan in Plan.objects.filter(pk__in=getattr(instance, '_affected_plan_ids', [])):
+        plan.sync_feature_mask()
+    invalidate_entitlements()
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def subscription_changed(sender, instance, **kwargs):
+    invalidate_entitlements(instance.company_id)
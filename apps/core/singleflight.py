@@ -0,0 +1,87 @@
+"""Coalescencia de cálculos costosos entre requests y workers (single-flight).
+
+El primer request que necesita una llave toma un lock con `cache.add` y calcula; los
+demás reciben el valor anterior si lo tienen o esperan hasta `SINGLE_FLIGHT_WAIT`
+segundos a que el resultado se publique en el cache compartido. Si el plazo vence
+calculan por su cuenta, así que el lock nunca bloquea una respuesta indefinidamente.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+POLL_INTERVAL = 0.05
+_MISSING = object()
+
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+
+def _count(label, key):
+    with _stats_lock:
+        _stats[label][key] += 1
+
+
+def single_flight_stats() -> dict:
+    """Cálculos, esperas coalescidas, valores anteriores servidos y esperas vencidas por etiqueta."""
+    with _stats_lock:
+        return {label: dict(counter) for label, counter in _stats.items()}
+
+
+def reset_single_flight_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _cache():
+    return caches[getattr(settings, 'SINGLE_FLIGHT_CACHE_ALIAS', 'default')]
+
+
+def lock_key(label, key) -> str:
+    return f'singleflight:{label}:{key}:lock'
+
+
+def single_flight(label, key, compute, stale=None):
+    """Devuelve `compute()` calculándolo una sola vez a la vez por `(label, key)`.
+
+    Con `stale` los requests concurrentes lo reciben de inmediato en vez de esperar.
+    """
+    cache = _cache()
+    lock, result_key = lock_key(label, key), f'singleflight:{label}:{key}:result'
+    deadline = time.monotonic() + getattr(settings, 'SINGLE_FLIGHT_WAIT', 2.0)
+    token = uuid.uuid4().hex
+    waited = False
+    while True:
+        if cache.add(lock, token, timeout=getattr(settings, 'SINGLE_FLIGHT_LOCK_TIMEOUT', 30)):
+            # Quien esperaba puede tomar el lock justo después de que otro publicó su resultado.
+            value = cache.get(result_key, _MISSING) if waited else _MISSING
+            if value is not _MISSING:
+                cache.delete(lock)
+                _count(label, 'coalesced')
+                return value
+            _count(label, 'computed')
+            cache.delete(result_key)
+            try:
+                value = compute()
+                cache.set(result_key, value, timeout=getattr(settings, 'SINGLE_FLIGHT_RESULT_TTL', 30))
+                return value
+            finally:
+                if cache.get(lock) == token:
+                    cache.delete(lock)
+        if stale is not None:
+            _count(label, 'stale')
+            return stale
+        value = cache.get(result_key, _MISSING)
+        if value is not _MISSING:
+            _count(label, 'coalesced')
+            return value
+        if time.monotonic() >= deadline:
+            _count(label, 'timeouts')
+            return compute()
+        waited = True
+        time.sleep(POLL_INTERVAL)
@@ -0,0 +1,13 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def keyset_query(context, direction, cursor):
+    """Querystring actual con el cursor `after` o `before` reemplazado."""
+    params = context['request'].GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    params[direction] = cursor
+    return f'?{params.urlencode()}'
@@ -7,5 +7,8 @@ register = template.Library()
 
 @register.simple_tag(takes_context=True)
 def plan_allows_feature(context, feature_code):
-    user = context['user']
-    return plan_allows(user, feature_code)
+    request = context.get('request')
+    entitlements = getattr(request, 'entitlements', None)
+    if entitlements is not None:
+        return entitlements.allows(feature_code)
+    return plan_allows(context['user'], feature_code)
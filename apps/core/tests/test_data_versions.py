@@ -0,0 +1,30 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+
+from apps.core.data_versions import bump_data_version, data_version
+
+
+class DataVersionTests(TestCase):
+    def test_one_bump_per_company_per_transaction(self):
+        before = data_version(1)
+        with mock.patch('apps.core.data_versions._new_version', wraps=lambda: ('nueva', 0)) as new_version:
+            with self.captureOnCommitCallbacks(execute=True):
+                bump_data_version(1)
+                bump_data_version(1)
+                bump_data_version(2)
+        self.assertEqual(new_version.call_count, 2)
+        self.assertNotEqual(data_version(1), before)
+
+    def test_bump_survives_rolled_back_savepoint(self):
+        before = data_version(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    bump_data_version(1)
+                    raise ValueError
+            except ValueError:
+                pass
+            bump_data_version(1)
+        self.assertNotEqual(data_version(1), before)
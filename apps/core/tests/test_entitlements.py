@@ -0,0 +1,147 @@
+import tempfile
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.core.access import companies_with_feature, plan_allows
+from apps.core.apps import warn_if_local_cache
+from apps.core.entitlements import company_entitlements
+from apps.core.models import Company, Plan, PlanFeature, Subscription
+
+User = get_user_model()
+
+
+class EntitlementSnapshotTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        reports, _ = PlanFeature.objects.get_or_create(code='reports', defaults={'label': 'Reportes'})
+        inventory, _ = PlanFeature.objects.get_or_create(code='inventory', defaults={'label': 'Inventario'})
+        self.plan, _ = Plan.objects.get_or_create(code='PRUEBA', defaults={'name': 'Prueba', 'branch_limit': 2})
+        self.plan.features.set([reports, inventory])
+        self.subscription = Subscription.objects.create(
+            company=self.company,
+            plan=self.plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+
+    def _subscription_queries(self, queries):
+        return [q for q in queries if 'FROM "core_subscription"' in q['sql']]
+
+    def test_snapshot_is_loaded_once_per_user_instance(self):
+        user = User.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(plan_allows(user, 'reports'))
+            self.assertTrue(plan_allows(user, 'inventory'))
+            self.assertFalse(plan_allows(user, 'pos'))
+        self.assertEqual(len(self._subscription_queries(ctx.captured_queries)), 1)
+
+    def test_snapshot_is_refreshed_when_plan_changes(self):
+        user = User.objects.get(pk=self.user.pk)
+        self.assertTrue(plan_allows(user, 'reports'))
+        self.plan.features.remove(PlanFeature.objects.get(code='reports'))
+        self.assertFalse(plan_allows(user, 'reports'))
+
+    def test_page_render_runs_single_entitlement_query(self):
+        self.client.login(username='gerente', password='pass1234')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('report_stock'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self._subscription_queries(ctx.captured_queries)), 1)
+
+
+class EntitlementCacheTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        self.reports, _ = PlanFeature.objects.get_or_create(code='reports', defaults={'label': 'Reportes'})
+        self.plan, _ = Plan.objects.get_or_create(code='PRUEBA', defaults={'name': 'Prueba', 'branch_limit': 2})
+        self.plan.features.set([self.reports])
+        self.subscription = Subscription.objects.create(
+            company=self.company,
+            plan=self.plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+
+    def _assert_invalidation_cycle(self):
+        self.assertTrue(company_entitlements(self.company.id).allows('reports'))
+        with self.assertNumQueries(0):
+            self.assertTrue(company_entitlements(self.company.id).allows('reports'))
+
+        self.subscription.cancel()
+        self.assertFalse(company_entitlements(self.company.id).allows('reports'))
+
+        self.subscription.status = Subscription.STATUS_ACTIVE
+        self.subscription.save()
+        self.plan.features.remove(self.reports)
+        self.assertFalse(company_entitlements(self.company.id).allows('reports'))
+
+        self.reports.plans.add(self.plan)
+        self.assertTrue(company_entitlements(self.company.id).allows('reports'))
+
+    def test_locmem_cache_is_invalidated_by_signals(self):
+        self._assert_invalidation_cycle()
+
+    def test_file_based_cache_is_invalidated_by_signals(self):
+        with tempfile.TemporaryDirectory() as location:
+            caches = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+            with override_settings(CACHES=caches):
+                self._assert_invalidation_cycle()
+
+    def test_local_cache_is_reported_outside_debug(self):
+        with override_settings(DEBUG=False), self.assertLogs('apps.core.apps', level='ERROR'):
+            self.assertTrue(warn_if_local_cache())
+        file_cache = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/x'}}
+        with override_settings(DEBUG=False, CACHES=file_cache):
+            self.assertFalse(warn_if_local_cache())
+
+
+class FeatureMaskTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        self.reports, _ = PlanFeature.objects.get_or_create(code='reports', defaults={'label': 'Reportes'})
+        self.plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        self.subscription = Subscription.objects.create(
+            company=self.company,
+            plan=self.plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+
+    def test_new_features_get_a_free_bit(self):
+        feature = PlanFeature.objects.create(code='exports', label='Exportaciones')
+        self.assertIsNotNone(feature.bit)
+        used = PlanFeature.objects.exclude(pk=feature.pk).values_list('bit', flat=True)
+        self.assertNotIn(feature.bit, used)
+
+    def test_masks_follow_plan_features(self):
+        self.plan.features.add(self.reports)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.feature_mask, self.reports.mask)
+        self.assertTrue(self.plan.has_feature('reports'))
+        self.assertIn(self.company, companies_with_feature('reports'))
+
+        self.reports.plans.clear()
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.feature_mask, 0)
+        self.assertNotIn(self.company, companies_with_feature('reports'))
+
+    def test_feature_filter_matches_entitlements(self):
+        other = Company.objects.create(name='Estándar', rut='76543210-3')
+        estandar, _ = Plan.objects.get_or_create(code='ESTANDAR', defaults={'name': 'Estándar'})
+        Subscription.objects.create(
+            company=other, plan=estandar, start_date=date.today(), end_date=date.today() + timedelta(days=30)
+        )
+        self.plan.features.add(self.reports)
+        self.assertEqual(set(companies_with_feature('reports')), {self.company, other})
+
+        Subscription.objects.filter(company=self.company).update(end_date=date.today() - timedelta(days=1))
+        self.assertEqual(list(companies_with_feature('reports')), [other])
@@ -0,0 +1,105 @@
+import base64
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlparse
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.models import Company, Plan, PlanFeature, Subscription
+from apps.core.pagination import keyset_page
+from apps.inventory.models import Branch, Inventory, Product, Purchase, Supplier
+from apps.sales.models import Sale
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        features = [PlanFeature.objects.get_or_create(code=code, defaults={'label': code})[0] for code in ('sales', 'inventory')]
+        plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        plan.features.set(features)
+        Subscription.objects.create(
+            company=self.company,
+            plan=plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        # Nombres repetidos: el orden por nombre se desempata por id.
+        for i in range(7):
+            product = Product.objects.create(
+                company=self.company, sku=f'P{i}', name=f'Producto {i // 2}', price=Decimal('10'), cost=Decimal('5')
+            )
+            Inventory.objects.create(company=self.company, branch=self.branch, product=product, stock=i)
+        now = timezone.now()
+        self.sales = [
+            Sale.objects.create(company=self.company, branch=self.branch, seller=self.user, payment_method='efectivo', created_at=now)
+            for _ in range(5)
+        ]
+
+    def test_keyset_pages_walk_forward_and_back(self):
+        qs = Inventory.objects.filter(company=self.company).select_related('product')
+        ordering = ('product__name', 'id')
+        expected = list(qs.order_by(*ordering))
+        seen, page = [], keyset_page(qs, ordering, size=3)
+        pages = [page]
+        while True:
+            seen.extend(page.items)
+            if not page.next_cursor:
+                break
+            page = keyset_page(qs, ordering, after=page.next_cursor, size=3)
+            pages.append(page)
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(p.items) for p in pages], [3, 3, 1])
+        back = keyset_page(qs, ordering, before=pages[2].previous_cursor, size=3)
+        self.assertEqual(back.items, pages[1].items)
+        self.assertEqual((back.next_cursor, back.previous_cursor), (pages[1].next_cursor, pages[1].previous_cursor))
+        self.assertIsNone(keyset_page(qs, ordering, before=pages[1].previous_cursor, size=3).previous_cursor)
+
+    def test_api_lists_paginate_with_cursor(self):
+        api = APIClient()
+        api.force_authenticate(self.user)
+        first = api.get(reverse('sale-list'), {'page_size': 2}).json()
+        self.assertNotIn('count', first)
+        ids = [row['id'] for row in first['results']]
+        second = api.get(first['next']).json()
+        ids += [row['id'] for row in second['results']]
+        ids += [row['id'] for row in api.get(second['next']).json()['results']]
+        self.assertEqual(ids, sorted((sale.pk for sale in self.sales), reverse=True))
+        inventory = api.get(reverse('branch-inventory', args=[self.branch.pk]), {'page_size': 5}).json()
+        self.assertEqual(len(inventory['results']), 5)
+        self.assertIsNotNone(inventory['next'])
+
+    def test_purchases_cursor_does_not_fall_back_to_offsets(self):
+        supplier = Supplier.objects.create(
+            company=self.company, name='Proveedor', rut='76543210-3', contact_name='Ana', contact_email='a@example.com',
+            contact_phone='123',
+        )
+        purchases = [
+            Purchase.objects.create(company=self.company, branch=self.branch, supplier=supplier, date=date.today())
+            for _ in range(3)
+        ]
+        api = APIClient()
+        api.force_authenticate(self.user)
+        first = api.get(reverse('purchase-list'), {'page_size': 2}).json()
+        cursor = parse_qs(urlparse(first['next']).query)['cursor'][0]
+        self.assertNotIn('o', parse_qs(base64.b64decode(cursor).decode()))
+        ids = [row['id'] for row in first['results'] + api.get(first['next']).json()['results']]
+        self.assertEqual(ids, [purchase.pk for purchase in reversed(purchases)])
+
+    def test_sales_page_links_to_next_page(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('sales_list'), {'page_size': 2, 'branch': self.branch.pk})
+        page = response.context['page']
+        self.assertEqual([sale.pk for sale in page.items], [self.sales[4].pk, self.sales[3].pk])
+        self.assertContains(response, f'after={page.next_cursor}')
+        self.assertContains(response, f'branch={self.branch.pk}')
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from apps.core.singleflight import lock_key, reset_single_flight_stats, single_flight, single_flight_stats
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        reset_single_flight_stats()
+
+    def test_computes_and_releases_lock(self):
+        self.assertEqual(single_flight('prueba', 'a', lambda: 42), 42)
+        self.assertIsNone(cache.get(lock_key('prueba', 'a')))
+        self.assertEqual(single_flight_stats()['prueba'], {'computed': 1})
+
+    def test_busy_lock_serves_stale_value(self):
+        cache.add(lock_key('prueba', 'a'), 'otro')
+        value = single_flight('prueba', 'a', lambda: self.fail('no debe calcular'), stale='anterior')
+        self.assertEqual(value, 'anterior')
+        self.assertEqual(single_flight_stats()['prueba'], {'stale': 1})
+
+    def test_concurrent_callers_share_one_computation(self):
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return 'listo'
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(single_flight('prueba', 'a', compute)))
+        first.start()
+        started.wait(1)
+        others = [threading.Thread(target=lambda: results.append(single_flight('prueba', 'a', compute))) for _ in range(3)]
+        for thread in others:
+            thread.start()
+        for thread in [first, *others]:
+            thread.join()
+        self.assertEqual(results, ['listo'] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(single_flight_stats()['prueba'], {'computed': 1, 'coalesced': 3})
+
+    @override_settings(SINGLE_FLIGHT_WAIT=0)
+    def test_wait_timeout_computes_without_lock(self):
+        cache.add(lock_key('prueba', 'a'), 'otro')
+        self.assertEqual(single_flight('prueba', 'a', lambda: 7), 7)
+        self.assertEqual(single_flight_stats()['prueba'], {'timeouts': 1})
+        self.assertEqual(cache.get(lock_key('prueba', 'a')), 'otro')
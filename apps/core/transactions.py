@@ -0,0 +1,100 @@
+"""Transacciones con reintento ante deadlocks y fallas de serialización."""
+from __future__ import annotations
+
+import functools
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE de PostgreSQL: deadlock_detected y serialization_failure.
+RETRYABLE_SQLSTATES = {'40P01', '40001'}
+
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+# Vista que atiende el request en curso; la fija RetryViewMiddleware.
+current_view = ContextVar('retry_current_view', default='')
+
+
+def _stats_label(label):
+    view = current_view.get()
+    return f'{view}:{label}' if view else label
+
+
+def _count(label, key):
+    with _stats_lock:
+        _stats[label][key] += 1
+
+
+def retry_stats() -> dict:
+    """Intentos, reintentos y abortos acumulados en este proceso por `vista:servicio` (o solo servicio fuera de un request)."""
+    with _stats_lock:
+        return {label: dict(counter) for label, counter in _stats.items()}
+
+
+def reset_retry_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def is_retryable(exc) -> bool:
+    """True si el error es un deadlock, una falla de serialización o un bloqueo de SQLite."""
+    cause = exc.__cause__ or exc
+    code = getattr(cause, 'sqlstate', None) or getattr(cause, 'pgcode', None)
+    if code in RETRYABLE_SQLSTATES:
+        return True
+    message = str(exc).lower()
+    return 'deadlock' in message or 'database is locked' in message or 'database table is locked' in message
+
+
+def retry_on_conflict(label, attempts=None, serializable=False, using='default'):
+    """Ejecuta la función en `transaction.atomic()` y la reintenta ante conflictos de concurrencia.
+
+    Entre intentos espera un backoff exponencial con jitter acotado por
+    `TX_RETRY_MAX_DELAY`. Con `serializable` la transacción corre en SERIALIZABLE
+    (solo PostgreSQL). Si ya hay una transacción abierta solo se usa un savepoint y no
+    se reintenta: el conflicto se propaga a quien abrió la transacción.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            connection = connections[using]
+            if connection.in_atomic_block:
+                with transaction.atomic(using=using):
+                    return fn(*args, **kwargs)
+            max_attempts = attempts or getattr(settings, 'TX_RETRY_ATTEMPTS', 5)
+            base_delay = getattr(settings, 'TX_RETRY_BASE_DELAY', 0.02)
+            max_delay = getattr(settings, 'TX_RETRY_MAX_DELAY', 0.5)
+            stats_label = _stats_label(label)
+            for attempt in range(1, max_attempts + 1):
+                _count(stats_label, 'attempts')
+                try:
+                    with transaction.atomic(using=using):
+                        if serializable and connection.vendor == 'postgresql':
+                            with connection.cursor() as cursor:
+                                cursor.execute('SET TRANSACTION ISOLATION LEVEL SERIALIZABLE')
+                        return fn(*args, **kwargs)
+                except DatabaseError as exc:
+                    if not is_retryable(exc):
+                        raise
+                    if attempt == max_attempts:
+                        _count(stats_label, 'aborts')
+                        logger.error('%s abortada tras %s intentos: %s', stats_label, attempt, exc)
+                        raise
+                    _count(stats_label, 'retries')
+                    delay = min(max_delay, base_delay * 2 ** (attempt - 1))
+                    logger.warning('%s reintento %s por conflicto de concurrencia: %s', stats_label, attempt, exc)
+                    time.sleep(random.uniform(delay / 2, delay))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.core.benchmarking import create_bench_tenant, measure
+from apps.inventory.models import Branch, Inventory, InventoryMovement, Product
+from apps.sales.models import Sale, SaleItem
+from apps.sales.services import create_sale
+
+
+class Command(BaseCommand):
+    help = 'Compara consultas y latencia de una venta con el motor de stock por lotes y con el ciclo por línea'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 30, 100])
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with transaction.atomic():
+            company, user = create_bench_tenant()
+            branch = Branch.objects.create(company=company, name='Bench', address='-')
+            products = Product.objects.bulk_create(
+                [
+                    Product(company=company, sku=f'B{i:04d}', name=f'Producto {i}', price=Decimal('1000'), cost=Decimal('500'))
+                    for i in range(max(options['lines']))
+                ]
+            )
+            Inventory.objects.bulk_create(
+                [Inventory(company=company, branch=branch, product=product, stock=10 ** 9) for product in products]
+            )
+
+            def batched(count):
+                items = [{'product': p, 'quantity': 1, 'unit_price': p.price} for p in products[:count]]
+                create_sale({'branch': branch, 'payment_method': 'efectivo', 'items': items}, user)
+
+            def per_line(count):
+                # Ciclo previo al motor por lotes: SELECT, UPDATE e INSERT por cada línea.
+                with transaction.atomic():
+                    sale = Sale.objects.create(company=company, branch=branch, seller=user, payment_method='efectivo')
+                    for product in products[:count]:
+                        inventory = Inventory.objects.select_for_update().get(company=company, branch=branch, product=product)
+                        inventory.stock -= 1
+                        inventory.save()
+                        SaleItem.objects.create(sale=sale, product=product, quantity=1, unit_price=product.price)
+                        InventoryMovement.objects.create(
+                            company=company,
+                            branch=branch,
+                            product=product,
+                            movement_type=InventoryMovement.MOV_SALE,
+                            quantity_delta=-1,
+                            reason='Venta',
+                            created_by=user,
+                        )
+                    sale.total = product.price * count
+                    sale.save()
+
+            for count in options['lines']:
+                for label, fn in (('lotes', batched), ('por línea', per_line)):
+                    with CaptureQueriesContext(connection) as ctx:
+                        result = measure(lambda: fn(count), iterations)
+                    self.stdout.write(
+                        f'{count:>4} líneas {label:<10} {result["mean_us"] / 1000:>8.2f} ms/venta '
+                        f'{len(ctx.captured_queries) / iterations:>6.1f} consultas/venta'
+                    )
+            transaction.set_rollback(True)
@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.inventory.models import Inventory, InventoryStripe
+from apps.inventory.services import rebalance_stripes
+
+
+class Command(BaseCommand):
+    help = 'Consolida las franjas de stock de los productos con stock_ledger y vuelve a repartirlas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stripes', type=int, default=None, help='Franjas por sucursal/producto')
+        parser.add_argument('--interval', type=float, default=0, help='Segundos entre pasadas; 0 ejecuta una sola')
+
+    def handle(self, *args, **options):
+        stripes = options['stripes'] if options['stripes'] is not None else settings.STOCK_LEDGER_STRIPES
+        while True:
+            compacted = self.compact(stripes)
+            self.stdout.write(f'{compacted} filas de inventario consolidadas')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def compact(self, stripes):
+        ledger = Inventory.objects.filter(product__stock_ledger=True).values_list('company_id', 'branch_id', 'product_id')
+        # Productos que dejaron el modo ledger: su saldo vuelve por completo a Inventory.
+        retired = (
+            InventoryStripe.objects.filter(product__stock_ledger=False)
+            .values_list('company_id', 'branch_id', 'product_id')
+            .distinct()
+        )
+        count = 0
+        for target, keys in ((stripes, ledger), (0, retired)):
+            for company_id, branch_id, product_id in keys.iterator():
+                with transaction.atomic():
+                    rebalance_stripes(company_id, branch_id, product_id, target)
+                count += 1
+        return count
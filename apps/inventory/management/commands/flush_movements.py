@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.inventory.outbox import flush_movements
+
+
+class Command(BaseCommand):
+    help = 'Vuelca la outbox de movimientos (modo write-behind) a InventoryMovement'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Filas de outbox por transacción')
+        parser.add_argument('--interval', type=float, default=0, help='Segundos entre pasadas; 0 ejecuta una sola')
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = flush_movements(options['batch_size'])
+            self.stdout.write(f'{flushed} movimientos volcados')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
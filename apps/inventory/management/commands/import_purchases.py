@@ -0,0 +1,51 @@
+import csv
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from apps.inventory.models import Branch, Supplier
+from apps.inventory.services import import_purchase_csv
+
+
+class Command(BaseCommand):
+    help = 'Importa una factura de proveedor desde un CSV (sku, quantity, unit_cost) como compra'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo CSV')
+        parser.add_argument('--user', required=True, help='Usuario que registra la compra')
+        parser.add_argument('--branch', type=int, required=True, help='Id de la sucursal')
+        parser.add_argument('--supplier', type=int, required=True, help='Id del proveedor')
+        parser.add_argument('--date', type=date.fromisoformat, default=None, help='Fecha de la factura (AAAA-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Filas por consulta de SKU')
+        parser.add_argument('--errors', default=None, help='CSV donde escribir las filas rechazadas')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options['user']).select_related('company').first()
+        if user is None or not user.company_id:
+            raise CommandError('Usuario inexistente o sin compañía')
+        branch = Branch.objects.filter(pk=options['branch'], company_id=user.company_id).first()
+        supplier = Supplier.objects.filter(pk=options['supplier'], company_id=user.company_id).first()
+        if branch is None or supplier is None:
+            raise CommandError('Sucursal o proveedor inválido para esta compañía')
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as handle:
+            try:
+                result = import_purchase_csv(
+                    user, branch, supplier, options['date'] or date.today(), handle, chunk_size=options['chunk_size'],
+                )
+            except ValidationError as exc:
+                raise CommandError(str(exc.detail[0] if isinstance(exc.detail, list) else exc.detail))
+
+        if result.purchase:
+            self.stdout.write(f'Compra #{result.purchase.id}: {result.rows} filas importadas')
+        else:
+            self.stdout.write('Ninguna fila válida; no se creó la compra')
+        if options['errors']:
+            with open(options['errors'], 'w', newline='', encoding='utf-8') as handle:
+                writer = csv.DictWriter(handle, fieldnames=['line', 'sku', 'error'])
+                writer.writeheader()
+                writer.writerows(result.errors)
+        for error in result.errors:
+            self.stderr.write(f"Línea {error['line']} ({error['sku']}): {error['error']}")
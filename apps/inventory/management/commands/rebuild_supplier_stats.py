@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.models import Company
+from apps.inventory.supplier_stats import rebuild_supplier_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las estadísticas por proveedor desde las compras registradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, action='append', help='Id de compañía (repetible); por defecto todas')
+
+    def handle(self, *args, **options):
+        company_ids = options['company'] or list(Company.objects.order_by('id').values_list('id', flat=True))
+        start = time.perf_counter()
+        total = 0
+        for company_id in company_ids:
+            rows = rebuild_supplier_stats(company_id)
+            total += rows
+            self.stdout.write(f'Compañía {company_id}: {rows} proveedores')
+        self.stdout.write(f'{len(company_ids)} compañías, {total} proveedores en {time.perf_counter() - start:.1f}s')
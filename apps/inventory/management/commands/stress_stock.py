@@ -0,0 +1,115 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Sum
+
+from apps.core.benchmarking import create_bench_tenant
+from apps.inventory.models import Branch, Inventory, InventoryMovement, Product
+from apps.inventory.services import MODE_CONDITIONAL, MODE_LOCK, InsufficientStock, rebalance_stripes
+from apps.sales.models import SaleItem
+from apps.sales.services import create_sale
+
+
+class Command(BaseCommand):
+    help = 'Prueba de estrés concurrente del descuento de stock en modo lock y conditional'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=[MODE_LOCK, MODE_CONDITIONAL, 'both'], default='both')
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--sales', type=int, default=400, help='Ventas totales por modo')
+        parser.add_argument('--products', type=int, default=5, help='SKUs disputados')
+        parser.add_argument('--stock', type=int, default=150, help='Stock inicial por SKU')
+        parser.add_argument('--lines', type=int, default=3, help='Líneas por venta')
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--ledger', action='store_true', help='Marca los SKUs con stock_ledger y reparte franjas')
+
+    def handle(self, *args, **options):
+        modes = [MODE_LOCK, MODE_CONDITIONAL] if options['mode'] == 'both' else [options['mode']]
+        failed = False
+        for mode in modes:
+            failed |= not self._run(mode, options)
+        if failed:
+            self.stderr.write(self.style.ERROR('Se detectaron inconsistencias de stock'))
+
+    def _run(self, mode, options):
+        # Los hilos usan conexiones propias: los datos deben quedar confirmados y se borran al final.
+        company, user = create_bench_tenant()
+        try:
+            branch = Branch.objects.create(company=company, name='Stress', address='-')
+            products = Product.objects.bulk_create(
+                [
+                    Product(
+                        company=company, sku=f'S{i:03d}', name=f'Producto {i}', price=Decimal('100'), cost=Decimal('50'),
+                        stock_ledger=options['ledger'],
+                    )
+                    for i in range(options['products'])
+                ]
+            )
+            Inventory.objects.bulk_create(
+                [Inventory(company=company, branch=branch, product=p, stock=options['stock']) for p in products]
+            )
+            if options['ledger']:
+                with transaction.atomic():
+                    for product in products:
+                        rebalance_stripes(company, branch.pk, product.pk, settings.STOCK_LEDGER_STRIPES)
+            rng = random.Random(options['seed'])
+            orders = [
+                [
+                    {'product': p, 'quantity': rng.randint(1, 3), 'unit_price': p.price}
+                    for p in rng.sample(products, min(options['lines'], len(products)))
+                ]
+                for _ in range(options['sales'])
+            ]
+            outcomes = Counter()
+            lock = threading.Lock()
+
+            def sell(items):
+                try:
+                    create_sale({'branch': branch, 'payment_method': 'efectivo', 'items': list(items)}, user, mode=mode)
+                    result = 'ok'
+                except InsufficientStock:
+                    result = 'sin stock'
+                except DatabaseError:
+                    result = 'error bd'
+                finally:
+                    connection.close()
+                with lock:
+                    outcomes[result] += 1
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                list(pool.map(sell, orders))
+            elapsed = time.perf_counter() - start
+            return self._report(mode, company, branch, options, outcomes, elapsed)
+        finally:
+            company.delete()
+            user.delete()
+
+    def _report(self, mode, company, branch, options, outcomes, elapsed):
+        stocks = dict(Inventory.objects.filter(company=company).with_available().values_list('product_id', 'available'))
+        moved = dict(
+            InventoryMovement.objects.flushed().filter(company=company)
+            .values('product_id').annotate(total=Sum('quantity_delta')).values_list('product_id', 'total')
+        )
+        sold = dict(
+            SaleItem.objects.filter(sale__company=company)
+            .values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+        )
+        negative = [pid for pid, stock in stocks.items() if stock < 0]
+        lost = [
+            pid for pid, stock in stocks.items()
+            if stock != options['stock'] + moved.get(pid, 0) or moved.get(pid, 0) != -sold.get(pid, 0)
+        ]
+        self.stdout.write(
+            f'{mode + (" + ledger" if options["ledger"] else ""):<21} {options["sales"] / elapsed:>8.1f} ventas/s  '
+            + '  '.join(f'{key}={value}' for key, value in sorted(outcomes.items()))
+            + f'  stock negativo={len(negative)} actualizaciones perdidas={len(lost)}'
+        )
+        return not negative and not lost
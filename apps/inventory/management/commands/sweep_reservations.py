@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.inventory.services import sweep_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Elimina en bloque las reservas de stock vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Segundos entre pasadas; 0 ejecuta una sola')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = sweep_expired_reservations()
+            self.stdout.write(f'{deleted} reservas vencidas eliminadas')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_feature_bitmask'),
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_ledger',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='inventorymovement',
+            name='movement_type',
+            field=models.CharField(choices=[('PURCHASE', 'Compra'), ('SALE', 'Venta'), ('ADJUST', 'Ajuste'), ('TRANSFER', 'Traspaso')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='InventoryStripe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe', models.PositiveSmallIntegerField()),
+                ('allowance', models.PositiveIntegerField(default=0)),
+                ('consumed', models.PositiveIntegerField(default=0)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_stripes', to='inventory.branch')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.company')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_stripes', to='inventory.product')),
+            ],
+            options={
+                'unique_together': {('branch', 'product', 'stripe')},
+            },
+        ),
+    ]
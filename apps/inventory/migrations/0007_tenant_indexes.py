@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_stock_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['company', 'branch', 'product', 'created_at'], name='invmov_co_br_prod_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['company', 'date'], name='purchase_co_date_idx'),
+        ),
+    ]
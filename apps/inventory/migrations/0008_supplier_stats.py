@@ -0,0 +1,64 @@
+# Generated by Django 4.2.11 on 2026-10-17 18:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Sum
+
+
+def build_stats(apps, schema_editor):
+    Purchase = apps.get_model('inventory', 'Purchase')
+    PurchaseItem = apps.get_model('inventory', 'PurchaseItem')
+    SupplierProduct = apps.get_model('inventory', 'SupplierProduct')
+    SupplierStats = apps.get_model('inventory', 'SupplierStats')
+    pairs = PurchaseItem.objects.values_list('purchase__company_id', 'purchase__supplier_id', 'product_id').distinct()
+    SupplierProduct.objects.bulk_create(
+        [SupplierProduct(company_id=company, supplier_id=supplier, product_id=product) for company, supplier, product in pairs],
+        batch_size=1000,
+    )
+    products = dict(SupplierProduct.objects.values_list('supplier_id').annotate(total=Count('id')))
+    totals = Purchase.objects.values('company_id', 'supplier_id').annotate(count=Count('id'), last=Max('date'), spent=Sum('total_cost'))
+    SupplierStats.objects.bulk_create(
+        [
+            SupplierStats(
+                supplier_id=row['supplier_id'], company_id=row['company_id'], total_purchases=row['count'],
+                products_count=products.get(row['supplier_id'], 0), last_purchase=row['last'], total_spent=row['spent'] or 0,
+            )
+            for row in totals
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_feature_bitmask'),
+        ('inventory', '0007_tenant_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierStats',
+            fields=[
+                ('supplier', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='inventory.supplier')),
+                ('total_purchases', models.IntegerField(default=0)),
+                ('products_count', models.IntegerField(default=0)),
+                ('last_purchase', models.DateField(blank=True, null=True)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.company')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SupplierProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.company')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.product')),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.supplier')),
+            ],
+            options={
+                'unique_together': {('supplier', 'product')},
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
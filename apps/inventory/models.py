@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from apps.core.models import Company
 from apps.core.validators import validate_rut
 
@@ -12,6 +15,8 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(0)])
     cost = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(0)])
     category = models.CharField(max_length=100, blank=True)
+    # Productos muy vendidos: las ventas descuentan de franjas (InventoryStripe) en vez de la fila de Inventory.
+    stock_ledger = models.BooleanField(default=False)
 
     class Meta:
         unique_together = ('company', 'sku')
@@ -33,6 +38,18 @@ class Branch(models.Model):
         return self.name
 
 
+class InventoryQuerySet(models.QuerySet):
+    def with_available(self):
+        """Anota `available`: stock de la fila más lo que queda sin consumir en sus franjas."""
+        pending = (
+            InventoryStripe.objects.filter(branch_id=OuterRef('branch_id'), product_id=OuterRef('product_id'))
+            .values('branch_id')
+            .annotate(total=Sum(F('allowance') - F('consumed')))
+            .values('total')
+        )
+        return self.annotate(available=F('stock') + Coalesce(Subquery(pending), 0))
+
+
 class Inventory(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='inventories')
@@ -40,9 +57,59 @@ class Inventory(models.Model):
     stock = models.PositiveIntegerField(default=0)
     reorder_point = models.PositiveIntegerField(default=0)
 
+    objects = InventoryQuerySet.as_manager()
+
     class Meta:
         unique_together = ('company', 'branch', 'product')
 
+    @property
+    def available_stock(self):
+        if hasattr(self, 'available'):
+            return self.available
+        pending = InventoryStripe.objects.filter(branch_id=self.branch_id, product_id=self.product_id).aggregate(
+            total=Sum(F('allowance') - F('consumed'))
+        )['total']
+        return self.stock + (pending or 0)
+
+
+class InventoryStripe(models.Model):
+    """Sub-contador de stock: una porción (`allowance`) apartada de Inventory para ventas concurrentes."""
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='stock_stripes')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_stripes')
+    stripe = models.PositiveSmallIntegerField()
+    allowance = models.PositiveIntegerField(default=0)
+    consumed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('branch', 'product', 'stripe')
+
+
+class StockReservation(models.Model):
+    """Stock apartado por un usuario (carrito o checkout) hasta `expires_at`."""
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    user = models.ForeignKey('accounts.User', on_delete=models.CASCADE, related_name='stock_reservations')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'branch', 'product')
+        indexes = [models.Index(fields=['branch', 'product', 'expires_at'])]
+
+
+class InventoryMovementManager(models.Manager):
+    def flushed(self):
+        """Queryset de movimientos tras volcar la outbox pendiente (modo write-behind)."""
+        from .outbox import flush_movements
+
+        flush_movements()
+        return self.get_queryset()
+
 
 class InventoryMovement(models.Model):
     MOV_PURCHASE = 'PURCHASE'
@@ -61,9 +128,22 @@ class InventoryMovement(models.Model):
     movement_type = models.CharField(max_length=20, choices=MOV_CHOICES)
     quantity_delta = models.IntegerField()
     reason = models.CharField(max_length=255, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # default en vez de auto_now_add para conservar la hora original al volcar la outbox.
+    created_at = models.DateTimeField(default=timezone.now)
     created_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True)
 
+    objects = InventoryMovementManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['company', 'branch', 'product', 'created_at'], name='invmov_co_br_prod_created_idx')]
+
+
+class MovementOutbox(models.Model):
+    """Lote de movimientos pendientes de volcar a InventoryMovement (una fila por transacción)."""
+
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
 
 class Supplier(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='suppliers')
@@ -88,9 +168,101 @@ class Purchase(models.Model):
     created_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True)
     total_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
+    class Meta:
+        indexes = [models.Index(fields=['company', 'date'], name='purchase_co_date_idx')]
+
 
 class PurchaseItem(models.Model):
     purchase = models.ForeignKey(Purchase, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     unit_cost = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(0)])
+
+
+class SupplierStats(models.Model):
+    """Totales de compras por proveedor; se actualizan en la transacción de cada compra."""
+
+    supplier = models.OneToOneField(Supplier, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+')
+    total_purchases = models.IntegerField(default=0)
+    products_count = models.IntegerField(default=0)
+    last_purchase = models.DateField(null=True, blank=True)
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+
+class SupplierProduct(models.Model):
+    """Productos distintos que abasteció cada proveedor (base de `SupplierStats.products_count`)."""
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+')
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name='+')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ('supplier', 'product')
+
+
+class TransferDocument(models.Model):
+    """Traspaso de varias líneas entre sucursales; en tránsito el destino se abona al recibirlo."""
+
+    STATUS_IN_TRANSIT = 'IN_TRANSIT'
+    STATUS_RECEIVED = 'RECEIVED'
+    STATUS_CHOICES = [
+        (STATUS_IN_TRANSIT, 'En tránsito'),
+        (STATUS_RECEIVED, 'Recibido'),
+    ]
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='transfers')
+    source = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='outgoing_transfers')
+    target = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='incoming_transfers')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_RECEIVED)
+    note = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    received_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    received_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['company', 'status'])]
+
+
+class TransferLine(models.Model):
+    document = models.ForeignKey(TransferDocument, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+
+
+class StockCount(models.Model):
+    """Sesión de conteo físico de una sucursal; varios lectores cargan conteos hasta confirmarla."""
+
+    STATUS_OPEN = 'OPEN'
+    STATUS_COMMITTED = 'COMMITTED'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Abierto'),
+        (STATUS_COMMITTED, 'Confirmado'),
+    ]
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='stock_counts')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='stock_counts')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    note = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    committed_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    committed_at = models.DateTimeField(null=True, blank=True)
+    # Reporte de diferencias guardado al confirmar: una fila por producto con stock esperado y contado.
+    variance = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class StockCountEntry(models.Model):
+    """Cantidad contada de un producto por un lector; el conteo final suma todos los lectores."""
+
+    count = models.ForeignKey(StockCount, on_delete=models.CASCADE, related_name='entries')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    scanner = models.CharField(max_length=50, blank=True, default='')
+    quantity = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('count', 'product', 'scanner')
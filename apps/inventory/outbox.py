@@ -0,0 +1,80 @@
+"""Outbox de movimientos de inventario para el modo write-behind.
+
+Con `INVENTORY_MOVEMENT_WRITE_BEHIND` activo, cada lote de movimientos se guarda como
+una sola fila de `MovementOutbox` dentro de la misma transacción que cambia el stock,
+así que un movimiento existe si y solo si su cambio de stock se confirmó. El volcado a
+`InventoryMovement` borra las filas de la outbox en la misma transacción en que inserta
+los movimientos: si el proceso cae a mitad de camino no se pierde ni se duplica nada.
+"""
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.core.data_versions import bump_data_version
+
+from .models import InventoryMovement, MovementOutbox
+
+
+def write_behind_enabled() -> bool:
+    return getattr(settings, 'INVENTORY_MOVEMENT_WRITE_BEHIND', False)
+
+
+def record_movements(movements):
+    """Guarda los movimientos en InventoryMovement o, en modo write-behind, en la outbox."""
+    if not movements:
+        return
+    for company_id in {movement.company_id for movement in movements}:
+        bump_data_version(company_id)
+    if not write_behind_enabled():
+        InventoryMovement.objects.bulk_create(movements)
+        return
+    now = timezone.now()
+    MovementOutbox.objects.create(
+        payload=[
+            {
+                'company': movement.company_id,
+                'branch': movement.branch_id,
+                'product': movement.product_id,
+                'type': movement.movement_type,
+                'delta': movement.quantity_delta,
+                'reason': movement.reason,
+                'user': movement.created_by_id,
+                'at': (movement.created_at or now).isoformat(),
+            }
+            for movement in movements
+        ]
+    )
+
+
+def _movement(entry) -> InventoryMovement:
+    return InventoryMovement(
+        company_id=entry['company'],
+        branch_id=entry['branch'],
+        product_id=entry['product'],
+        movement_type=entry['type'],
+        quantity_delta=entry['delta'],
+        reason=entry['reason'],
+        created_by_id=entry['user'],
+        created_at=parse_datetime(entry['at']),
+    )
+
+
+def flush_movements(batch_size: int | None = None) -> int:
+    """Vuelca la outbox a InventoryMovement en lotes; devuelve cuántos movimientos insertó."""
+    batch_size = batch_size or getattr(settings, 'INVENTORY_MOVEMENT_FLUSH_BATCH', 500)
+    flushed = 0
+    while True:
+        with transaction.atomic():
+            # skip_locked permite varios flushers sin volcar dos veces el mismo lote.
+            rows = list(
+                MovementOutbox.objects.select_for_update(skip_locked=True).order_by('id').values_list('id', 'payload')[:batch_size]
+            )
+            if not rows:
+                return flushed
+            movements = [_movement(entry) for _, payload in rows for entry in payload]
+            InventoryMovement.objects.bulk_create(movements, batch_size=1000)
+            MovementOutbox.objects.filter(id__in=[row_id for row_id, _ in rows]).delete()
+        flushed += len(movements)
@@ -1,13 +1,16 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import Product, Branch, Inventory, InventoryMovement, Supplier, Purchase, PurchaseItem
+from .models import (
+    Product, Branch, Inventory, InventoryMovement, Supplier, Purchase, PurchaseItem, StockCount, TransferDocument,
+    TransferLine,
+)
 from apps.core.validators import validate_rut
 
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = ['id', 'company', 'sku', 'name', 'description', 'price', 'cost', 'category']
+        fields = ['id', 'company', 'sku', 'name', 'description', 'price', 'cost', 'category', 'stock_ledger']
         read_only_fields = ['id', 'company']
 
     def validate_name(self, value):
@@ -31,6 +34,7 @@ class BranchSerializer(serializers.ModelSerializer):
 
 class InventorySerializer(serializers.ModelSerializer):
     product_detail = ProductSerializer(source='product', read_only=True)
+    stock = serializers.IntegerField(source='available_stock', read_only=True)
 
     class Meta:
         model = Inventory
@@ -77,3 +81,39 @@ class PurchaseSerializer(serializers.ModelSerializer):
         if not value:
             raise serializers.ValidationError('Debe incluir items')
         return value
+
+
+class TransferLineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TransferLine
+        fields = ['product', 'quantity']
+
+
+class TransferDocumentSerializer(serializers.ModelSerializer):
+    lines = TransferLineSerializer(many=True)
+    in_transit = serializers.BooleanField(write_only=True, default=False)
+
+    class Meta:
+        model = TransferDocument
+        fields = [
+            'id', 'source', 'target', 'status', 'note', 'in_transit', 'lines', 'created_by', 'created_at',
+            'received_by', 'received_at',
+        ]
+        read_only_fields = ['id', 'status', 'created_by', 'created_at', 'received_by', 'received_at']
+
+    def validate_lines(self, value):
+        if not value:
+            raise serializers.ValidationError('Debe incluir items')
+        return value
+
+    def validate(self, attrs):
+        if attrs['source'] == attrs['target']:
+            raise serializers.ValidationError('La sucursal de origen y destino no pueden ser la misma')
+        return attrs
+
+
+class StockCountSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockCount
+        fields = ['id', 'branch', 'status', 'note', 'created_by', 'created_at', 'committed_by', 'committed_at']
+        read_only_fields = ['id', 'status', 'created_by', 'created_at', 'committed_by', 'committed_at']
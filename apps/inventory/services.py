@@ -0,0 +1,592 @@
+from __future__ import annotations
+
+import csv
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+from itertools import chain, islice
+from operator import or_
+
+from django.conf import settings
+from django.db.models import F, IntegerField, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from apps.core.transactions import retry_on_conflict
+
+from .models import (
+    Inventory, InventoryMovement, InventoryStripe, Product, Purchase, PurchaseItem, StockReservation, TransferDocument,
+    TransferLine,
+)
+from .outbox import record_movements
+from .supplier_stats import record_purchase
+
+
+@dataclass(frozen=True)
+class StockLine:
+    """Cambio de stock de un producto en una sucursal; `delta` negativo descuenta."""
+
+    branch: object
+    product: object
+    delta: int
+    reason: str = ''
+
+    @property
+    def key(self):
+        return (self.branch.pk, self.product.pk)
+
+
+class InsufficientStock(ValidationError):
+    default_detail = 'Stock insuficiente'
+
+    def __init__(self, line: StockLine, available: int, detail=None):
+        self.line = line
+        self.available = available
+        super().__init__(detail or self.default_detail)
+
+
+def _keys_filter(keys):
+    by_branch = defaultdict(list)
+    for branch_id, product_id in keys:
+        by_branch[branch_id].append(product_id)
+    return reduce(or_, (Q(branch_id=branch_id, product_id__in=ids) for branch_id, ids in by_branch.items()))
+
+
+def _lock_inventories(company, keys):
+    rows = Inventory.objects.select_for_update().filter(_keys_filter(keys), company=company).order_by('id')
+    return {(row.branch_id, row.product_id): row for row in rows}
+
+
+def _reservations(company, keys, owner):
+    """Reservas vigentes por `(branch_id, product_id)`: `(propias de owner, de otros usuarios)`."""
+    own, others = defaultdict(int), defaultdict(int)
+    if not keys:
+        return own, others
+    rows = (
+        StockReservation.objects.filter(_keys_filter(keys), company=company, expires_at__gt=timezone.now())
+        .values('branch_id', 'product_id', 'user_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('branch_id', 'product_id', 'user_id', 'total')
+    )
+    for branch_id, product_id, user_id, total in rows:
+        target = own if owner is not None and user_id == owner.pk else others
+        target[(branch_id, product_id)] += total
+    return own, others
+
+
+MODE_LOCK = 'lock'
+MODE_CONDITIONAL = 'conditional'
+
+
+def _apply_locked(company, totals, first_line, create_missing, held, inventories):
+    """Aplica `totals` sobre las filas ya bloqueadas en `inventories`."""
+    inventories = {key: inventories[key] for key in totals if key in inventories}
+    missing = [key for key in totals if key not in inventories]
+    if missing and create_missing:
+        Inventory.objects.bulk_create(
+            [Inventory(company=company, branch_id=branch_id, product_id=product_id, stock=0) for branch_id, product_id in missing],
+            ignore_conflicts=True,
+        )
+        inventories.update(_lock_inventories(company, missing))
+
+    for key, total in totals.items():
+        inventory = inventories.get(key)
+        stock = inventory.stock if inventory else 0
+        available = stock - held.get(key, 0)
+        if total < 0 and available + total < 0:
+            raise InsufficientStock(first_line[key], max(available, 0))
+        if inventory is None:
+            raise Inventory.DoesNotExist(f'No existe inventario para la sucursal/producto {key}')
+        inventory.stock = stock + total
+
+    changed = [inventories[key] for key, total in totals.items() if total]
+    if changed:
+        Inventory.objects.bulk_update(changed, ['stock'])
+    return inventories
+
+
+def _held_by_others(company, key, owner):
+    """Subconsulta con lo reservado por usuarios distintos de `owner`, para la guarda del UPDATE."""
+    branch_id, product_id = key
+    reservations = StockReservation.objects.filter(
+        company=company, branch_id=branch_id, product_id=product_id, expires_at__gt=timezone.now()
+    )
+    if owner is not None:
+        reservations = reservations.exclude(user=owner)
+    total = reservations.order_by().values('product_id').annotate(total=Sum('quantity')).values('total')
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def _apply_conditional(company, totals, first_line, create_missing, owner=None, reserved=True):
+    # Un UPDATE con guarda por fila, en orden fijo de llaves para no cruzar bloqueos. Con
+    # `reserved` la guarda suma lo reservado por otros usuarios dentro del mismo WHERE.
+    for key in sorted(totals):
+        total = totals[key]
+        branch_id, product_id = key
+        rows = Inventory.objects.filter(company=company, branch_id=branch_id, product_id=product_id)
+        if total >= 0:
+            guarded = rows
+        elif reserved:
+            guarded = rows.filter(stock__gte=_held_by_others(company, key, owner) - total)
+        else:
+            guarded = rows.filter(stock__gte=-total)
+        if guarded.update(stock=F('stock') + total):
+            continue
+        if total >= 0 and create_missing:
+            Inventory.objects.bulk_create(
+                [Inventory(company=company, branch_id=branch_id, product_id=product_id, stock=0)],
+                ignore_conflicts=True,
+            )
+            rows.update(stock=F('stock') + total)
+            continue
+        available = rows.values_list('stock', flat=True).first()
+        if available is None and total >= 0:
+            raise Inventory.DoesNotExist(f'No existe inventario para la sucursal/producto {key}')
+        held = _reservations(company, [key], owner)[1].get(key, 0) if reserved else 0
+        raise InsufficientStock(first_line[key], max((available or 0) - held, 0))
+    return {}
+
+
+def _consume_stripe(company, key, quantity):
+    """Descuenta `quantity` de alguna franja con saldo suficiente, sin tocar la fila de Inventory.
+
+    Devuelve `(descontado, saldo)` donde `saldo` es lo que quedaba en las franjas.
+    """
+    branch_id, product_id = key
+    rows = list(
+        InventoryStripe.objects.filter(company=company, branch_id=branch_id, product_id=product_id)
+        .values_list('id', 'allowance', 'consumed')
+    )
+    candidates = [stripe_id for stripe_id, allowance, consumed in rows if allowance - consumed >= quantity]
+    # Orden aleatorio para repartir ventas concurrentes entre franjas distintas.
+    random.shuffle(candidates)
+    for stripe_id in candidates:
+        updated = InventoryStripe.objects.filter(pk=stripe_id, allowance__gte=F('consumed') + quantity).update(
+            consumed=F('consumed') + quantity
+        )
+        if updated:
+            return True, 0
+    return False, sum(allowance - consumed for _, allowance, consumed in rows)
+
+
+def rebalance_stripes(company, branch_id, product_id, stripes: int):
+    """Devuelve el saldo de las franjas a Inventory y reparte `stripes` franjas nuevas.
+
+    Se conserva en Inventory una porción igual a la de cada franja para los traspasos,
+    ajustes y ventas que no alcancen en una franja. Con `stripes=0` todo vuelve a la
+    fila. Debe ejecutarse dentro de `transaction.atomic()`.
+    """
+    inventory = (
+        Inventory.objects.select_for_update()
+        .filter(company=company, branch_id=branch_id, product_id=product_id)
+        .first()
+    )
+    if inventory is None:
+        return None
+    current = list(
+        InventoryStripe.objects.select_for_update().filter(branch_id=branch_id, product_id=product_id).order_by('stripe')
+    )
+    pool = inventory.stock + sum(stripe.allowance - stripe.consumed for stripe in current)
+    share = pool // (stripes + 1)
+    by_number = {stripe.stripe: stripe for stripe in current}
+    keep, new = [], []
+    for number in range(stripes):
+        stripe = by_number.pop(number, None)
+        if stripe is None:
+            new.append(
+                InventoryStripe(
+                    company_id=inventory.company_id, branch_id=branch_id, product_id=product_id, stripe=number, allowance=share
+                )
+            )
+        else:
+            stripe.allowance, stripe.consumed = share, 0
+            keep.append(stripe)
+    if by_number:
+        InventoryStripe.objects.filter(pk__in=[stripe.pk for stripe in by_number.values()]).delete()
+    if keep:
+        InventoryStripe.objects.bulk_update(keep, ['allowance', 'consumed'])
+    if new:
+        InventoryStripe.objects.bulk_create(new)
+    inventory.stock = pool - share * stripes
+    inventory.save(update_fields=['stock'])
+    return inventory
+
+
+def apply_stock_changes(
+    company, lines, movement_type, user, reason='', create_missing=False, mode=None, reserved_by=None
+):
+    """Aplica un lote de cambios de stock y registra sus movimientos con un solo INSERT.
+
+    En modo `lock` las filas de `Inventory` se bloquean en una sola consulta ordenada
+    por id para que dos transacciones concurrentes no se bloqueen mutuamente, y se
+    actualizan con un UPDATE. En modo `conditional` no se bloquea antes de escribir:
+    cada fila se descuenta con `UPDATE ... WHERE stock >= n` y se valida por filas
+    afectadas. El modo por defecto sale de `STOCK_CONCURRENCY_MODE`. Los descuentos de
+    productos con `stock_ledger` se toman primero de sus franjas (`InventoryStripe`).
+
+    Con `create_missing` se crean en stock 0 las filas que no existan. Lanza
+    `InsufficientStock` si alguna fila quedaría negativa o tomaría stock reservado por
+    otros usuarios; el llamador debe estar dentro de `transaction.atomic()` para que el
+    lote completo se revierta. En modo `lock` devuelve las filas actualizadas por
+    `(branch_id, product_id)`.
+
+    Con `reserved_by`, las líneas cubiertas por reservas vigentes de ese usuario se
+    descuentan con un UPDATE condicionado sin bloqueo previo y sus reservas se eliminan.
+    """
+    lines = list(lines)
+    if not lines:
+        return {}
+    mode = mode or getattr(settings, 'STOCK_CONCURRENCY_MODE', MODE_LOCK)
+
+    totals = defaultdict(int)
+    first_line = {}
+    for line in lines:
+        totals[line.key] += line.delta
+        first_line.setdefault(line.key, line)
+
+    decrements = [key for key, total in totals.items() if total < 0]
+    # Antes de bloquear solo se leen las reservas que deciden el camino de cada línea: las
+    # propias de `reserved_by` y las de productos con franjas, que no tocan la fila de Inventory.
+    ledger = [key for key in decrements if getattr(first_line[key].product, 'stock_ledger', False)]
+    own, held = _reservations(company, decrements if reserved_by is not None else ledger, reserved_by)
+    covered = {key: totals.pop(key) for key in decrements if own.get(key, 0) >= -totals[key]}
+
+    for key in sorted([*totals, *covered]):
+        pending = covered if key in covered else totals
+        if pending[key] >= 0 or not getattr(first_line[key].product, 'stock_ledger', False):
+            continue
+        leftover = True
+        # Con reservas ajenas el saldo debe validarse contra Inventory, no contra una franja.
+        if key in covered or not held.get(key):
+            consumed, leftover = _consume_stripe(company, key, -pending[key])
+            if consumed:
+                del pending[key]
+                continue
+        if leftover:
+            # Ninguna franja alcanza: se consolida su saldo en Inventory y la línea sigue el camino normal.
+            rebalance_stripes(company, key[0], key[1], stripes=0)
+
+    # El stock reservado ya está apartado: basta con la guarda de no quedar negativo.
+    _apply_conditional(company, covered, first_line, False, reserved=False)
+    if not totals:
+        inventories = {}
+    elif mode == MODE_CONDITIONAL:
+        inventories = _apply_conditional(company, totals, first_line, create_missing, reserved_by)
+    else:
+        # Se bloquean solo las filas que quedaron tras las franjas y las reservas ajenas se leen
+        # con ellas ya bloqueadas, igual que en `reserve_stock`.
+        locked = _lock_inventories(company, totals)
+        _, held = _reservations(company, [key for key in totals if totals[key] < 0], reserved_by)
+        inventories = _apply_locked(company, totals, first_line, create_missing, held, locked)
+    if own:
+        StockReservation.objects.filter(_keys_filter(own), company=company, user=reserved_by).delete()
+
+    record_movements(
+        [
+            InventoryMovement(
+                company=company,
+                branch=line.branch,
+                product=line.product,
+                movement_type=movement_type,
+                quantity_delta=line.delta,
+                reason=line.reason or reason,
+                created_by=user,
+            )
+            for line in lines
+        ]
+    )
+    return inventories
+
+
+def lock_available_stock(company, keys, user=None) -> dict:
+    """Bloquea las filas de Inventory y devuelve el stock disponible por `(branch_id, product_id)`.
+
+    El disponible incluye el saldo de las franjas y descuenta las reservas vigentes de
+    usuarios distintos de `user`. Debe ejecutarse dentro de `transaction.atomic()`.
+    """
+    if not keys:
+        return {}
+    locked = _lock_inventories(company, keys)
+    rows = (
+        Inventory.objects.filter(pk__in=[row.pk for row in locked.values()])
+        .with_available()
+        .values_list('branch_id', 'product_id', 'available')
+    )
+    _, held = _reservations(company, keys, user)
+    return {(branch_id, product_id): total - held.get((branch_id, product_id), 0) for branch_id, product_id, total in rows}
+
+
+@retry_on_conflict('inventory.reserve_stock')
+def reserve_stock(company, user, branch, items, ttl=None):
+    """Reserva `(producto, cantidad)` en la sucursal por `STOCK_RESERVATION_TTL` segundos.
+
+    Reemplaza las reservas previas del usuario para esos productos y lanza
+    `InsufficientStock` si el stock disponible, descontadas las reservas de otros
+    usuarios, no alcanza. Devuelve el vencimiento de la reserva.
+    """
+    items = {(branch.pk, product.pk): (product, quantity) for product, quantity in items}
+    if not items:
+        return None
+    ttl = ttl if ttl is not None else getattr(settings, 'STOCK_RESERVATION_TTL', 900)
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    # El bloqueo de las filas serializa reservas que compiten por el mismo stock.
+    available = lock_available_stock(company, items, user)
+    for key, (product, quantity) in items.items():
+        free = available.get(key, 0)
+        if quantity > free:
+            raise InsufficientStock(StockLine(branch, product, -quantity), max(free, 0))
+    StockReservation.objects.filter(_keys_filter(items), company=company, user=user).delete()
+    StockReservation.objects.bulk_create(
+        [
+            StockReservation(
+                company=company, branch=branch, product=product, user=user, quantity=quantity, expires_at=expires_at
+            )
+            for product, quantity in items.values()
+        ]
+    )
+    return expires_at
+
+
+def sweep_expired_reservations(now=None) -> int:
+    """Elimina en bloque las reservas vencidas y devuelve cuántas se borraron."""
+    deleted, _ = StockReservation.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
+
+
+@retry_on_conflict('inventory.transfer')
+def create_transfer(company, user, source, target, items, note='', in_transit=False):
+    """Registra un traspaso de varias líneas `(product, quantity)` y mueve su stock en un lote.
+
+    El origen se debita de inmediato. Con `in_transit` el documento queda en tránsito y
+    el destino se abona en `receive_transfer`; si no, ambos lados se aplican juntos.
+    Lanza `InsufficientStock` si el origen no alcanza para alguna línea.
+    """
+    if source.pk == target.pk:
+        raise ValidationError('La sucursal de origen y destino no pueden ser la misma')
+    items = list(items)
+    if not items:
+        raise ValidationError('Debe incluir items')
+    document = TransferDocument.objects.create(
+        company=company,
+        source=source,
+        target=target,
+        note=note,
+        created_by=user,
+        status=TransferDocument.STATUS_IN_TRANSIT if in_transit else TransferDocument.STATUS_RECEIVED,
+        received_by=None if in_transit else user,
+        received_at=None if in_transit else timezone.now(),
+    )
+    TransferLine.objects.bulk_create(
+        [TransferLine(document=document, product=product, quantity=quantity) for product, quantity in items]
+    )
+    lines = [StockLine(source, product, -quantity, note or f'Traspaso #{document.pk} a {target.name}') for product, quantity in items]
+    if not in_transit:
+        lines += [StockLine(target, product, quantity, note or f'Traspaso #{document.pk} desde {source.name}') for product, quantity in items]
+    apply_stock_changes(company, lines, InventoryMovement.MOV_TRANSFER, user, create_missing=True, mode=MODE_LOCK)
+    return document
+
+
+@retry_on_conflict('inventory.receive_transfer')
+def receive_transfer(company, user, document_id):
+    """Abona en el destino un traspaso en tránsito y lo marca como recibido."""
+    document = (
+        TransferDocument.objects.select_for_update().select_related('source', 'target')
+        .filter(company=company, pk=document_id).first()
+    )
+    if document is None:
+        raise ValidationError('Traspaso inexistente')
+    if document.status != TransferDocument.STATUS_IN_TRANSIT:
+        raise ValidationError('El traspaso ya fue recibido')
+    apply_stock_changes(
+        company,
+        [
+            StockLine(document.target, line.product, line.quantity, document.note or f'Traspaso #{document.pk} desde {document.source.name}')
+            for line in document.lines.select_related('product')
+        ],
+        InventoryMovement.MOV_TRANSFER,
+        user,
+        create_missing=True,
+        mode=MODE_LOCK,
+    )
+    document.status = TransferDocument.STATUS_RECEIVED
+    document.received_by = user
+    document.received_at = timezone.now()
+    document.save(update_fields=['status', 'received_by', 'received_at'])
+    return document
+
+
+def transfer_between_branches(company, user, source, target, product, quantity, note=''):
+    """Traspaso de un solo producto; lanza `InsufficientStock` si el origen no alcanza."""
+    return create_transfer(company, user, source, target, [(product, quantity)], note)
+
+
+@retry_on_conflict('inventory.adjust')
+def adjust_stock(company, user, branch, product, quantity_delta, reason=''):
+    """Ajuste manual de stock; devuelve la fila de Inventory resultante con `available`.
+
+    Los descuentos de productos con `stock_ledger` pueden salir de una franja sin tocar la
+    fila, por eso se vuelve a leer con el saldo de las franjas incluido.
+    """
+    apply_stock_changes(
+        company,
+        [StockLine(branch, product, quantity_delta)],
+        InventoryMovement.MOV_ADJUST,
+        user,
+        reason=reason,
+        create_missing=True,
+        mode=MODE_LOCK,
+    )
+    return Inventory.objects.with_available().get(company=company, branch=branch, product=product)
+
+
+def set_stock_levels(company, user, branch, counts, reason=''):
+    """Fija el stock contado de cada producto y registra las diferencias como ajustes.
+
+    `counts` es `{product: cantidad}`. Las filas se bloquean en una consulta ordenada,
+    el saldo de las franjas vuelve a `Inventory` antes de comparar y los cambios se
+    escriben con un UPDATE y un INSERT de movimientos. Devuelve `{product_id: (anterior,
+    contado)}`. Debe ejecutarse dentro de `transaction.atomic()`.
+    """
+    if not counts:
+        return {}
+    keys = [(branch.pk, product.pk) for product in counts]
+    inventories = _lock_inventories(company, keys)
+    missing = [key for key in keys if key not in inventories]
+    if missing:
+        Inventory.objects.bulk_create(
+            [Inventory(company=company, branch_id=branch_id, product_id=product_id, stock=0) for branch_id, product_id in missing],
+            ignore_conflicts=True,
+        )
+        inventories.update(_lock_inventories(company, missing))
+    striped = set(
+        InventoryStripe.objects.filter(branch=branch, product_id__in=[product.pk for product in counts])
+        .values_list('product_id', flat=True)
+    )
+    for product_id in striped:
+        inventories[(branch.pk, product_id)] = rebalance_stripes(company, branch.pk, product_id, stripes=0)
+
+    result, changed, movements = {}, [], []
+    for product, counted in counts.items():
+        inventory = inventories[(branch.pk, product.pk)]
+        result[product.pk] = (inventory.stock, counted)
+        if inventory.stock == counted:
+            continue
+        movements.append(
+            InventoryMovement(
+                company=company,
+                branch=branch,
+                product=product,
+                movement_type=InventoryMovement.MOV_ADJUST,
+                quantity_delta=counted - inventory.stock,
+                reason=reason,
+                created_by=user,
+            )
+        )
+        inventory.stock = counted
+        changed.append(inventory)
+    if changed:
+        Inventory.objects.bulk_update(changed, ['stock'])
+    record_movements(movements)
+    return result
+
+
+def create_purchase(validated_data, user):
+    items_data = validated_data.pop('items')
+    branch = validated_data['branch']
+    supplier = validated_data['supplier']
+    if branch.company != user.company or supplier.company != user.company:
+        raise ValidationError('Sucursal o proveedor inválido para esta compañía')
+    return _save_purchase(validated_data, items_data, user)
+
+
+@retry_on_conflict('inventory.create_purchase')
+def _save_purchase(purchase_data, items_data, user):
+    branch = purchase_data['branch']
+    purchase = Purchase.objects.create(company=user.company, created_by=user, **purchase_data)
+    PurchaseItem.objects.bulk_create([PurchaseItem(purchase=purchase, **item) for item in items_data])
+    apply_stock_changes(
+        user.company,
+        [StockLine(branch, item['product'], item['quantity']) for item in items_data],
+        InventoryMovement.MOV_PURCHASE,
+        user,
+        reason='Compra',
+        create_missing=True,
+    )
+    purchase.total_cost = sum((item['quantity'] * item['unit_cost'] for item in items_data), Decimal('0'))
+    purchase.save(update_fields=['total_cost'])
+    record_purchase(purchase, [item['product'].pk for item in items_data])
+    return purchase
+
+
+PURCHASE_CSV_COLUMNS = {
+    'sku': 'sku',
+    'quantity': 'quantity',
+    'cantidad': 'quantity',
+    'unit_cost': 'unit_cost',
+    'costo': 'unit_cost',
+    'costo_unitario': 'unit_cost',
+}
+
+
+@dataclass
+class PurchaseImport:
+    purchase: Purchase | None
+    rows: int
+    errors: list
+
+
+def iter_csv_rows(lines, columns, required):
+    """Recorre un CSV línea a línea y entrega `(número de línea, fila)` con columnas normalizadas.
+
+    `columns` traduce encabezados (en minúsculas) a nombres internos; el separador puede ser
+    coma o punto y coma.
+    """
+    lines = iter(lines)
+    header = next(lines, '')
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    reader = csv.reader(chain([header], lines), delimiter=delimiter)
+    names = [columns.get(name.strip().lower()) for name in next(reader, [])]
+    if not set(required) <= set(names):
+        raise ValidationError(f"El archivo debe incluir las columnas {', '.join(required)}")
+    for row in reader:
+        if any(value.strip() for value in row):
+            yield reader.line_num, {name: value.strip() for name, value in zip(names, row) if name}
+
+
+def import_purchase_csv(user, branch, supplier, date, lines, chunk_size=500) -> PurchaseImport:
+    """Registra una compra desde un CSV (sku, quantity, unit_cost) leído línea a línea.
+
+    Los SKU se resuelven con una consulta por bloque de `chunk_size` filas. Las filas
+    inválidas se informan en `errors` sin impedir que las válidas se registren.
+    """
+    if branch.company_id != user.company_id or supplier.company_id != user.company_id:
+        raise ValidationError('Sucursal o proveedor inválido para esta compañía')
+    rows = iter_csv_rows(lines, PURCHASE_CSV_COLUMNS, ('sku', 'quantity', 'unit_cost'))
+    items, errors = [], []
+    while chunk := list(islice(rows, chunk_size)):
+        skus = {row.get('sku', '') for _, row in chunk}
+        products = {product.sku: product for product in Product.objects.filter(company_id=user.company_id, sku__in=skus)}
+        for line, row in chunk:
+            sku = row.get('sku', '')
+            product = products.get(sku)
+            if product is None:
+                errors.append({'line': line, 'sku': sku, 'error': 'SKU inexistente'})
+                continue
+            try:
+                quantity = int(row.get('quantity', ''))
+                unit_cost = Decimal(row.get('unit_cost', '').replace(',', '.'))
+            except (ValueError, InvalidOperation):
+                errors.append({'line': line, 'sku': sku, 'error': 'Cantidad o costo inválido'})
+                continue
+            if quantity < 1 or unit_cost < 0:
+                errors.append({'line': line, 'sku': sku, 'error': 'Cantidad mínima 1 y costo no negativo'})
+                continue
+            items.append({'product': product, 'quantity': quantity, 'unit_cost': unit_cost})
+    purchase = None
+    if items:
+        purchase = _save_purchase({'branch': branch, 'supplier': supplier, 'date': date}, items, user)
+    return PurchaseImport(purchase=purchase, rows=len(items), errors=errors)
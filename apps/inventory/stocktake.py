@@ -0,0 +1,150 @@
+"""Conteos físicos: sesiones que reciben cantidades de varios lectores y se confirman en un lote."""
+from __future__ import annotations
+
+from decimal import Decimal
+from itertools import islice
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from apps.core.transactions import retry_on_conflict
+
+from .models import Inventory, Product, StockCount, StockCountEntry
+from .services import set_stock_levels
+
+COUNT_CSV_COLUMNS = {
+    'sku': 'sku',
+    'product': 'product',
+    'producto': 'product',
+    'quantity': 'quantity',
+    'cantidad': 'quantity',
+    'conteo': 'quantity',
+}
+UPSERT_BATCH = 500
+
+
+def _product_ref(row):
+    sku = str(row.get('sku') or '').strip()
+    if sku:
+        return 'sku', sku
+    product = str(row.get('product') or '').strip()
+    return ('id', int(product)) if product.isdigit() else (None, product)
+
+
+def _resolve_products(company_id, refs):
+    skus = {value for kind, value in refs if kind == 'sku'}
+    ids = {value for kind, value in refs if kind == 'id'}
+    products = Product.objects.filter(Q(sku__in=skus) | Q(pk__in=ids), company_id=company_id)
+    resolved = {}
+    for product in products:
+        resolved[('sku', product.sku)] = product
+        resolved[('id', product.pk)] = product
+    return resolved
+
+
+def record_count_entries(count, rows, scanner='', chunk_size=500):
+    """Carga cantidades contadas `(línea, {'sku' o 'product', 'quantity'})` de un lector.
+
+    Los productos se resuelven con una consulta por bloque de `chunk_size` filas. Las
+    líneas repetidas de un mismo envío se suman y reemplazan lo que ese lector había
+    informado para el producto, por lo que reenviar un archivo no duplica el conteo.
+    Devuelve `(productos cargados, errores por línea)`.
+    """
+    if count.status != StockCount.STATUS_OPEN:
+        raise ValidationError('El conteo ya fue confirmado')
+    rows = iter(rows)
+    totals, errors = {}, []
+    while chunk := list(islice(rows, chunk_size)):
+        refs = [_product_ref(row) for _, row in chunk]
+        products = _resolve_products(count.company_id, refs)
+        for (line, row), ref in zip(chunk, refs):
+            product = products.get(ref)
+            if product is None:
+                errors.append({'line': line, 'sku': ref[1], 'error': 'Producto inexistente'})
+                continue
+            try:
+                quantity = int(row.get('quantity'))
+            except (TypeError, ValueError):
+                quantity = -1
+            if quantity < 0:
+                errors.append({'line': line, 'sku': product.sku, 'error': 'Cantidad inválida'})
+                continue
+            totals[product.pk] = totals.get(product.pk, 0) + quantity
+
+    entries = [
+        StockCountEntry(count=count, product_id=product_id, scanner=scanner, quantity=quantity)
+        for product_id, quantity in totals.items()
+    ]
+    StockCountEntry.objects.bulk_create(
+        entries,
+        batch_size=UPSERT_BATCH,
+        update_conflicts=True,
+        unique_fields=['count', 'product', 'scanner'],
+        update_fields=['quantity', 'updated_at'],
+    )
+    return len(entries), errors
+
+
+def _counted(count, zero_missing):
+    totals = dict(count.entries.values('product').annotate(total=Sum('quantity')).values_list('product', 'total'))
+    if zero_missing:
+        for product_id in Inventory.objects.filter(branch_id=count.branch_id).values_list('product_id', flat=True):
+            totals.setdefault(product_id, 0)
+    return totals
+
+
+def _variance_rows(products, levels):
+    rows = []
+    for product_id, (expected, counted) in levels.items():
+        product = products[product_id]
+        rows.append(
+            {
+                'product': product_id,
+                'sku': product.sku,
+                'name': product.name,
+                'expected': expected,
+                'counted': counted,
+                'difference': counted - expected,
+                'cost_impact': str((counted - expected) * (product.cost or Decimal('0'))),
+            }
+        )
+    return sorted(rows, key=lambda row: row['sku'])
+
+
+def variance_report(count, zero_missing=False):
+    """Diferencias por producto; la de un conteo confirmado es la guardada al confirmarlo."""
+    if count.status == StockCount.STATUS_COMMITTED:
+        return count.variance
+    totals = _counted(count, zero_missing)
+    current = dict(
+        Inventory.objects.filter(branch_id=count.branch_id, product_id__in=totals)
+        .with_available()
+        .values_list('product_id', 'available')
+    )
+    products = Product.objects.in_bulk(totals)
+    return _variance_rows(products, {pid: (current.get(pid, 0), counted) for pid, counted in totals.items()})
+
+
+@retry_on_conflict('inventory.commit_count')
+def commit_count(company, user, count_id, zero_missing=False):
+    """Fija el stock de la sucursal según el conteo y guarda el reporte de diferencias.
+
+    Con `zero_missing` los productos con inventario en la sucursal que nadie contó quedan en 0.
+    """
+    count = StockCount.objects.select_for_update().select_related('branch').filter(company=company, pk=count_id).first()
+    if count is None:
+        raise ValidationError('Conteo inexistente')
+    if count.status != StockCount.STATUS_OPEN:
+        raise ValidationError('El conteo ya fue confirmado')
+    totals = _counted(count, zero_missing)
+    products = Product.objects.in_bulk(totals)
+    levels = set_stock_levels(
+        company, user, count.branch, {products[pid]: counted for pid, counted in totals.items()}, reason=f'Conteo #{count.pk}'
+    )
+    count.variance = _variance_rows(products, levels)
+    count.status = StockCount.STATUS_COMMITTED
+    count.committed_by = user
+    count.committed_at = timezone.now()
+    count.save(update_fields=['variance', 'status', 'committed_by', 'committed_at'])
+    return count
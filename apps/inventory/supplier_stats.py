@@ -0,0 +1,89 @@
+"""Estadísticas de compras por proveedor (`SupplierStats`) mantenidas al registrar cada compra.
+
+Los reportes de proveedores leen una fila por proveedor en vez de agregar todo el
+historial de compras con `COUNT(DISTINCT ...)` en cada request.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Max, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.core.data_versions import bump_data_version
+from apps.core.dates import as_date
+from apps.core.transactions import retry_on_conflict
+from .models import Purchase, PurchaseItem, Supplier, SupplierProduct, SupplierStats
+
+BULK_BATCH = 1000
+
+
+def record_purchase(purchase, product_ids):
+    """Suma una compra ya guardada (con `total_cost`) a las estadísticas de su proveedor.
+
+    Debe llamarse dentro de la transacción de la compra. La fila del proveedor se bloquea
+    antes de contar sus productos, por lo que dos compras simultáneas no pierden productos.
+    """
+    stats, _ = SupplierStats.objects.select_for_update().get_or_create(
+        supplier_id=purchase.supplier_id, defaults={'company_id': purchase.company_id}
+    )
+    SupplierProduct.objects.bulk_create(
+        [
+            SupplierProduct(company_id=purchase.company_id, supplier_id=purchase.supplier_id, product_id=product_id)
+            for product_id in set(product_ids)
+        ],
+        ignore_conflicts=True,
+    )
+    stats.total_purchases += 1
+    stats.total_spent += purchase.total_cost
+    # `purchase.date` queda como texto si el llamador creó la compra con un string.
+    stats.last_purchase = max(filter(None, [stats.last_purchase, as_date(purchase.date)]))
+    stats.products_count = SupplierProduct.objects.filter(supplier_id=purchase.supplier_id).count()
+    stats.save()
+
+
+@retry_on_conflict('inventory.rebuild_supplier_stats')
+def rebuild_supplier_stats(company_id, supplier_ids=None) -> int:
+    """Recalcula desde `Purchase` las estadísticas de la compañía (o de `supplier_ids`)."""
+    stats = SupplierStats.objects.filter(company_id=company_id)
+    supplied = SupplierProduct.objects.filter(company_id=company_id)
+    purchases = Purchase.objects.filter(company_id=company_id)
+    items = PurchaseItem.objects.filter(purchase__company_id=company_id)
+    if supplier_ids is not None:
+        stats = stats.filter(supplier_id__in=supplier_ids)
+        supplied = supplied.filter(supplier_id__in=supplier_ids)
+        purchases = purchases.filter(supplier_id__in=supplier_ids)
+        items = items.filter(purchase__supplier_id__in=supplier_ids)
+    stats.delete()
+    supplied.delete()
+    pairs = set(items.values_list('purchase__supplier_id', 'product_id').distinct())
+    SupplierProduct.objects.bulk_create(
+        [SupplierProduct(company_id=company_id, supplier_id=supplier_id, product_id=product_id) for supplier_id, product_id in pairs],
+        batch_size=BULK_BATCH,
+    )
+    products = {}
+    for supplier_id, _ in pairs:
+        products[supplier_id] = products.get(supplier_id, 0) + 1
+    totals = purchases.values('supplier_id').annotate(count=Count('id'), last=Max('date'), spent=Sum('total_cost'))
+    created = SupplierStats.objects.bulk_create(
+        [
+            SupplierStats(
+                supplier_id=row['supplier_id'], company_id=company_id, total_purchases=row['count'],
+                products_count=products.get(row['supplier_id'], 0), last_purchase=row['last'], total_spent=row['spent'] or 0,
+            )
+            for row in totals
+        ],
+        batch_size=BULK_BATCH,
+    )
+    bump_data_version(company_id)
+    return len(created)
+
+
+def supplier_report(company_id):
+    """Proveedores de la compañía con sus estadísticas (cero si aún no tienen compras)."""
+    return Supplier.objects.filter(company_id=company_id).annotate(
+        total_purchases=Coalesce(F('stats__total_purchases'), Value(0)),
+        products_count=Coalesce(F('stats__products_count'), Value(0)),
+        last_purchase=F('stats__last_purchase'),
+        total_spent=Coalesce(F('stats__total_spent'), Value(Decimal('0')), output_field=DecimalField(max_digits=14, decimal_places=2)),
+    )
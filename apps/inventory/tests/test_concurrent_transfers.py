@@ -0,0 +1,97 @@
+import threading
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase, override_settings
+
+from apps.core.models import Company
+from apps.core.transactions import current_view, reset_retry_stats, retry_on_conflict, retry_stats
+from apps.inventory.models import Branch, Inventory, InventoryMovement, Product
+from apps.inventory.services import transfer_between_branches
+
+User = get_user_model()
+
+
+@override_settings(TX_RETRY_ATTEMPTS=50, TX_RETRY_BASE_DELAY=0.001, TX_RETRY_MAX_DELAY=0.05)
+class ConcurrentTransferTests(TransactionTestCase):
+    def setUp(self):
+        reset_retry_stats()
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.north = Branch.objects.create(company=self.company, name='Norte', address='Calle 1')
+        self.south = Branch.objects.create(company=self.company, name='Sur', address='Calle 2')
+        self.products = [
+            Product.objects.create(company=self.company, sku=f'P{i}', name=f'Producto {i}', price=Decimal('100'), cost=Decimal('50'))
+            for i in range(2)
+        ]
+        for branch in (self.north, self.south):
+            for product in self.products:
+                Inventory.objects.create(company=self.company, branch=branch, product=product, stock=100)
+
+    def test_crossing_transfers_all_complete(self):
+        rounds = 10
+        errors = []
+
+        def worker(source, target):
+            try:
+                for i in range(rounds):
+                    product = self.products[i % len(self.products)]
+                    transfer_between_branches(self.company, self.user, source, target, product, 1)
+            except Exception as exc:  # noqa: BLE001 - se reporta en el hilo principal
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(self.north, self.south) if i % 2 else (self.south, self.north))
+            for i in range(6)
+        ]
+        # Cada reintento se registra en el logger; se captura para contrastarlo con los contadores.
+        with mock.patch('apps.core.transactions.logger') as logger:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(InventoryMovement.objects.count(), 6 * rounds * 2)
+        for product in self.products:
+            stocks = Inventory.objects.filter(product=product).values_list('stock', flat=True)
+            self.assertEqual(sum(stocks), 200)
+        stats = retry_stats()['inventory.transfer']
+        self.assertEqual(stats['attempts'] - stats.get('retries', 0), 6 * rounds)
+        self.assertNotIn('aborts', stats)
+        self.assertEqual(logger.warning.call_count, stats.get('retries', 0))
+        logger.error.assert_not_called()
+
+    def test_non_retryable_errors_propagate_and_retryable_ones_are_counted(self):
+        calls = []
+
+        @retry_on_conflict('test.flaky', attempts=3)
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('deadlock detected')
+            return 'ok'
+
+        token = current_view.set('sale-list')
+        try:
+            with self.assertLogs('apps.core.transactions', level='WARNING') as logs:
+                self.assertEqual(flaky(), 'ok')
+        finally:
+            current_view.reset(token)
+        self.assertEqual(retry_stats()['sale-list:test.flaky'], {'attempts': 3, 'retries': 2})
+        self.assertIn('sale-list:test.flaky reintento 1', logs.output[0])
+
+        @retry_on_conflict('test.broken', attempts=3)
+        def broken():
+            raise OperationalError('no such table: foo')
+
+        with self.assertRaises(OperationalError):
+            broken()
+        self.assertEqual(retry_stats()['test.broken'], {'attempts': 1})
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from apps.core.models import Company
+from apps.inventory.models import Branch, Inventory, InventoryMovement, MovementOutbox, Product
+from apps.inventory.outbox import flush_movements
+from apps.inventory.services import InsufficientStock, StockLine, apply_stock_changes
+
+User = get_user_model()
+
+
+@override_settings(INVENTORY_MOVEMENT_WRITE_BEHIND=True)
+class MovementOutboxTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        self.products = [
+            Product.objects.create(company=self.company, sku=f'P{i}', name=f'Producto {i}', price=Decimal('100'), cost=Decimal('50'))
+            for i in range(3)
+        ]
+        for product in self.products:
+            Inventory.objects.create(company=self.company, branch=self.branch, product=product, stock=10)
+
+    def _sell(self, quantity=1):
+        apply_stock_changes(
+            self.company,
+            [StockLine(self.branch, product, -quantity) for product in self.products],
+            InventoryMovement.MOV_SALE,
+            self.user,
+            reason='Venta',
+        )
+
+    def test_movements_are_buffered_until_flushed(self):
+        self._sell()
+        self._sell()
+        self.assertEqual(MovementOutbox.objects.count(), 2)
+        self.assertFalse(InventoryMovement.objects.exists())
+
+        pending_at = MovementOutbox.objects.order_by('id').first().payload[0]['at']
+        self.assertEqual(InventoryMovement.objects.flushed().count(), 6)
+        self.assertFalse(MovementOutbox.objects.exists())
+        first = InventoryMovement.objects.order_by('id').first()
+        self.assertEqual(first.created_at.isoformat(), pending_at)
+        self.assertEqual(first.created_by, self.user)
+        self.assertEqual(flush_movements(), 0)
+
+    def test_rolled_back_changes_leave_no_outbox_rows(self):
+        Inventory.objects.filter(product=self.products[2]).update(stock=0)
+        with self.assertRaises(InsufficientStock):
+            self._sell()
+        self.assertFalse(MovementOutbox.objects.exists())
+
+    def test_flush_splits_large_outboxes_in_batches(self):
+        for _ in range(5):
+            self._sell()
+        self.assertEqual(flush_movements(batch_size=2), 15)
+        self.assertEqual(InventoryMovement.objects.count(), 15)
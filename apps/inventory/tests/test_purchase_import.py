@@ -0,0 +1,89 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.core.models import Company, Plan, PlanFeature, Subscription
+from apps.inventory.models import Branch, Inventory, InventoryMovement, Product, Purchase, PurchaseItem, Supplier, SupplierStats
+from apps.inventory.services import import_purchase_csv
+
+User = get_user_model()
+
+
+class PurchaseImportTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        Subscription.objects.create(
+            company=self.company,
+            plan=plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        self.supplier = Supplier.objects.create(
+            company=self.company, name='Proveedor', rut='76543210-3', contact_name='Ana', contact_email='a@example.com',
+            contact_phone='123',
+        )
+        self.products = [
+            Product.objects.create(company=self.company, sku=f'P{i}', name=f'Producto {i}', price=Decimal('100'), cost=Decimal('50'))
+            for i in range(3)
+        ]
+        Inventory.objects.create(company=self.company, branch=self.branch, product=self.products[0], stock=4)
+
+    def test_valid_rows_are_imported_and_invalid_rows_reported(self):
+        lines = StringIO('sku;cantidad;costo\nP0;5;10,5\nNOEXISTE;1;1\nP1;0;3\nP1;2;abc\nP0;1;10\n\nP2;3;7\n')
+        result = import_purchase_csv(self.user, self.branch, self.supplier, date.today(), lines, chunk_size=2)
+        self.assertEqual(result.rows, 3)
+        self.assertEqual([(e['line'], e['sku']) for e in result.errors], [(3, 'NOEXISTE'), (4, 'P1'), (5, 'P1')])
+        self.assertEqual(result.purchase.total_cost, Decimal('83.50'))
+        self.assertEqual(PurchaseItem.objects.filter(purchase=result.purchase).count(), 3)
+        self.assertEqual(Inventory.objects.get(branch=self.branch, product=self.products[0]).stock, 10)
+        self.assertEqual(Inventory.objects.get(branch=self.branch, product=self.products[2]).stock, 3)
+        self.assertEqual(InventoryMovement.objects.filter(movement_type=InventoryMovement.MOV_PURCHASE).count(), 3)
+
+    def test_command_writes_error_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'factura.csv')
+            errors = os.path.join(tmp, 'errores.csv')
+            with open(path, 'w', encoding='utf-8') as handle:
+                handle.write('sku,quantity,unit_cost\nP1,2,5\nX9,1,1\n')
+            out = StringIO()
+            call_command(
+                'import_purchases', path, user='gerente', branch=self.branch.pk, supplier=self.supplier.pk, errors=errors,
+                stdout=out, stderr=StringIO(),
+            )
+            with open(errors, encoding='utf-8') as handle:
+                report = handle.read()
+        self.assertIn('1 filas importadas', out.getvalue())
+        self.assertIn('X9,SKU inexistente', report)
+        self.assertEqual(Inventory.objects.get(branch=self.branch, product=self.products[1]).stock, 2)
+
+    def _upload(self, day):
+        upload = SimpleUploadedFile('factura.csv', b'sku,quantity,unit_cost\nP0,2,5\n', content_type='text/csv')
+        data = {'branch': self.branch.pk, 'supplier': self.supplier.pk, 'date': day, 'file': upload}
+        return self.client.post(reverse('purchase_import'), data)
+
+    def test_web_import_parses_date(self):
+        inventory, _ = PlanFeature.objects.get_or_create(code='inventory', defaults={'label': 'Inventario'})
+        Plan.objects.get(code='PRUEBA').features.add(inventory)
+        self.client.force_login(self.user)
+        self.assertEqual(self._upload('2024-03-01').status_code, 200)
+        self.assertEqual(self._upload('2024-03-05').status_code, 200)
+        self.assertEqual(SupplierStats.objects.get(supplier=self.supplier).last_purchase, date(2024, 3, 5))
+
+        response = self._upload('garbage')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Fecha inválida; usa el formato AAAA-MM-DD.', response.context['form_errors'])
+        self.assertEqual(Purchase.objects.count(), 2)
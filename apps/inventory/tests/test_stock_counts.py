@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.core.models import Company, Plan, Subscription
+from apps.inventory.models import Branch, Inventory, InventoryMovement, InventoryStripe, Product, StockCount
+
+User = get_user_model()
+
+
+class StockCountTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        Subscription.objects.create(
+            company=self.company,
+            plan=plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        self.products = [
+            Product.objects.create(company=self.company, sku=f'P{i}', name=f'Producto {i}', price=Decimal('100'), cost=Decimal('50'))
+            for i in range(4)
+        ]
+        for product in self.products[:3]:
+            Inventory.objects.create(company=self.company, branch=self.branch, product=product, stock=10)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        response = self.api.post(reverse('stock-count-list'), {'branch': self.branch.pk}, format='json')
+        self.count_id = response.data['id']
+
+    def _stock(self, product):
+        return Inventory.objects.get(branch=self.branch, product=product).stock
+
+    def _upload_csv(self, body, scanner):
+        url = reverse('stock-count-entries', args=[self.count_id]) + f'?scanner={scanner}'
+        return self.api.generic('POST', url, body, content_type='text/csv')
+
+    def test_scanners_are_summed_and_committed_in_bulk(self):
+        response = self._upload_csv('sku,cantidad\nP0,4\nP0,3\nP1,12\nXX,1\nP2,-1\n', 'A')
+        self.assertEqual(response.data['loaded'], 2)
+        self.assertEqual([e['sku'] for e in response.data['errors']], ['XX', 'P2'])
+        # Reenviar el mismo archivo no duplica el conteo del lector.
+        self._upload_csv('sku,cantidad\nP0,4\nP0,3\nP1,12\n', 'A')
+        url = reverse('stock-count-entries', args=[self.count_id])
+        payload = {'scanner': 'B', 'items': [{'product': self.products[0].pk, 'quantity': 1}, {'sku': 'P3', 'quantity': 5}]}
+        self.assertEqual(self.api.post(url, payload, format='json').data['loaded'], 2)
+
+        preview = self.api.get(reverse('stock-count-variance', args=[self.count_id])).data
+        self.assertEqual({row['sku']: row['difference'] for row in preview}, {'P0': -2, 'P1': 2, 'P3': 5})
+
+        response = self.api.post(reverse('stock-count-commit', args=[self.count_id]), {'zero_missing': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        variance = {row['sku']: row for row in response.data['variance']}
+        self.assertEqual(variance['P2']['counted'], 0)
+        self.assertEqual(variance['P0']['cost_impact'], '-100.00')
+        self.assertEqual([self._stock(p) for p in self.products], [8, 12, 0, 5])
+        self.assertEqual(InventoryMovement.objects.filter(movement_type=InventoryMovement.MOV_ADJUST).count(), 4)
+        self.assertEqual(StockCount.objects.get(pk=self.count_id).status, StockCount.STATUS_COMMITTED)
+
+        self.assertEqual(self.api.post(reverse('stock-count-commit', args=[self.count_id])).status_code, 400)
+        self.assertEqual(self._upload_csv('sku,cantidad\nP0,1\n', 'A').status_code, 400)
+
+    def test_commit_folds_ledger_stripes(self):
+        InventoryStripe.objects.create(company=self.company, branch=self.branch, product=self.products[0], stripe=0, allowance=6, consumed=2)
+        self._upload_csv('sku,quantity\nP0,9\n', 'A')
+        response = self.api.post(reverse('stock-count-commit', args=[self.count_id]))
+        self.assertEqual(response.data['variance'][0]['expected'], 14)
+        self.assertEqual(self._stock(self.products[0]), 9)
+        self.assertFalse(InventoryStripe.objects.exists())
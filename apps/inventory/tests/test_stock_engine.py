@@ -0,0 +1,255 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.models import Company, Plan, Subscription
+from apps.inventory import services
+from apps.inventory.models import Branch, Inventory, InventoryMovement, InventoryStripe, Product, StockReservation
+from apps.inventory.services import (
+    InsufficientStock, StockLine, apply_stock_changes, rebalance_stripes, reserve_stock, sweep_expired_reservations,
+)
+from apps.sales.models import CartItem, Sale
+from apps.sales.services import create_sale
+
+User = get_user_model()
+
+
+class StockEngineTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        Subscription.objects.create(
+            company=self.company,
+            plan=plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        self.other_branch = Branch.objects.create(company=self.company, name='Norte', address='Calle 2')
+        self.products = [
+            Product.objects.create(company=self.company, sku=f'P{i}', name=f'Producto {i}', price=Decimal('100'), cost=Decimal('50'))
+            for i in range(30)
+        ]
+        for product in self.products:
+            Inventory.objects.create(company=self.company, branch=self.branch, product=product, stock=10)
+
+    def _sale(self, count, quantity=1):
+        items = [{'product': p, 'quantity': quantity, 'unit_price': p.price} for p in self.products[:count]]
+        return create_sale({'branch': self.branch, 'payment_method': 'efectivo', 'items': items}, self.user)
+
+    def test_sale_query_count_does_not_grow_with_lines(self):
+        # En PostgreSQL se suma el advisory lock compartido de los rollups.
+        queries = 12 if connection.vendor == 'postgresql' else 11
+        with self.assertNumQueries(queries):
+            self._sale(1)
+        with self.assertNumQueries(queries):
+            sale = self._sale(30)
+        self.assertEqual(sale.total, Decimal('3000'))
+        self.assertEqual(Inventory.objects.get(branch=self.branch, product=self.products[0]).stock, 8)
+        self.assertEqual(InventoryMovement.objects.filter(movement_type=InventoryMovement.MOV_SALE).count(), 31)
+
+    def test_insufficient_stock_rolls_back_whole_batch(self):
+        Inventory.objects.filter(product=self.products[5]).update(stock=0)
+        with self.assertRaises(InsufficientStock) as ctx:
+            self._sale(10)
+        self.assertEqual(ctx.exception.line.product, self.products[5])
+        self.assertFalse(Sale.objects.exists())
+        self.assertEqual(Inventory.objects.get(branch=self.branch, product=self.products[0]).stock, 10)
+        self.assertFalse(InventoryMovement.objects.exists())
+
+    def test_repeated_lines_are_aggregated_per_row(self):
+        product = self.products[0]
+        inventories = apply_stock_changes(
+            self.company,
+            [
+                StockLine(self.branch, product, -4),
+                StockLine(self.branch, product, -4),
+                StockLine(self.other_branch, product, 8),
+            ],
+            InventoryMovement.MOV_TRANSFER,
+            self.user,
+            create_missing=True,
+        )
+        self.assertEqual(inventories[(self.branch.pk, product.pk)].stock, 2)
+        self.assertEqual(Inventory.objects.get(branch=self.other_branch, product=product).stock, 8)
+        self.assertEqual(InventoryMovement.objects.count(), 3)
+
+    @override_settings(STOCK_CONCURRENCY_MODE='conditional')
+    def test_conditional_mode_rolls_back_when_any_line_is_short(self):
+        sale = self._sale(3, quantity=4)
+        self.assertEqual(Inventory.objects.get(branch=self.branch, product=self.products[2]).stock, 6)
+        Inventory.objects.filter(product=self.products[2]).update(stock=1)
+        with self.assertRaises(InsufficientStock) as ctx:
+            self._sale(3, quantity=2)
+        self.assertEqual(ctx.exception.available, 1)
+        self.assertEqual(list(Sale.objects.all()), [sale])
+        self.assertEqual(Inventory.objects.get(branch=self.branch, product=self.products[0]).stock, 6)
+
+    def test_adjust_endpoint_rejects_negative_stock(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('inventory-adjust')
+        payload = {'branch': self.branch.pk, 'product': self.products[0].pk, 'quantity_delta': -11, 'reason': 'Conteo'}
+        response = client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        payload['quantity_delta'] = -3
+        response = client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock'], 7)
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        self.product = Product.objects.create(
+            company=self.company, sku='HOT', name='Producto estrella', price=Decimal('100'), cost=Decimal('50'), stock_ledger=True
+        )
+        self.inventory = Inventory.objects.create(company=self.company, branch=self.branch, product=self.product, stock=20)
+        rebalance_stripes(self.company, self.branch.pk, self.product.pk, stripes=3)
+
+    def _sell(self, quantity):
+        apply_stock_changes(
+            self.company, [StockLine(self.branch, self.product, -quantity)], InventoryMovement.MOV_SALE, self.user
+        )
+
+    def _available(self):
+        return Inventory.objects.with_available().get(pk=self.inventory.pk).available
+
+    def test_sales_consume_stripes_without_touching_inventory_row(self):
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.stock, 5)
+        lock = mock.patch('apps.inventory.services._lock_inventories', wraps=services._lock_inventories)
+        with lock as locked, CaptureQueriesContext(connection) as queries:
+            self._sell(4)
+        locked.assert_not_called()
+        locks = [q['sql'] for q in queries if 'FOR UPDATE' in q['sql'] and 'inventory_inventory' in q['sql']]
+        self.assertEqual(locks, [])
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.stock, 5)
+        self.assertEqual(self._available(), 16)
+        self.assertEqual(self.inventory.available_stock, 16)
+
+    def test_stripes_never_oversell(self):
+        self._sell(12)
+        self.assertEqual(self._available(), 8)
+        with self.assertRaises(InsufficientStock):
+            self._sell(9)
+        self._sell(8)
+        self.assertEqual(self._available(), 0)
+        with self.assertRaises(InsufficientStock):
+            self._sell(1)
+
+    def test_negative_adjust_reports_available_stock(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = {'branch': self.branch.pk, 'product': self.product.pk, 'quantity_delta': -2, 'reason': 'Merma'}
+        response = client.post(reverse('inventory-adjust'), payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock'], 18)
+        self.assertEqual(self._available(), 18)
+
+    def test_compactor_folds_consumed_deltas(self):
+        self._sell(6)
+        call_command('compact_stock_ledger', stripes=2, stdout=StringIO())
+        self.inventory.refresh_from_db()
+        self.assertEqual(self._available(), 14)
+        self.assertEqual(InventoryStripe.objects.filter(product=self.product).count(), 2)
+        self.assertFalse(InventoryStripe.objects.filter(consumed__gt=0).exists())
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        Subscription.objects.create(
+            company=self.company,
+            plan=plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.buyer = User.objects.create_user(
+            username='cliente', password='pass1234', role=User.ROLE_VENDEDOR, email='c@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.seller = User.objects.create_user(
+            username='vendedor', password='pass1234', role=User.ROLE_VENDEDOR, email='v@example.com', rut='22222222-2',
+            company=self.company,
+        )
+        self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        self.product = Product.objects.create(company=self.company, sku='P1', name='Producto', price=Decimal('100'), cost=Decimal('50'))
+        Inventory.objects.create(company=self.company, branch=self.branch, product=self.product, stock=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def _sell(self, quantity):
+        items = [{'product': self.product, 'quantity': quantity, 'unit_price': self.product.price}]
+        return create_sale({'branch': self.branch, 'payment_method': 'efectivo', 'items': items}, self.seller)
+
+    def test_reserved_stock_is_not_available_to_others(self):
+        response = self.client.post(
+            reverse('cart-add'), {'product': self.product.pk, 'quantity': 4, 'branch_id': self.branch.pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('reserved_until', response.data)
+        with self.assertRaises(InsufficientStock):
+            self._sell(2)
+        self._sell(1)
+        with self.assertRaises(InsufficientStock):
+            reserve_stock(self.company, self.seller, self.branch, [(self.product, 1)])
+
+    @override_settings(STOCK_CONCURRENCY_MODE='conditional')
+    def test_conditional_guard_counts_reservations_in_update(self):
+        reserve_stock(self.company, self.buyer, self.branch, [(self.product, 4)])
+        with CaptureQueriesContext(connection) as queries, self.assertRaises(InsufficientStock) as ctx:
+            self._sell(2)
+        self.assertEqual(ctx.exception.available, 1)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "inventory_inventory"')]
+        self.assertIn('inventory_stockreservation', updates[0])
+        self._sell(1)
+        self.assertEqual(Inventory.objects.get(product=self.product).stock, 4)
+
+    def test_checkout_converts_reservation(self):
+        self.client.post(reverse('cart-add'), {'product': self.product.pk, 'quantity': 5}, format='json')
+        self.assertEqual(self.client.post(reverse('cart-reserve'), {'branch_id': self.branch.pk}, format='json').status_code, 200)
+        response = self.client.post(reverse('cart-checkout'), {'branch_id': self.branch.pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Inventory.objects.get(product=self.product).stock, 0)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_web_checkout_reserves_only_on_post(self):
+        CartItem.objects.create(user=self.buyer, product=self.product, quantity=2)
+        web = Client()
+        web.force_login(self.buyer)
+        url = reverse('shop-checkout')
+        response = web.get(url, {'branch': self.branch.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(StockReservation.objects.exists())
+        response = web.post(url, {'branch': self.branch.pk, 'step': 'reserve'})
+        self.assertRedirects(response, f'{url}?branch={self.branch.pk}')
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+        self.assertIsNotNone(web.get(url, {'branch': self.branch.pk}).context['reserved_until'])
+
+    def test_expired_reservations_are_swept(self):
+        reserve_stock(self.company, self.buyer, self.branch, [(self.product, 5)], ttl=60)
+        self.assertEqual(sweep_expired_reservations(), 0)
+        self.assertEqual(sweep_expired_reservations(now=timezone.now() + timedelta(minutes=2)), 1)
+        self._sell(5)
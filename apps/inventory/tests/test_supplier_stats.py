@@ -0,0 +1,103 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.core.models import Company, Plan, PlanFeature, Subscription
+from apps.inventory.models import Branch, Product, Purchase, Supplier, SupplierStats
+from apps.inventory.services import create_purchase
+from apps.inventory.supplier_stats import record_purchase
+
+User = get_user_model()
+
+
+class SupplierStatsTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        reports, _ = PlanFeature.objects.get_or_create(code='reports', defaults={'label': 'Reportes'})
+        plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        plan.features.add(reports)
+        Subscription.objects.create(
+            company=self.company,
+            plan=plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        self.suppliers = [
+            Supplier.objects.create(
+                company=self.company, name=name, rut=rut, contact_name='Ana', contact_email='a@example.com', contact_phone='123'
+            )
+            for name, rut in (('Alfa', '76543210-3'), ('Beta', '11111111-1'))
+        ]
+        self.products = [
+            Product.objects.create(company=self.company, sku=f'P{i}', name=f'Producto {i}', price=Decimal('100'), cost=Decimal('50'))
+            for i in range(3)
+        ]
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def _purchase(self, products, days_ago=0, supplier=None):
+        return create_purchase(
+            {
+                'branch': self.branch,
+                'supplier': supplier or self.suppliers[0],
+                'date': date.today() - timedelta(days=days_ago),
+                'items': [{'product': p, 'quantity': 2, 'unit_cost': Decimal('10')} for p in products],
+            },
+            self.user,
+        )
+
+    def _report(self):
+        return {row['name']: row for row in self.api.get(reverse('report-suppliers')).json()}
+
+    def test_purchases_update_stats_and_rebuild_matches(self):
+        self._purchase(self.products[:2])
+        self._purchase(self.products[1:], days_ago=5)
+        report = self._report()
+        self.assertEqual(
+            (report['Alfa']['total_purchases'], report['Alfa']['products_count'], report['Alfa']['last_purchase']),
+            (2, 3, date.today().isoformat()),
+        )
+        self.assertEqual(Decimal(str(report['Alfa']['total_spent'])), Decimal('80'))
+        self.assertEqual((report['Beta']['total_purchases'], report['Beta']['last_purchase']), (0, None))
+
+        incremental = list(SupplierStats.objects.values())
+        SupplierStats.objects.all().delete()
+        call_command('rebuild_supplier_stats', stdout=StringIO())
+        self.assertEqual(list(SupplierStats.objects.values()), incremental)
+
+    def test_deleting_purchase_recomputes_supplier(self):
+        self._purchase(self.products[:1])
+        latest = self._purchase(self.products[1:])
+        response = self.api.delete(reverse('purchase-detail', args=[latest.pk]))
+        self.assertEqual(response.status_code, 204)
+        stats = SupplierStats.objects.get(supplier=self.suppliers[0])
+        self.assertEqual((stats.total_purchases, stats.products_count, stats.total_spent), (1, 1, Decimal('20.00')))
+
+    def test_suppliers_page_without_company(self):
+        root = User.objects.create_user(
+            username='root', password='pass1234', role=User.ROLE_SUPER_ADMIN, email='r@example.com', rut='99999999-9',
+        )
+        self.client.force_login(root)
+        response = self.client.get(reverse('report_suppliers'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['suppliers']), [])
+
+    def test_record_purchase_accepts_text_dates(self):
+        self._purchase(self.products[:1], days_ago=3)
+        purchase = Purchase.objects.create(
+            company=self.company, branch=self.branch, supplier=self.suppliers[0], date=date.today().isoformat(),
+            created_by=self.user, total_cost=Decimal('5'),
+        )
+        record_purchase(purchase, [self.products[1].pk])
+        self.assertEqual(SupplierStats.objects.get(supplier=self.suppliers[0]).last_purchase, date.today())
@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.core.models import Company, Plan, PlanFeature, Subscription
+from apps.inventory.models import Branch, Inventory, InventoryMovement, Product, TransferDocument
+from apps.inventory.services import create_transfer
+
+User = get_user_model()
+
+
+class TransferDocumentTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        inventory, _ = PlanFeature.objects.get_or_create(code='inventory', defaults={'label': 'Inventario'})
+        plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        plan.features.add(inventory)
+        Subscription.objects.create(
+            company=self.company,
+            plan=plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.source = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        self.target = Branch.objects.create(company=self.company, name='Norte', address='Calle 2')
+        self.products = [
+            Product.objects.create(company=self.company, sku=f'P{i}', name=f'Producto {i}', price=Decimal('100'), cost=Decimal('50'))
+            for i in range(20)
+        ]
+        for product in self.products:
+            Inventory.objects.create(company=self.company, branch=self.source, product=product, stock=10)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def _stock(self, branch, product):
+        row = Inventory.objects.filter(branch=branch, product=product).first()
+        return row.stock if row else 0
+
+    def test_query_count_does_not_grow_with_lines(self):
+        with CaptureQueriesContext(connection) as small:
+            create_transfer(self.company, self.user, self.source, self.target, [(self.products[0], 1)])
+        with CaptureQueriesContext(connection) as large:
+            create_transfer(self.company, self.user, self.source, self.target, [(p, 1) for p in self.products])
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(self._stock(self.target, self.products[0]), 2)
+        self.assertEqual(InventoryMovement.objects.filter(movement_type=InventoryMovement.MOV_TRANSFER).count(), 42)
+
+    def test_in_transit_document_credits_target_on_receipt(self):
+        payload = {
+            'source': self.source.pk,
+            'target': self.target.pk,
+            'in_transit': True,
+            'lines': [{'product': self.products[0].pk, 'quantity': 4}, {'product': self.products[1].pk, 'quantity': 2}],
+        }
+        response = self.api.post(reverse('transfer-list'), payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], TransferDocument.STATUS_IN_TRANSIT)
+        self.assertEqual(self._stock(self.source, self.products[0]), 6)
+        self.assertEqual(self._stock(self.target, self.products[0]), 0)
+
+        url = reverse('transfer-receive', args=[response.data['id']])
+        self.assertEqual(self.api.post(url).status_code, 200)
+        self.assertEqual(self._stock(self.target, self.products[0]), 4)
+        self.assertEqual(self._stock(self.target, self.products[1]), 2)
+        self.assertEqual(self.api.post(url).status_code, 400)
+
+    def test_insufficient_stock_rejects_whole_document(self):
+        payload = {
+            'source': self.source.pk,
+            'target': self.target.pk,
+            'lines': [{'product': self.products[0].pk, 'quantity': 3}, {'product': self.products[1].pk, 'quantity': 11}],
+        }
+        response = self.api.post(reverse('transfer-list'), payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._stock(self.source, self.products[0]), 10)
+        self.assertFalse(TransferDocument.objects.exists())
+
+    def test_web_form_submits_several_lines(self):
+        self.client.login(username='gerente', password='pass1234')
+        response = self.client.post(reverse('inventory_transfer'), {
+            'source_branch': self.source.pk,
+            'target_branch': self.target.pk,
+            'item_product': [self.products[0].pk, self.products[1].pk],
+            'item_quantity': ['3', '5'],
+        })
+        self.assertRedirects(response, reverse('inventory_transfer'))
+        self.assertEqual(self._stock(self.target, self.products[0]), 3)
+        self.assertEqual(self._stock(self.target, self.products[1]), 5)
+        self.assertEqual(self.client.get(reverse('inventory_transfer')).status_code, 200)
@@ -1,6 +1,9 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path
-from .views import ProductViewSet, BranchViewSet, InventoryViewSet, InventoryAdjustView, SupplierViewSet, PurchaseViewSet
+from .views import (
+    ProductViewSet, BranchViewSet, InventoryViewSet, InventoryAdjustView, SupplierViewSet, PurchaseViewSet,
+    StockCountViewSet, TransferDocumentViewSet,
+)
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet, basename='product')
@@ -8,7 +11,10 @@ router.register(r'branches', BranchViewSet, basename='branch')
 router.register(r'inventory', InventoryViewSet, basename='inventory')
 router.register(r'suppliers', SupplierViewSet, basename='supplier')
 router.register(r'purchases', PurchaseViewSet, basename='purchase')
+router.register(r'transfers', TransferDocumentViewSet, basename='transfer')
+router.register(r'stock-counts', StockCountViewSet, basename='stock-count')
 
-urlpatterns = router.urls + [
+# La ruta de ajuste va antes que el router para que `inventory/<pk>/` no la capture.
+urlpatterns = [
     path('inventory/adjust/', InventoryAdjustView.as_view(), name='inventory-adjust'),
-]
+] + router.urls
@@ -1,16 +1,21 @@
+import codecs
+
+from django.db import transaction
 from rest_framework import viewsets, status, generics
 from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.db import transaction
 from apps.core.permissions import IsActive
 from apps.accounts.permissions import IsAdminOrGerente, IsInternal, IsAdminOrSuper
-from .models import Product, Branch, Inventory, InventoryMovement, Supplier, Purchase, PurchaseItem
+from .models import Product, Branch, Inventory, Supplier, Purchase, StockCount, TransferDocument
 from .serializers import (
     ProductSerializer, BranchSerializer, InventorySerializer, InventoryAdjustSerializer,
-    SupplierSerializer, PurchaseSerializer
+    SupplierSerializer, PurchaseSerializer, StockCountSerializer, TransferDocumentSerializer
 )
+from .services import InsufficientStock, adjust_stock, create_purchase, create_transfer, iter_csv_rows, receive_transfer
+from .stocktake import COUNT_CSV_COLUMNS, commit_count, record_count_entries, variance_report
+from .supplier_stats import rebuild_supplier_stats
 
 
 class ProductViewSet(viewsets.ModelViewSet):
@@ -26,7 +31,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         qs = Product.objects.all()
         if self.action in ['list', 'retrieve']:
             return qs
-        return qs.filter(company=self.request.user.company)
+        return qs.filter(company_id=self.request.user.company_id)
 
     def perform_create(self, serializer):
         serializer.save(company=self.request.user.company)
@@ -44,24 +49,24 @@ class BranchViewSet(viewsets.ModelViewSet):
         return [IsActive(), IsInternal()]
 
     def get_queryset(self):
-        return Branch.objects.filter(company=self.request.user.company)
+        return Branch.objects.filter(company_id=self.request.user.company_id)
 
     def perform_create(self, serializer):
         user = self.request.user
         if not user.company:
             raise ValidationError('El usuario debe tener una compañía asignada')
-        subscription = getattr(user.company, 'subscription', None)
-        if subscription and subscription.branch_limit:
-            if Branch.objects.filter(company=user.company).count() >= subscription.branch_limit:
+        branch_limit = self.request.entitlements.branch_limit
+        if branch_limit:
+            if Branch.objects.filter(company=user.company).count() >= branch_limit:
                 raise ValidationError('Límite de sucursales alcanzado para el plan actual')
         serializer.save(company=user.company)
 
     @action(detail=True, methods=['get'], url_path='inventory')
     def inventory(self, request, pk=None):
         branch = self.get_object()
-        inventories = Inventory.objects.filter(company=request.user.company, branch=branch)
-        serializer = InventorySerializer(inventories, many=True)
-        return Response(serializer.data)
+        inventories = Inventory.objects.filter(company=request.user.company, branch=branch).with_available()
+        page = self.paginate_queryset(inventories)
+        return self.get_paginated_response(InventorySerializer(page, many=True).data)
 
 
 class InventoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -69,7 +74,7 @@ class InventoryViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsActive, IsInternal]
 
     def get_queryset(self):
-        qs = Inventory.objects.filter(company=self.request.user.company)
+        qs = Inventory.objects.filter(company_id=self.request.user.company_id).with_available()
         branch_id = self.request.query_params.get('branch')
         if branch_id:
             qs = qs.filter(branch_id=branch_id)
@@ -88,23 +93,11 @@ class InventoryAdjustView(generics.GenericAPIView):
         qty = data['quantity_delta']
         if branch.company != request.user.company or product.company != request.user.company:
             return Response({'detail': 'Operación inválida'}, status=status.HTTP_400_BAD_REQUEST)
-        inventory, _ = Inventory.objects.get_or_create(company=request.user.company, branch=branch, product=product, defaults={'stock': 0})
-        new_stock = inventory.stock + qty
-        if new_stock < 0:
+        try:
+            inventory = adjust_stock(request.user.company, request.user, branch, product, qty, data.get('reason', ''))
+        except InsufficientStock:
             return Response({'detail': 'Stock no puede ser negativo'}, status=status.HTTP_400_BAD_REQUEST)
-        with transaction.atomic():
-            inventory.stock = new_stock
-            inventory.save()
-            InventoryMovement.objects.create(
-                company=request.user.company,
-                branch=branch,
-                product=product,
-                movement_type=InventoryMovement.MOV_ADJUST,
-                quantity_delta=qty,
-                reason=data.get('reason', ''),
-                created_by=request.user,
-            )
-        return Response({'detail': 'Ajuste aplicado', 'stock': inventory.stock})
+        return Response({'detail': 'Ajuste aplicado', 'stock': inventory.available})
 
 
 class SupplierViewSet(viewsets.ModelViewSet):
@@ -112,7 +105,7 @@ class SupplierViewSet(viewsets.ModelViewSet):
     permission_classes = [IsActive, IsAdminOrGerente]
 
     def get_queryset(self):
-        return Supplier.objects.filter(company=self.request.user.company)
+        return Supplier.objects.filter(company_id=self.request.user.company_id)
 
     def perform_create(self, serializer):
         serializer.save(company=self.request.user.company)
@@ -121,38 +114,114 @@ class SupplierViewSet(viewsets.ModelViewSet):
 class PurchaseViewSet(viewsets.ModelViewSet):
     serializer_class = PurchaseSerializer
     permission_classes = [IsActive, IsAdminOrGerente]
+    # La fecha se repite mucho y el cursor de DRF solo usa el primer campo: se pagina por id.
+    cursor_ordering = '-id'
 
     def get_queryset(self):
-        return Purchase.objects.filter(company=self.request.user.company)
+        return Purchase.objects.filter(company_id=self.request.user.company_id)
 
     def perform_create(self, serializer):
-        user = self.request.user
-        items_data = serializer.validated_data.pop('items')
-        branch = serializer.validated_data['branch']
-        supplier = serializer.validated_data['supplier']
-        if branch.company != user.company or supplier.company != user.company:
-            raise ValidationError('Sucursal o proveedor inválido')
-        purchase = Purchase.objects.create(company=user.company, created_by=user, **serializer.validated_data)
-        total = 0
-        with transaction.atomic():
-            for item in items_data:
-                product = item['product']
-                quantity = item['quantity']
-                unit_cost = item['unit_cost']
-                total += quantity * unit_cost
-                PurchaseItem.objects.create(purchase=purchase, **item)
-                inventory, _ = Inventory.objects.get_or_create(company=user.company, branch=purchase.branch, product=product, defaults={'stock': 0})
-                inventory.stock += quantity
-                inventory.save()
-                InventoryMovement.objects.create(
-                    company=user.company,
-                    branch=purchase.branch,
-                    product=product,
-                    movement_type=InventoryMovement.MOV_PURCHASE,
-                    quantity_delta=quantity,
-                    reason='Compra',
-                    created_by=user,
-                )
-        purchase.total_cost = total
-        purchase.save()
+        purchase = create_purchase(serializer.validated_data, self.request.user)
+        serializer.instance = purchase
         return purchase
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous = serializer.instance.supplier_id
+        purchase = serializer.save()
+        rebuild_supplier_stats(purchase.company_id, {previous, purchase.supplier_id})
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+        rebuild_supplier_stats(instance.company_id, [instance.supplier_id])
+
+
+class TransferDocumentViewSet(viewsets.ModelViewSet):
+    serializer_class = TransferDocumentSerializer
+    permission_classes = [IsActive, IsAdminOrGerente]
+    http_method_names = ['get', 'post', 'head', 'options']
+    cursor_ordering = '-id'
+
+    def get_queryset(self):
+        qs = TransferDocument.objects.filter(company_id=self.request.user.company_id).prefetch_related('lines')
+        status_param = self.request.query_params.get('status')
+        if status_param:
+            qs = qs.filter(status=status_param)
+        return qs
+
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        company = self.request.user.company
+        products = [line['product'] for line in data['lines']]
+        if data['source'].company != company or data['target'].company != company or any(p.company_id != company.id for p in products):
+            raise ValidationError('Sucursal o producto inválido para esta compañía')
+        try:
+            serializer.instance = create_transfer(
+                company,
+                self.request.user,
+                data['source'],
+                data['target'],
+                [(line['product'], line['quantity']) for line in data['lines']],
+                note=data.get('note', ''),
+                in_transit=data['in_transit'],
+            )
+        except InsufficientStock as exc:
+            raise ValidationError(f'Stock insuficiente en origen para {exc.line.product.name}')
+
+    @action(detail=True, methods=['post'])
+    def receive(self, request, pk=None):
+        document = receive_transfer(request.user.company, request.user, pk)
+        return Response(self.get_serializer(document).data)
+
+
+class StockCountViewSet(viewsets.ModelViewSet):
+    """Conteos físicos: los lectores cargan cantidades en `entries` y un gerente confirma con `commit`."""
+
+    serializer_class = StockCountSerializer
+    http_method_names = ['get', 'post', 'head', 'options']
+    cursor_ordering = '-id'
+
+    def get_permissions(self):
+        if self.action in ('entries', 'list', 'retrieve'):
+            return [IsActive(), IsInternal()]
+        return [IsActive(), IsAdminOrGerente()]
+
+    def get_queryset(self):
+        return StockCount.objects.filter(company_id=self.request.user.company_id)
+
+    def perform_create(self, serializer):
+        if serializer.validated_data['branch'].company_id != self.request.user.company_id:
+            raise ValidationError('Sucursal inválida para esta compañía')
+        serializer.save(company=self.request.user.company, created_by=self.request.user)
+
+    def _count_rows(self, request):
+        """Filas del envío: CSV en el cuerpo o en `file`, o JSON con `items`."""
+        if request.content_type.startswith('text/csv'):
+            return iter_csv_rows(codecs.iterdecode(request.stream, 'utf-8-sig'), COUNT_CSV_COLUMNS, ('quantity',))
+        if 'file' in request.FILES:
+            return iter_csv_rows(codecs.iterdecode(request.FILES['file'], 'utf-8-sig'), COUNT_CSV_COLUMNS, ('quantity',))
+        items = request.data if isinstance(request.data, list) else request.data.get('items')
+        if not isinstance(items, list):
+            raise ValidationError('Envía un CSV o un JSON con items')
+        return ((index, item if isinstance(item, dict) else {}) for index, item in enumerate(items, start=1))
+
+    @action(detail=True, methods=['post'])
+    def entries(self, request, pk=None):
+        count = self.get_object()
+        scanner = request.query_params.get('scanner', '')
+        if not scanner and not request.content_type.startswith('text/csv') and not isinstance(request.data, list):
+            scanner = request.data.get('scanner', '')
+        loaded, errors = record_count_entries(count, self._count_rows(request), scanner=str(scanner)[:50])
+        return Response({'loaded': loaded, 'errors': errors})
+
+    @action(detail=True, methods=['post'])
+    def commit(self, request, pk=None):
+        zero_missing = str(request.data.get('zero_missing', '')).lower() in ('1', 'true')
+        count = commit_count(request.user.company, request.user, pk, zero_missing=zero_missing)
+        return Response({**self.get_serializer(count).data, 'variance': count.variance})
+
+    @action(detail=True, methods=['get'])
+    def variance(self, request, pk=None):
+        zero_missing = request.query_params.get('zero_missing') in ('1', 'true')
+        return Response(variance_report(self.get_object(), zero_missing=zero_missing))
@@ -1,16 +1,21 @@
+import codecs
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
+from django.db.models import Count, Sum
 from django.utils import timezone
-from django.db import transaction
 from decimal import Decimal, InvalidOperation
 from rest_framework.exceptions import ValidationError
 
 from apps.accounts.models import User
 from apps.core.access import plan_allows
+from apps.core.dates import as_date
+from apps.core.pagination import paginate_keyset
 from .forms import SupplierForm, BranchForm
-from .models import Branch, Inventory, Supplier, Product, Purchase, PurchaseItem, InventoryMovement
+from .models import Branch, Inventory, Supplier, Product, TransferDocument
 from .serializers import PurchaseSerializer
+from .services import InsufficientStock, create_purchase, create_transfer, import_purchase_csv, receive_transfer
 
 
 def _user_has_role(user, allowed_roles):
@@ -24,7 +29,7 @@ def _guard_role(request, allowed_roles, required_feature: str | None = None):
         return redirect('dashboard')
     if getattr(request.user, 'role', None) == User.ROLE_SUPER_ADMIN:
         return None
-    if not request.user.company:
+    if not request.user.company_id:
         messages.error(request, 'Debes pertenecer a una compañía para ver esta sección.')
         return redirect('dashboard')
     if required_feature and not plan_allows(request.user, required_feature):
@@ -79,8 +84,7 @@ def branch_create(request):
     if denial:
         return denial
 
-    subscription = getattr(request.user.company, 'subscription', None)
-    branch_limit = getattr(subscription, 'branch_limit', None)
+    branch_limit = request.entitlements.branch_limit
     current_count = Branch.objects.filter(company=request.user.company).count()
     if branch_limit and current_count >= branch_limit:
         messages.warning(request, 'Límite de sucursales alcanzado para tu plan. Mejora el plan para crear más.')
@@ -119,12 +123,14 @@ def inventory_by_branch(request):
     inventories = Inventory.objects.filter(company=request.user.company)
     if selected_branch:
         inventories = inventories.filter(branch=selected_branch)
-    inventories = inventories.select_related('product', 'branch').order_by('product__name')
+    inventories = inventories.with_available().select_related('product', 'branch')
+    page = paginate_keyset(request, inventories, ('product__name', 'id'))
 
     context = {
         'branches': branches,
         'selected_branch': selected_branch,
-        'inventories': inventories,
+        'inventories': page.items,
+        'page': page,
     }
     return render(request, 'inventory/branch_inventory.html', context)
 
@@ -142,119 +148,81 @@ def transfer_stock(request):
     branches = Branch.objects.filter(company=company).order_by('name')
     products = Product.objects.filter(company=company).order_by('name')
     form_errors: list[str] = []
+    items_payload = []
 
     if request.method == 'POST':
         source_id = request.POST.get('source_branch')
         target_id = request.POST.get('target_branch')
-        product_id = request.POST.get('product')
-        qty_raw = request.POST.get('quantity', '0')
         note = request.POST.get('note', '').strip()
+        in_transit = request.POST.get('in_transit') == '1'
 
         source_branch = branches.filter(id=source_id).first()
         target_branch = branches.filter(id=target_id).first()
-        product = products.filter(id=product_id).first()
 
         if not source_branch or not target_branch:
             form_errors.append('Selecciona sucursales válidas.')
         if source_branch and target_branch and source_branch == target_branch:
             form_errors.append('La sucursal de origen y destino no pueden ser la misma.')
-        if not product:
-            form_errors.append('Selecciona un producto a transferir.')
-        try:
-            quantity = int(qty_raw)
-            if quantity < 1:
-                raise ValueError
-        except ValueError:
-            form_errors.append('Ingresa una cantidad válida (mínimo 1).')
-            quantity = 0
 
-        if not form_errors and source_branch and target_branch and product:
+        product_ids = request.POST.getlist('item_product')
+        quantities = request.POST.getlist('item_quantity')
+        products_by_id = products.in_bulk([pid for pid in product_ids if pid.isdigit()])
+        items = []
+        for idx, (pid, qty) in enumerate(zip(product_ids, quantities), start=1):
+            if not pid and not qty:
+                continue
+            items_payload.append({'product': pid, 'quantity': qty})
+            product = products_by_id.get(int(pid)) if pid.isdigit() else None
+            if not product:
+                form_errors.append(f'Fila {idx}: selecciona un producto.')
+                continue
+            try:
+                quantity = int(qty)
+                if quantity < 1:
+                    raise ValueError
+            except ValueError:
+                form_errors.append(f'Fila {idx}: cantidad inválida (mínimo 1).')
+                continue
+            items.append((product, quantity))
+        if not items and not form_errors:
+            form_errors.append('Agrega al menos un producto a transferir.')
+
+        if not form_errors:
             try:
-                with transaction.atomic():
-                    source_inventory, _ = Inventory.objects.select_for_update().get_or_create(
-                        company=company,
-                        branch=source_branch,
-                        product=product,
-                        defaults={'stock': 0},
-                    )
-                    target_inventory, _ = Inventory.objects.select_for_update().get_or_create(
-                        company=company,
-                        branch=target_branch,
-                        product=product,
-                        defaults={'stock': 0},
-                    )
-                    if source_inventory.stock < quantity:
-                        raise ValidationError('Stock insuficiente en la sucursal de origen.')
-                    source_inventory.stock -= quantity
-                    target_inventory.stock += quantity
-                    source_inventory.save()
-                    target_inventory.save()
-                    InventoryMovement.objects.create(
-                        company=company,
-                        branch=source_branch,
-                        product=product,
-                        movement_type=InventoryMovement.MOV_TRANSFER,
-                        quantity_delta=-quantity,
-                        reason=note or f'Traspaso a {target_branch.name}',
-                        created_by=request.user,
-                    )
-                    InventoryMovement.objects.create(
-                        company=company,
-                        branch=target_branch,
-                        product=product,
-                        movement_type=InventoryMovement.MOV_TRANSFER,
-                        quantity_delta=quantity,
-                        reason=note or f'Traspaso desde {source_branch.name}',
-                        created_by=request.user,
-                    )
-                messages.success(request, f'Se transfirieron {quantity} unidades de {product.name}.')
+                document = create_transfer(company, request.user, source_branch, target_branch, items, note, in_transit=in_transit)
+                state = 'en tránsito' if in_transit else 'recibido'
+                messages.success(request, f'Traspaso #{document.id} registrado ({len(items)} líneas, {state}).')
                 return redirect('inventory_transfer')
-            except ValidationError as exc:
-                form_errors.append(str(getattr(exc, 'detail', exc)))
+            except InsufficientStock as exc:
+                form_errors.append(f'Stock insuficiente en la sucursal de origen para {exc.line.product.name}.')
 
+    in_transit_documents = (
+        TransferDocument.objects.filter(company=company, status=TransferDocument.STATUS_IN_TRANSIT)
+        .select_related('source', 'target')
+        .annotate(line_count=Count('lines'), units=Sum('lines__quantity'))
+    )
     context = {
         'branches': branches,
         'products': products,
         'form_errors': form_errors,
+        'items_payload': items_payload or [{'product': '', 'quantity': 1}],
+        'in_transit_documents': in_transit_documents,
     }
     return render(request, 'inventory/transfer.html', context)
 
 
-def _create_purchase(validated_data, user):
-    items_data = validated_data.pop('items')
-    branch = validated_data['branch']
-    supplier = validated_data['supplier']
-    if branch.company != user.company or supplier.company != user.company:
-        raise ValidationError('Sucursal o proveedor inválido para esta compañía')
-    purchase = Purchase.objects.create(company=user.company, created_by=user, **validated_data)
-    total = 0
-    with transaction.atomic():
-        for item in items_data:
-            product = item['product']
-            quantity = item['quantity']
-            unit_cost = item['unit_cost']
-            total += quantity * unit_cost
-            PurchaseItem.objects.create(purchase=purchase, **item)
-            inventory, _ = Inventory.objects.get_or_create(
-                company=user.company,
-                branch=purchase.branch,
-                product=product,
-                defaults={'stock': 0},
-            )
-            inventory.stock += quantity
-            inventory.save()
-            InventoryMovement.objects.create(
-                company=user.company,
-                branch=purchase.branch,
-                product=product,
-                movement_type=InventoryMovement.MOV_PURCHASE,
-                quantity_delta=quantity,
-                reason='Compra',
-                created_by=user,
-            )
-    purchase.total_cost = total
-    purchase.save()
-    return purchase
+@login_required
+def transfer_receive(request, pk):
+    denial = _guard_role(request, {User.ROLE_ADMIN_CLIENTE, User.ROLE_GERENTE, User.ROLE_SUPER_ADMIN}, required_feature='inventory')
+    if denial:
+        return denial
+    if request.method == 'POST':
+        try:
+            document = receive_transfer(request.user.company, request.user, pk)
+            messages.success(request, f'Traspaso #{document.id} recibido en {document.target.name}.')
+        except ValidationError as exc:
+            messages.error(request, ' '.join(str(detail) for detail in exc.detail))
+    return redirect('inventory_transfer')
 
 
 @login_required
@@ -311,7 +279,7 @@ def purchase_create(request):
         serializer = PurchaseSerializer(data=data)
         if serializer.is_valid() and not form_errors:
             try:
-                purchase = _create_purchase(serializer.validated_data, request.user)
+                purchase = create_purchase(serializer.validated_data, request.user)
                 messages.success(request, f'Compra #{purchase.id} creada correctamente.')
                 return redirect('purchase_create')
             except ValidationError as exc:
@@ -330,3 +298,52 @@ def purchase_create(request):
         'items_payload': items_payload,
     }
     return render(request, 'purchases/create.html', context)
+
+
+@login_required
+def purchase_import(request):
+    denial = _guard_role(request, {User.ROLE_ADMIN_CLIENTE, User.ROLE_GERENTE, User.ROLE_SUPER_ADMIN}, required_feature='inventory')
+    if denial:
+        return denial
+
+    company = request.user.company
+    branches = Branch.objects.filter(company=company).order_by('name')
+    suppliers = Supplier.objects.filter(company=company).order_by('name')
+    form_errors = []
+    result = None
+
+    if request.method == 'POST':
+        branch = branches.filter(pk=request.POST.get('branch') or None).first()
+        supplier = suppliers.filter(pk=request.POST.get('supplier') or None).first()
+        upload = request.FILES.get('file')
+        try:
+            purchase_date = as_date(request.POST.get('date')) or timezone.now().date()
+        except ValueError:
+            purchase_date = None
+            form_errors.append('Fecha inválida; usa el formato AAAA-MM-DD.')
+        if not branch or not supplier:
+            form_errors.append('Selecciona sucursal y proveedor.')
+        if not upload:
+            form_errors.append('Adjunta el archivo CSV de la factura.')
+        if not form_errors:
+            try:
+                result = import_purchase_csv(
+                    request.user, branch, supplier, purchase_date, codecs.iterdecode(upload, 'utf-8-sig'),
+                )
+            except ValidationError as exc:
+                form_errors.extend(str(detail) for detail in exc.detail)
+            except UnicodeDecodeError:
+                form_errors.append('El archivo debe estar codificado en UTF-8.')
+        if result and result.purchase:
+            messages.success(request, f'Compra #{result.purchase.id} creada con {result.rows} filas.')
+
+    context = {
+        'branches': branches,
+        'suppliers': suppliers,
+        'form_errors': form_errors,
+        'result': result,
+        'selected_branch_id': request.POST.get('branch') if request.method == 'POST' else None,
+        'selected_supplier_id': request.POST.get('supplier') if request.method == 'POST' else None,
+        'date_value': request.POST.get('date') if request.method == 'POST' else timezone.now().date(),
+    }
+    return render(request, 'purchases/import.html', context)
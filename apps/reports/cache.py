@@ -0,0 +1,122 @@
+"""Cache de resultados de reportes por (compañía, reporte, parámetros normalizados).
+
+Las entradas se indexan además por la versión de datos de la compañía
+(`apps.core.data_versions`), que renuevan las escrituras de inventario, ventas y compras.
+Cada reporte tiene su propio LRU en memoria del proceso con TTL y cantidad máxima de
+entradas; la API responde con ETag y Last-Modified derivados de la versión para que los
+clientes revaliden con un 304.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from apps.core.data_versions import data_version
+from apps.core.singleflight import single_flight
+
+# Por reporte: (segundos de vida, entradas máximas); se puede ajustar con REPORT_CACHE_LIMITS.
+DEFAULT_LIMITS = {
+    'stock': (60, 256),
+    'stock_page': (60, 512),
+    'sales': (300, 256),
+    'suppliers': (300, 128),
+    'suppliers_page': (300, 128),
+}
+
+
+class ReportCache:
+    """LRU con TTL; el cálculo corre fuera del lock para no serializar reportes distintos.
+
+    Los cálculos de una misma llave se coalescen con `single_flight`: mientras uno
+    recalcula, los demás reciben la entrada vencida si existe o esperan su resultado.
+    """
+
+    def __init__(self, name, ttl, max_entries):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            stale = entry[1] if entry is not None else None
+            self.misses += 1
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        value = single_flight(f'report:{self.name}', digest, compute, stale=stale)
+        if stale is not None and value is stale:
+            return value
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+_caches: dict[str, ReportCache] = {}
+_caches_lock = threading.Lock()
+
+
+def report_cache(report) -> ReportCache:
+    with _caches_lock:
+        if report not in _caches:
+            limits = {**DEFAULT_LIMITS, **getattr(settings, 'REPORT_CACHE_LIMITS', {})}
+            _caches[report] = ReportCache(report, *limits.get(report, (60, 128)))
+        return _caches[report]
+
+
+def clear_report_caches():
+    with _caches_lock:
+        _caches.clear()
+
+
+def _normalize(params) -> tuple:
+    return tuple(sorted((name, str(value)) for name, value in params.items() if value not in (None, '')))
+
+
+def report_data(company_id, report, params, compute):
+    """Resultado del reporte desde cache; `compute()` se ejecuta si falta, venció o no hay compañía."""
+    if company_id is None:
+        return compute()
+    version, _ = data_version(company_id)
+    return report_cache(report).get_or_compute((company_id, version, _normalize(params)), compute)
+
+
+def cached_report_response(request, report, params, compute):
+    """Respuesta DRF cacheada con ETag/Last-Modified; 304 si el cliente ya tiene esta versión."""
+    company_id = request.user.company_id
+    version, modified = data_version(company_id)
+    params = _normalize(params)
+    digest = hashlib.sha1(repr(params).encode()).hexdigest()[:10]
+    etag = quote_etag(f'{report}-{version}-{digest}')
+    not_modified = get_conditional_response(request, etag=etag, last_modified=modified)
+    if not_modified is not None:
+        response = not_modified
+    else:
+        data = report_cache(report).get_or_compute((company_id, version, params), compute)
+        response = Response(data)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,169 @@
+"""Exportaciones en streaming (CSV y NDJSON) de stock, ventas, compras y movimientos.
+
+Las filas se leen con `iterator(chunk_size=...)` (cursor del lado del servidor en
+PostgreSQL) y se escriben a medida que se envían, por lo que la memoria no crece con el
+tamaño de la compañía. Los mismos datasets alimentan los reportes en segundo plano
+(`apps.reports.jobs`).
+"""
+from __future__ import annotations
+
+import csv
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+
+from apps.core.dates import filter_days
+from apps.inventory.models import Inventory, InventoryMovement, PurchaseItem
+from apps.sales.models import SaleItem
+
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+CONTENT_TYPES = {
+    FORMAT_CSV: 'text/csv; charset=utf-8',
+    FORMAT_NDJSON: 'application/x-ndjson',
+}
+
+
+def _stock(company_id, branch_id, date_from, date_to):
+    qs = Inventory.objects.filter(company_id=company_id).with_available()
+    if branch_id:
+        qs = qs.filter(branch_id=branch_id)
+    return qs.order_by('branch_id', 'product_id')
+
+
+def _sales(company_id, branch_id, date_from, date_to):
+    qs = SaleItem.objects.filter(sale__company_id=company_id)
+    if branch_id:
+        qs = qs.filter(sale__branch_id=branch_id)
+    return filter_days(qs, 'sale__created_at', date_from, date_to).order_by('sale_id', 'id')
+
+
+def _sales_by_product(company_id, branch_id, date_from, date_to):
+    qs = _sales(company_id, branch_id, date_from, date_to)
+    line_total = ExpressionWrapper(F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    return (
+        qs.order_by().values('product__sku', 'product__name')
+        .annotate(units=Sum('quantity'), revenue=Sum(line_total))
+        .order_by('product__sku')
+    )
+
+
+def _purchases(company_id, branch_id, date_from, date_to):
+    qs = PurchaseItem.objects.filter(purchase__company_id=company_id)
+    if branch_id:
+        qs = qs.filter(purchase__branch_id=branch_id)
+    if date_from:
+        qs = qs.filter(purchase__date__gte=date_from)
+    if date_to:
+        qs = qs.filter(purchase__date__lte=date_to)
+    return qs.order_by('purchase_id', 'id')
+
+
+def _movements(company_id, branch_id, date_from, date_to):
+    qs = InventoryMovement.objects.flushed().filter(company_id=company_id)
+    if branch_id:
+        qs = qs.filter(branch_id=branch_id)
+    return filter_days(qs, 'created_at', date_from, date_to).order_by('id')
+
+
+# Por dataset: función que arma el queryset y columnas `(encabezado, campo)`.
+DATASETS = {
+    'stock': (
+        _stock,
+        [
+            ('branch', 'branch__name'),
+            ('sku', 'product__sku'),
+            ('product', 'product__name'),
+            ('stock', 'available'),
+            ('reorder_point', 'reorder_point'),
+        ],
+    ),
+    'sales': (
+        _sales,
+        [
+            ('sale_id', 'sale_id'),
+            ('created_at', 'sale__created_at'),
+            ('branch', 'sale__branch__name'),
+            ('seller', 'sale__seller__username'),
+            ('payment_method', 'sale__payment_method'),
+            ('sku', 'product__sku'),
+            ('product', 'product__name'),
+            ('quantity', 'quantity'),
+            ('unit_price', 'unit_price'),
+        ],
+    ),
+    'sales_by_product': (
+        _sales_by_product,
+        [
+            ('sku', 'product__sku'),
+            ('product', 'product__name'),
+            ('units', 'units'),
+            ('revenue', 'revenue'),
+        ],
+    ),
+    'purchases': (
+        _purchases,
+        [
+            ('purchase_id', 'purchase_id'),
+            ('date', 'purchase__date'),
+            ('branch', 'purchase__branch__name'),
+            ('supplier', 'purchase__supplier__name'),
+            ('sku', 'product__sku'),
+            ('product', 'product__name'),
+            ('quantity', 'quantity'),
+            ('unit_cost', 'unit_cost'),
+        ],
+    ),
+    'movements': (
+        _movements,
+        [
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('branch', 'branch__name'),
+            ('sku', 'product__sku'),
+            ('product', 'product__name'),
+            ('type', 'movement_type'),
+            ('quantity_delta', 'quantity_delta'),
+            ('reason', 'reason'),
+            ('user', 'created_by__username'),
+        ],
+    ),
+}
+
+
+class _Echo:
+    """Archivo mínimo para que `csv.writer` devuelva cada línea en vez de acumularla."""
+
+    def write(self, value):
+        return value
+
+
+def _local(row):
+    return tuple(timezone.localtime(value) if isinstance(value, datetime) else value for value in row)
+
+
+def export_rows(dataset, company_id, branch_id=None, date_from=None, date_to=None, chunk_size=None):
+    """Encabezados y un iterador de filas (tuplas) del dataset."""
+    build, columns = DATASETS[dataset]
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    qs = build(company_id, branch_id, date_from, date_to)
+    headers = [header for header, _ in columns]
+    rows = qs.values_list(*[field for _, field in columns]).iterator(chunk_size=chunk_size)
+    return headers, map(_local, rows)
+
+
+def stream_export(dataset, fmt, company_id, **filters):
+    """Genera el contenido del export línea a línea en `csv` o `ndjson`."""
+    headers, rows = export_rows(dataset, company_id, **filters)
+    if fmt == FORMAT_CSV:
+        writer = csv.writer(_Echo())
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+        return
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
@@ -0,0 +1,278 @@
+"""Reportes largos en segundo plano: se encolan, se calculan por bloques y se descargan.
+
+Un pool de hilos del propio proceso (`REPORT_JOB_WORKERS`) toma cada trabajo al confirmar
+la transacción que lo crea, lee el dataset de `apps.reports.exports` de a
+`EXPORT_CHUNK_SIZE` filas y va guardando el avance, así el cliente solo consulta el estado
+y descarga el archivo cuando está listo. Trabajos con los mismos parámetros se reutilizan
+mientras estén en curso o, ya terminados, mientras los datos de la compañía no cambien; un
+índice único parcial impide dos trabajos activos iguales.
+
+El worker renueva `heartbeat_at` cada `REPORT_JOB_HEARTBEAT / 3` segundos. Si pasa
+`REPORT_JOB_HEARTBEAT` sin señal (el worker de gunicorn murió con el hilo), el siguiente
+pedido igual vuelve a encolar el mismo trabajo en su proceso; el worker anterior, si seguía
+vivo, pierde el `claim_token` y abandona el cálculo.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from apps.core.data_versions import data_version
+from .exports import DATASETS, export_rows
+from .models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    ReportJob.FORMAT_CSV: 'text/csv; charset=utf-8',
+    ReportJob.FORMAT_JSON: 'application/json',
+}
+ACTIVE = (ReportJob.STATUS_PENDING, ReportJob.STATUS_RUNNING)
+
+
+class JobAbandoned(Exception):
+    """Otro proceso retomó el trabajo; este worker deja de escribirlo."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'REPORT_JOB_WORKERS', 2), thread_name_prefix='report-job'
+            )
+        return _executor
+
+
+def _params_hash(dataset, fmt, params) -> str:
+    payload = json.dumps([dataset, fmt, params], sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _clean_params(params) -> dict:
+    return {
+        name: value.isoformat() if isinstance(value, date) else value
+        for name, value in params.items()
+        if value not in (None, '')
+    }
+
+
+def submit_job(user, dataset, fmt, params) -> tuple[ReportJob, bool]:
+    """Encola el reporte o devuelve el trabajo equivalente vigente; `(trabajo, creado)`."""
+    if dataset not in DATASETS or fmt not in CONTENT_TYPES:
+        raise ValueError('Reporte inexistente')
+    params = _clean_params(params)
+    params_hash = _params_hash(dataset, fmt, params)
+    version, _ = data_version(user.company_id)
+    existing = (
+        ReportJob.objects.filter(company_id=user.company_id, params_hash=params_hash)
+        .filter(status__in=ACTIVE)
+        .first()
+    ) or (
+        ReportJob.objects.filter(
+            company_id=user.company_id,
+            params_hash=params_hash,
+            status=ReportJob.STATUS_DONE,
+            data_version=version,
+            expires_at__gt=timezone.now(),
+        )
+        .order_by('-finished_at')
+        .first()
+    )
+    if existing is not None:
+        if existing.status in ACTIVE and _take_over(existing):
+            existing.refresh_from_db()
+        return existing, False
+    try:
+        with transaction.atomic():
+            job = ReportJob.objects.create(
+                company_id=user.company_id,
+                created_by=user,
+                dataset=dataset,
+                fmt=fmt,
+                params=params,
+                params_hash=params_hash,
+                data_version=version,
+            )
+    except IntegrityError:
+        # Otro pedido concurrente creó el mismo trabajo activo.
+        return ReportJob.objects.get(company_id=user.company_id, params_hash=params_hash, status__in=ACTIVE), False
+    _enqueue(job.pk)
+    return job, True
+
+
+def _heartbeat_timeout() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'REPORT_JOB_HEARTBEAT', 60))
+
+
+def _enqueue(job_id):
+    transaction.on_commit(lambda: _pool().submit(_run_in_thread, job_id))
+
+
+def _take_over(job) -> bool:
+    """Vuelve a encolar en este proceso un trabajo activo sin señal de vida reciente."""
+    now = timezone.now()
+    taken = ReportJob.objects.filter(
+        pk=job.pk, status__in=ACTIVE, heartbeat_at__lt=now - _heartbeat_timeout()
+    ).update(status=ReportJob.STATUS_PENDING, claim_token='', heartbeat_at=now, started_at=None, rows_done=0)
+    if taken:
+        logger.warning('Reporte en segundo plano %s sin señal de vida; se vuelve a encolar', job.pk)
+        _enqueue(job.pk)
+    return bool(taken)
+
+
+def _beat(job_id, token, stop):
+    try:
+        while not stop.wait(_heartbeat_timeout().total_seconds() / 3):
+            ReportJob.objects.filter(pk=job_id, claim_token=token).update(heartbeat_at=timezone.now())
+    except Exception:
+        logger.exception('No se pudo renovar la señal de vida del reporte %s', job_id)
+    finally:
+        connection.close()
+
+
+def _run_in_thread(job_id):
+    token = uuid.uuid4().hex
+    stop = threading.Event()
+    beat = threading.Thread(target=_beat, args=(job_id, token, stop), daemon=True)
+    beat.start()
+    try:
+        run_job(job_id, token)
+    except Exception:
+        logger.exception('Falló el reporte en segundo plano %s', job_id)
+    finally:
+        stop.set()
+        close_old_connections()
+
+
+def _job_dir() -> Path:
+    path = Path(getattr(settings, 'REPORT_JOB_DIR', Path(settings.BASE_DIR) / 'var' / 'report_jobs'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _ttl() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'REPORT_JOB_TTL', 86400))
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _write(job, token, out, headers, rows, chunk_size):
+    """Escribe las filas de a bloques y guarda el avance después de cada uno."""
+    writer = csv.writer(out) if job.fmt == ReportJob.FORMAT_CSV else None
+    if writer is not None:
+        writer.writerow(headers)
+    else:
+        out.write('[')
+    done = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        for row in chunk:
+            if writer is not None:
+                writer.writerow([_value(value) for value in row])
+            else:
+                out.write((',\n' if done else '\n') + json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder))
+            done += 1
+        if not ReportJob.objects.filter(pk=job.pk, claim_token=token).update(rows_done=done, heartbeat_at=timezone.now()):
+            raise JobAbandoned(job.pk)
+    if writer is None:
+        out.write('\n]\n' if done else ']\n')
+    return done
+
+
+def run_job(job_id, token=None):
+    """Calcula el reporte si sigue en cola; devuelve False si otro worker lo tomó o lo retomó."""
+    token = token or uuid.uuid4().hex
+    now = timezone.now()
+    claimed = ReportJob.objects.filter(pk=job_id, status=ReportJob.STATUS_PENDING).update(
+        status=ReportJob.STATUS_RUNNING, started_at=now, heartbeat_at=now, claim_token=token
+    )
+    if not claimed:
+        return False
+    job = ReportJob.objects.get(pk=job_id)
+    mine = ReportJob.objects.filter(pk=job.pk, claim_token=token)
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    path = _job_dir() / f'{job.pk}-{token[:12]}.{job.fmt}'
+    partial = path.with_name(path.name + '.part')
+    try:
+        filters = {
+            'branch_id': job.params.get('branch'),
+            'date_from': date.fromisoformat(job.params['date_from']) if job.params.get('date_from') else None,
+            'date_to': date.fromisoformat(job.params['date_to']) if job.params.get('date_to') else None,
+        }
+        build, _ = DATASETS[job.dataset]
+        total = build(job.company_id, **filters).count()
+        if not mine.update(rows_total=total, heartbeat_at=timezone.now()):
+            raise JobAbandoned(job.pk)
+        headers, rows = export_rows(job.dataset, job.company_id, chunk_size=chunk_size, **filters)
+        with open(partial, 'w', newline='', encoding='utf-8') as out:
+            done = _write(job, token, out, headers, rows, chunk_size)
+        os.replace(partial, path)
+    except JobAbandoned:
+        partial.unlink(missing_ok=True)
+        return False
+    except Exception as exc:
+        partial.unlink(missing_ok=True)
+        failed = timezone.now()
+        mine.update(
+            status=ReportJob.STATUS_FAILED, error=str(exc)[:1000], finished_at=failed, expires_at=failed + _ttl()
+        )
+        raise
+    finished = timezone.now()
+    updated = mine.update(
+        status=ReportJob.STATUS_DONE,
+        rows_done=done,
+        rows_total=done,
+        file_path=str(path),
+        finished_at=finished,
+        expires_at=finished + _ttl(),
+    )
+    if not updated:
+        path.unlink(missing_ok=True)
+    return bool(updated)
+
+
+def cleanup_jobs(now=None) -> tuple[int, int]:
+    """Borra trabajos vencidos con sus archivos y marca como fallidos los que quedaron colgados.
+
+    Un trabajo queda colgado si el proceso que lo tenía se reinició y nadie lo volvió a
+    pedir; pasados `REPORT_JOB_STALE` segundos sin señal de vida se da por perdido.
+    Devuelve `(eliminados, fallidos)`.
+    """
+    now = now or timezone.now()
+    expired = ReportJob.objects.filter(expires_at__lte=now)
+    for file_path in expired.exclude(file_path='').values_list('file_path', flat=True).iterator():
+        Path(file_path).unlink(missing_ok=True)
+    deleted, _ = expired.delete()
+    stale_before = now - timedelta(seconds=getattr(settings, 'REPORT_JOB_STALE', 3600))
+    failed = ReportJob.objects.filter(status__in=ACTIVE, heartbeat_at__lt=stale_before).update(
+        status=ReportJob.STATUS_FAILED,
+        error='El trabajo no terminó a tiempo',
+        finished_at=now,
+        expires_at=now + _ttl(),
+    )
+    return deleted, failed
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.reports.jobs import cleanup_jobs
+
+
+class Command(BaseCommand):
+    help = 'Elimina los reportes en segundo plano vencidos y da por fallidos los que quedaron colgados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Segundos entre pasadas; 0 ejecuta una sola')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted, failed = cleanup_jobs()
+            self.stdout.write(f'{deleted} reportes vencidos eliminados, {failed} marcados como fallidos')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.11 on 2026-10-17 19:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_report_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='claim_token',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddConstraint(
+            model_name='reportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('company', 'params_hash'), name='reportjob_unique_active'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from apps.core.models import Company
+
+
+class ReportJob(models.Model):
+    """Reporte calculado en segundo plano; el resultado queda en un archivo hasta `expires_at`."""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En cola'),
+        (STATUS_RUNNING, 'En proceso'),
+        (STATUS_DONE, 'Listo'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+    FORMAT_CSV = 'csv'
+    FORMAT_JSON = 'json'
+    FORMAT_CHOICES = [(FORMAT_CSV, 'CSV'), (FORMAT_JSON, 'JSON')]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='report_jobs')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    dataset = models.CharField(max_length=30)
+    fmt = models.CharField(max_length=10, choices=FORMAT_CHOICES, default=FORMAT_CSV)
+    params = models.JSONField(default=dict)
+    params_hash = models.CharField(max_length=40)
+    data_version = models.CharField(max_length=12, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows_total = models.PositiveIntegerField(null=True, blank=True)
+    rows_done = models.PositiveIntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Última señal de vida: al encolar y periódicamente mientras un worker lo calcula.
+    heartbeat_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['company', 'params_hash', 'status'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'params_hash'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='reportjob_unique_active',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.dataset}.{self.fmt} #{self.pk} ({self.status})'
+
+    @property
+    def progress(self):
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(99, self.rows_done * 100 // self.rows_total)
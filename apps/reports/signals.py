@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.data_versions import bump_data_version
+from apps.inventory.models import Branch, Inventory, Product, Purchase, Supplier
+from apps.sales.models import Sale
+
+
+# Los cambios de stock en lote (ventas, compras, traspasos, ajustes) renuevan la versión al
+# registrar sus movimientos; estas señales cubren las ediciones puntuales.
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+@receiver(post_save, sender=Purchase)
+@receiver(post_delete, sender=Purchase)
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+def report_data_changed(sender, instance, **kwargs):
+    bump_data_version(instance.company_id)
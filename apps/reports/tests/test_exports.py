@@ -0,0 +1,81 @@
+import csv
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.models import Company, Plan, PlanFeature, Subscription
+from apps.inventory.models import Branch, Inventory, Product
+from apps.sales.models import Sale
+from apps.sales.services import create_sale
+
+User = get_user_model()
+
+
+class ReportExportTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        reports, _ = PlanFeature.objects.get_or_create(code='reports', defaults={'label': 'Reportes'})
+        plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        plan.features.add(reports)
+        Subscription.objects.create(
+            company=self.company,
+            plan=plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.branches = [Branch.objects.create(company=self.company, name=name, address='Calle 1') for name in ('Centro', 'Norte')]
+        self.product = Product.objects.create(company=self.company, sku='P1', name='Producto 1', price=Decimal('100'), cost=Decimal('50'))
+        for branch in self.branches:
+            Inventory.objects.create(company=self.company, branch=branch, product=self.product, stock=50)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def _sale(self, quantity, days_ago=0):
+        items = [{'product': self.product, 'quantity': quantity, 'unit_price': self.product.price}]
+        sale = create_sale({'branch': self.branches[0], 'payment_method': 'efectivo', 'items': items}, self.user)
+        Sale.objects.filter(pk=sale.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return sale
+
+    def _get(self, dataset, fmt, **params):
+        response = self.api.get(reverse('report-export', args=[dataset, fmt]), params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_stock_csv_filters_by_branch(self):
+        response, body = self._get('stock', 'csv', branch=self.branches[1].pk)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = list(csv.reader(StringIO(body)))
+        self.assertEqual(rows, [['branch', 'sku', 'product', 'stock', 'reorder_point'], ['Norte', 'P1', 'Producto 1', '50', '0']])
+
+    def test_sales_ndjson_respects_date_range(self):
+        old = self._sale(2, days_ago=10)
+        recent = self._sale(3)
+        today = timezone.localdate().isoformat()
+        _, body = self._get('sales', 'ndjson', date_from=today, date_to=today)
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([line['sale_id'] for line in lines], [recent.pk])
+        self.assertEqual(lines[0]['quantity'], 3)
+        self.assertNotIn(old.pk, [line['sale_id'] for line in lines])
+
+    def test_movements_csv_lists_ledger(self):
+        self._sale(4)
+        _, body = self._get('movements', 'csv')
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual([(row['branch'], row['quantity_delta']) for row in rows], [('Centro', '-4')])
+
+    def test_unknown_dataset_and_invalid_date(self):
+        self.assertEqual(self.api.get(reverse('report-export', args=['users', 'csv'])).status_code, 404)
+        response = self.api.get(reverse('report-export', args=['sales', 'csv']), {'date_from': '2024-13-01'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,99 @@
+import hashlib
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.core.models import Company, Plan, PlanFeature, Subscription
+from apps.core.singleflight import lock_key
+from apps.inventory.models import Branch, Inventory, Product
+from apps.reports.cache import ReportCache, clear_report_caches, report_cache
+from apps.sales.services import create_sale
+
+User = get_user_model()
+
+
+class ReportCacheTests(SimpleTestCase):
+    def test_lru_evicts_oldest_and_expires_after_ttl(self):
+        lru = ReportCache('prueba', ttl=60, max_entries=2)
+        with mock.patch('apps.reports.cache.time.monotonic', return_value=100):
+            lru.get_or_compute('a', lambda: 1)
+            lru.get_or_compute('b', lambda: 2)
+            lru.get_or_compute('a', lambda: 0)  # 'a' pasa a ser la más reciente
+            lru.get_or_compute('c', lambda: 3)
+            self.assertEqual(lru.get_or_compute('b', lambda: 'nuevo'), 'nuevo')
+            self.assertEqual(lru.get_or_compute('c', lambda: 0), 3)
+        with mock.patch('apps.reports.cache.time.monotonic', return_value=200):
+            self.assertEqual(lru.get_or_compute('c', lambda: 'vencido'), 'vencido')
+
+    def test_expired_entry_is_served_while_another_request_recomputes(self):
+        cache.clear()
+        lru = ReportCache('prueba', ttl=60, max_entries=2)
+        with mock.patch('apps.reports.cache.time.monotonic', return_value=100):
+            lru.get_or_compute('a', lambda: 'anterior')
+        digest = hashlib.sha1(repr('a').encode()).hexdigest()
+        cache.add(lock_key('report:prueba', digest), 'otro')
+        self.assertEqual(lru.get_or_compute('a', lambda: 'nuevo'), 'anterior')
+        cache.delete(lock_key('report:prueba', digest))
+        self.assertEqual(lru.get_or_compute('a', lambda: 'nuevo'), 'nuevo')
+
+
+class StockReportCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_report_caches()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company = Company.objects.create(name='ACME', rut='12345678-5')
+            reports, _ = PlanFeature.objects.get_or_create(code='reports', defaults={'label': 'Reportes'})
+            plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+            plan.features.add(reports)
+            Subscription.objects.create(
+                company=self.company,
+                plan=plan,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30),
+            )
+            self.user = User.objects.create_user(
+                username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+                company=self.company,
+            )
+            self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+            self.product = Product.objects.create(company=self.company, sku='P1', name='Producto 1', price=Decimal('100'), cost=Decimal('50'))
+            Inventory.objects.create(company=self.company, branch=self.branch, product=self.product, stock=10)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_repeated_requests_hit_cache_and_revalidate_with_etag(self):
+        url = reverse('report-stock')
+        first = self.api.get(url)
+        self.assertEqual(first.json()[0]['stock'], 10)
+        self.assertIn('Last-Modified', first)
+        second = self.api.get(url)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(report_cache('stock').hits, 1)
+        self.assertEqual(self.api.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertNotEqual(self.api.get(url, {'branch': self.branch.pk})['ETag'], first['ETag'])
+
+    def test_sale_invalidates_cached_report(self):
+        url = reverse('report-stock')
+        etag = self.api.get(url)['ETag']
+        items = [{'product': self.product, 'quantity': 3, 'unit_price': self.product.price}]
+        with self.captureOnCommitCallbacks(execute=True):
+            create_sale({'branch': self.branch, 'payment_method': 'efectivo', 'items': items}, self.user)
+        response = self.api.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['stock'], 7)
+
+    def test_report_pages_without_company(self):
+        root = User.objects.create_user(
+            username='root', password='pass1234', role=User.ROLE_SUPER_ADMIN, email='r@example.com', rut='99999999-9',
+        )
+        self.client.force_login(root)
+        for name in ('report_stock', 'report_suppliers'):
+            self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+        self.assertEqual(report_cache('stock_page').misses, 0)
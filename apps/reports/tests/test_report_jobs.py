@@ -0,0 +1,185 @@
+import csv
+import json
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.models import Company, Plan, PlanFeature, Subscription
+from apps.inventory.models import Branch, Inventory, Product
+from apps.reports.jobs import cleanup_jobs, run_job
+from apps.reports.models import ReportJob
+from apps.sales.services import create_sale
+
+User = get_user_model()
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(REPORT_JOB_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company = Company.objects.create(name='ACME', rut='12345678-5')
+            reports, _ = PlanFeature.objects.get_or_create(code='reports', defaults={'label': 'Reportes'})
+            plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+            plan.features.add(reports)
+            Subscription.objects.create(
+                company=self.company,
+                plan=plan,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30),
+            )
+            self.user = User.objects.create_user(
+                username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+                company=self.company,
+            )
+            self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+            self.products = [
+                Product.objects.create(company=self.company, sku=f'P{i}', name=f'Producto {i}', price=Decimal('100'), cost=Decimal('50'))
+                for i in (1, 2)
+            ]
+            for product in self.products:
+                Inventory.objects.create(company=self.company, branch=self.branch, product=product, stock=50)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def _sale(self, product, quantity):
+        items = [{'product': product, 'quantity': quantity, 'unit_price': product.price}]
+        return create_sale({'branch': self.branch, 'payment_method': 'efectivo', 'items': items}, self.user)
+
+    def _submit(self, **data):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.api.post(reverse('report-jobs'), data, format='json')
+        return response, callbacks
+
+    def _download(self, job_id):
+        response = self.api.get(reverse('report-job-download', args=[job_id]))
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode()
+        response.close()
+        return response, body
+
+    def test_job_runs_in_chunks_and_is_downloaded(self):
+        self._sale(self.products[0], 2)
+        self._sale(self.products[1], 1)
+        self._sale(self.products[0], 3)
+        response, callbacks = self._submit(dataset='sales', format='csv')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+        job_id = response.data['id']
+        self.assertEqual(response.data['status'], ReportJob.STATUS_PENDING)
+        self.assertNotIn('download_url', response.data)
+        self.assertEqual(self.api.get(reverse('report-job-download', args=[job_id])).status_code, 409)
+
+        with override_settings(EXPORT_CHUNK_SIZE=2):
+            self.assertTrue(run_job(job_id))
+        self.assertFalse(run_job(job_id))
+
+        detail = self.api.get(reverse('report-job', args=[job_id])).data
+        self.assertEqual((detail['status'], detail['progress'], detail['rows_done']), (ReportJob.STATUS_DONE, 100, 3))
+        self.assertIn('download_url', detail)
+        response, body = self._download(job_id)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual([row['quantity'] for row in rows], ['2', '1', '3'])
+
+    def test_same_parameters_reuse_job_until_data_changes(self):
+        first, _ = self._submit(dataset='stock', format='json')
+        again, callbacks = self._submit(dataset='stock', format='json')
+        self.assertEqual((again.status_code, again.data['id'], len(callbacks)), (200, first.data['id'], 0))
+        self.assertEqual(self._submit(dataset='stock', format='csv')[0].status_code, 202)
+
+        run_job(first.data['id'])
+        self.assertEqual(self._submit(dataset='stock', format='json')[0].data['id'], first.data['id'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self._sale(self.products[0], 1)
+        changed, _ = self._submit(dataset='stock', format='json')
+        self.assertEqual(changed.status_code, 202)
+        self.assertNotEqual(changed.data['id'], first.data['id'])
+
+    def test_sales_by_product_json(self):
+        self._sale(self.products[0], 2)
+        self._sale(self.products[0], 3)
+        self._sale(self.products[1], 1)
+        today = timezone.localdate().isoformat()
+        response, _ = self._submit(dataset='sales_by_product', format='json', branch=self.branch.pk, date_from=today)
+        run_job(response.data['id'])
+        response, body = self._download(response.data['id'])
+        self.assertEqual(response['Content-Type'], 'application/json')
+        rows = json.loads(body)
+        self.assertEqual([(row['sku'], row['units'], Decimal(row['revenue'])) for row in rows], [('P1', 5, Decimal('500')), ('P2', 1, Decimal('100'))])
+
+    def test_invalid_requests_and_other_company(self):
+        self.assertEqual(self._submit(dataset='users')[0].status_code, 400)
+        self.assertEqual(self._submit(dataset='sales', date_from='2024-13-01')[0].status_code, 400)
+        other = Company.objects.create(name='Otra', rut='76543210-3')
+        foreign = Branch.objects.create(company=other, name='Ajena', address='Calle 2')
+        self.assertEqual(self._submit(dataset='sales', branch=foreign.pk)[0].status_code, 400)
+        job = ReportJob.objects.create(company=other, dataset='stock', params_hash='x')
+        self.assertEqual(self.api.get(reverse('report-job', args=[job.pk])).status_code, 404)
+
+    def test_cleanup_removes_expired_files_and_fails_stuck_jobs(self):
+        response, _ = self._submit(dataset='stock', format='csv')
+        run_job(response.data['id'])
+        done = ReportJob.objects.get(pk=response.data['id'])
+        stuck = ReportJob.objects.create(company=self.company, dataset='sales', params_hash='y')
+        ReportJob.objects.filter(pk=stuck.pk).update(heartbeat_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(cleanup_jobs(), (0, 1))
+        stuck.refresh_from_db()
+        self.assertEqual(stuck.status, ReportJob.STATUS_FAILED)
+        self.assertTrue(Path(done.file_path).exists())
+
+        self.assertEqual(cleanup_jobs(now=timezone.now() + timedelta(days=2)), (2, 0))
+        self.assertFalse(Path(done.file_path).exists())
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_job_without_heartbeat_is_taken_over(self):
+        first, _ = self._submit(dataset='stock', format='csv')
+        job_id = first.data['id']
+        ReportJob.objects.filter(pk=job_id).update(
+            status=ReportJob.STATUS_RUNNING, claim_token='muerto', heartbeat_at=timezone.now() - timedelta(minutes=5)
+        )
+        with self.assertLogs('apps.reports.jobs', level='WARNING'):
+            again, callbacks = self._submit(dataset='stock', format='csv')
+        self.assertEqual((again.status_code, again.data['id'], again.data['status']), (200, job_id, ReportJob.STATUS_PENDING))
+        self.assertEqual(len(callbacks), 1)
+        self.assertTrue(run_job(job_id))
+        self.assertEqual(ReportJob.objects.get(pk=job_id).status, ReportJob.STATUS_DONE)
+
+    def test_worker_abandons_job_taken_over_by_another(self):
+        response, _ = self._submit(dataset='stock', format='csv')
+        job_id = response.data['id']
+
+        def rows():
+            ReportJob.objects.filter(pk=job_id).update(claim_token='otro')
+            yield ('Centro', 'P1', 'Producto 1', 50, 0)
+
+        with mock.patch('apps.reports.jobs.export_rows', return_value=(['branch', 'sku', 'product', 'stock', 'reorder_point'], rows())):
+            self.assertFalse(run_job(job_id))
+        job = ReportJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.claim_token, job.file_path), (ReportJob.STATUS_RUNNING, 'otro', ''))
+        self.assertEqual(list(Path(settings.REPORT_JOB_DIR).iterdir()), [])
+
+    def test_only_one_active_job_per_parameters(self):
+        self._submit(dataset='stock', format='csv')
+        job = ReportJob.objects.get()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ReportJob.objects.create(company=self.company, dataset='stock', params_hash=job.params_hash)
+        ReportJob.objects.filter(pk=job.pk).update(status=ReportJob.STATUS_FAILED)
+        self.assertEqual(self._submit(dataset='stock', format='csv')[0].status_code, 202)
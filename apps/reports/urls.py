@@ -1,8 +1,20 @@
 from django.urls import path
-from .views import StockReportView, SalesReportView, SupplierReportView
+from .views import (
+    ExportView,
+    ReportJobCreateView,
+    ReportJobDetailView,
+    ReportJobDownloadView,
+    SalesReportView,
+    StockReportView,
+    SupplierReportView,
+)
 
 urlpatterns = [
     path('reports/stock/', StockReportView.as_view(), name='report-stock'),
     path('reports/sales/', SalesReportView.as_view(), name='report-sales'),
     path('reports/suppliers/', SupplierReportView.as_view(), name='report-suppliers'),
+    path('reports/export/<str:dataset>.<str:fmt>', ExportView.as_view(), name='report-export'),
+    path('reports/jobs/', ReportJobCreateView.as_view(), name='report-jobs'),
+    path('reports/jobs/<int:pk>/', ReportJobDetailView.as_view(), name='report-job'),
+    path('reports/jobs/<int:pk>/download/', ReportJobDownloadView.as_view(), name='report-job-download'),
 ]
@@ -1,12 +1,19 @@
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum, Count, Max
-from django.db.models.functions import TruncDay, TruncMonth
 from apps.accounts.permissions import IsAdminOrGerente
+from apps.core.dates import as_date
 from apps.core.permissions import IsActive, CompanyPlanAllowsReports
-from apps.inventory.models import Inventory, Branch, Supplier
-from apps.sales.models import Sale
+from apps.inventory.models import Inventory, Branch
+from apps.inventory.supplier_stats import supplier_report
+from apps.sales.rollups import sales_series
+from .cache import cached_report_response
+from .exports import CONTENT_TYPES, DATASETS, stream_export
+from .jobs import CONTENT_TYPES as JOB_CONTENT_TYPES, submit_job
+from .models import ReportJob
 
 
 class StockReportView(APIView):
@@ -14,11 +21,17 @@ class StockReportView(APIView):
 
     def get(self, request):
         branch_id = request.query_params.get('branch')
-        qs = Inventory.objects.filter(company=request.user.company)
-        if branch_id:
-            qs = qs.filter(branch_id=branch_id)
-        data = list(qs.values('branch__name', 'product__name', 'stock'))
-        return Response(data)
+
+        def build():
+            qs = Inventory.objects.filter(company_id=request.user.company_id).with_available()
+            if branch_id:
+                qs = qs.filter(branch_id=branch_id)
+            return [
+                {'branch__name': branch, 'product__name': product, 'stock': stock}
+                for branch, product, stock in qs.values_list('branch__name', 'product__name', 'available')
+            ]
+
+        return cached_report_response(request, 'stock', {'branch': branch_id}, build)
 
 
 class SalesReportView(APIView):
@@ -26,28 +39,139 @@ class SalesReportView(APIView):
 
     def get(self, request):
         branch_id = request.query_params.get('branch')
-        date_from = request.query_params.get('date_from')
-        date_to = request.query_params.get('date_to')
-        group = request.query_params.get('group', 'day')
-        qs = Sale.objects.filter(company=request.user.company)
-        if branch_id:
-            qs = qs.filter(branch_id=branch_id)
-        if date_from:
-            qs = qs.filter(created_at__date__gte=date_from)
-        if date_to:
-            qs = qs.filter(created_at__date__lte=date_to)
-        annotator = TruncDay('created_at') if group == 'day' else TruncMonth('created_at')
-        qs = qs.annotate(period=annotator).values('period').annotate(total=Sum('total')).order_by('period')
-        return Response(qs)
+        try:
+            date_from = as_date(request.query_params.get('date_from'))
+            date_to = as_date(request.query_params.get('date_to'))
+        except ValueError:
+            return Response({'detail': 'Fecha inválida, usa AAAA-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        group = 'day' if request.query_params.get('group', 'day') == 'day' else 'month'
+        return cached_report_response(
+            request,
+            'sales',
+            {'branch': branch_id, 'date_from': date_from, 'date_to': date_to, 'group': group},
+            lambda: sales_series(request.user.company_id, group, branch_id, date_from, date_to),
+        )
 
 
 class SupplierReportView(APIView):
     permission_classes = [IsActive, CompanyPlanAllowsReports, IsAdminOrGerente]
 
     def get(self, request):
-        qs = Supplier.objects.filter(company=request.user.company).annotate(
-            total_purchases=Count('purchase', distinct=True),
-            last_purchase=Max('purchase__date'),
-            products_count=Count('purchase__items__product', distinct=True),
-        ).values('name', 'rut', 'total_purchases', 'products_count', 'last_purchase')
-        return Response(qs)
+        return cached_report_response(
+            request,
+            'suppliers',
+            {},
+            lambda: list(
+                supplier_report(request.user.company_id).values(
+                    'name', 'rut', 'total_purchases', 'products_count', 'last_purchase', 'total_spent'
+                )
+            ),
+        )
+
+
+class ExportView(APIView):
+    """Descarga en streaming de `stock`, `sales`, `purchases` o `movements` como CSV o NDJSON."""
+
+    permission_classes = [IsActive, CompanyPlanAllowsReports, IsAdminOrGerente]
+
+    def get(self, request, dataset, fmt):
+        if dataset not in DATASETS or fmt not in CONTENT_TYPES:
+            return Response({'detail': 'Export inexistente'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            date_from = as_date(request.query_params.get('date_from'))
+            date_to = as_date(request.query_params.get('date_to'))
+        except ValueError:
+            return Response({'detail': 'Fecha inválida, usa AAAA-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        content = stream_export(
+            dataset,
+            fmt,
+            request.user.company_id,
+            branch_id=request.query_params.get('branch') or None,
+            date_from=date_from,
+            date_to=date_to,
+        )
+        response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+        filename = f'{dataset}-{timezone.localdate():%Y%m%d}.{fmt}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+def _job_payload(request, job):
+    payload = {
+        'id': job.pk,
+        'dataset': job.dataset,
+        'format': job.fmt,
+        'params': job.params,
+        'status': job.status,
+        'progress': job.progress,
+        'rows_done': job.rows_done,
+        'rows_total': job.rows_total,
+        'error': job.error,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'expires_at': job.expires_at,
+        'url': request.build_absolute_uri(reverse('report-job', args=[job.pk])),
+    }
+    if job.status == ReportJob.STATUS_DONE:
+        payload['download_url'] = request.build_absolute_uri(reverse('report-job-download', args=[job.pk]))
+    return payload
+
+
+class ReportJobCreateView(APIView):
+    """Encola un reporte largo (`dataset`, `format`, `branch`, `date_from`, `date_to`) y devuelve el trabajo."""
+
+    permission_classes = [IsActive, CompanyPlanAllowsReports, IsAdminOrGerente]
+
+    def post(self, request):
+        dataset = request.data.get('dataset')
+        fmt = request.data.get('format', ReportJob.FORMAT_CSV)
+        if dataset not in DATASETS or fmt not in JOB_CONTENT_TYPES:
+            return Response({'detail': 'Reporte inexistente'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            date_from = as_date(request.data.get('date_from'))
+            date_to = as_date(request.data.get('date_to'))
+        except ValueError:
+            return Response({'detail': 'Fecha inválida, usa AAAA-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        branch_id = str(request.data.get('branch') or '')
+        if branch_id and not (
+            branch_id.isdigit() and Branch.objects.filter(pk=branch_id, company_id=request.user.company_id).exists()
+        ):
+            return Response({'detail': 'Sucursal inválida'}, status=status.HTTP_400_BAD_REQUEST)
+        branch_id = int(branch_id) if branch_id else None
+        job, created = submit_job(
+            request.user, dataset, fmt, {'branch': branch_id, 'date_from': date_from, 'date_to': date_to}
+        )
+        return Response(_job_payload(request, job), status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
+
+
+class ReportJobDetailView(APIView):
+    """Estado y avance del trabajo."""
+
+    permission_classes = [IsActive, CompanyPlanAllowsReports, IsAdminOrGerente]
+
+    def get(self, request, pk):
+        job = ReportJob.objects.filter(pk=pk, company_id=request.user.company_id).first()
+        if job is None:
+            return Response({'detail': 'Trabajo inexistente'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(_job_payload(request, job))
+
+
+class ReportJobDownloadView(APIView):
+    """Archivo del trabajo terminado; 409 mientras no está listo y 410 si ya venció."""
+
+    permission_classes = [IsActive, CompanyPlanAllowsReports, IsAdminOrGerente]
+
+    def get(self, request, pk):
+        job = ReportJob.objects.filter(pk=pk, company_id=request.user.company_id).first()
+        if job is None:
+            return Response({'detail': 'Trabajo inexistente'}, status=status.HTTP_404_NOT_FOUND)
+        if job.status != ReportJob.STATUS_DONE:
+            return Response({'detail': 'El reporte aún no está listo', 'status': job.status}, status=status.HTTP_409_CONFLICT)
+        if job.expires_at <= timezone.now():
+            return Response({'detail': 'El reporte venció, vuelve a solicitarlo'}, status=status.HTTP_410_GONE)
+        try:
+            handle = open(job.file_path, 'rb')
+        except FileNotFoundError:
+            return Response({'detail': 'El reporte venció, vuelve a solicitarlo'}, status=status.HTTP_410_GONE)
+        filename = f'{job.dataset}-{job.finished_at:%Y%m%d}-{job.pk}.{job.fmt}'
+        return FileResponse(handle, as_attachment=True, filename=filename, content_type=JOB_CONTENT_TYPES[job.fmt])
@@ -1,14 +1,13 @@
 from django.contrib import messages
-from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 
-from django.db.models import Count, Max
-
 from apps.accounts.models import User
-from apps.core.access import plan_allows
+from apps.core.pagination import KeysetPage, paginate_keyset
 from apps.inventory.models import Branch, Inventory, Supplier
+from apps.inventory.supplier_stats import supplier_report
 from apps.inventory.web_views import _guard_role
+from .cache import report_data
 
 
 @login_required
@@ -18,18 +17,24 @@ def stock_report(request):
         return denial
 
     company = request.user.company
-    reports_enabled = plan_allows(request.user, 'reports')
+    reports_enabled = request.entitlements.allows('reports')
     if not reports_enabled:
         messages.warning(request, 'Tu plan no permite ver reportes de stock. Mejora el plan para habilitarlos.')
 
     branches = Branch.objects.filter(company=company).order_by('name')
     selected_branch_id = request.GET.get('branch')
-    inventories = Inventory.objects.filter(company=company).select_related('product', 'branch').order_by('product__name')
+    inventories = Inventory.objects.filter(company=company).with_available().select_related('product', 'branch')
     if selected_branch_id:
         inventories = inventories.filter(branch_id=selected_branch_id)
+    if reports_enabled and company is not None:
+        params = {name: request.GET.get(name) for name in ('branch', 'after', 'before', 'page_size')}
+        page = report_data(company.id, 'stock_page', params, lambda: paginate_keyset(request, inventories, ('product__name', 'id')))
+    else:
+        page = KeysetPage([], None, None)
 
     context = {
-        'inventories': inventories if reports_enabled else [],
+        'inventories': page.items,
+        'page': page,
         'branches': branches,
         'selected_branch_id': selected_branch_id,
         'reports_enabled': reports_enabled,
@@ -44,15 +49,14 @@ def suppliers_report(request):
         return denial
 
     company = request.user.company
-    reports_enabled = plan_allows(request.user, 'reports')
+    reports_enabled = request.entitlements.allows('reports')
     if not reports_enabled:
         messages.warning(request, 'Tu plan no permite ver reportes de proveedores. Mejora el plan para habilitarlos.')
 
-    suppliers = Supplier.objects.filter(company=company).annotate(
-        total_purchases=Count('purchase', distinct=True),
-        last_purchase=Max('purchase__date'),
-        products_count=Count('purchase__items__product', distinct=True),
-    ).order_by('name') if reports_enabled else Supplier.objects.none()
+    if reports_enabled and company is not None:
+        suppliers = report_data(company.id, 'suppliers_page', {}, lambda: list(supplier_report(company.id).order_by('name')))
+    else:
+        suppliers = Supplier.objects.none()
 
     context = {
         'suppliers': suppliers,
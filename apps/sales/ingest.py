@@ -0,0 +1,264 @@
+"""Ingesta masiva de ventas del POS offline (NDJSON o arreglo JSON).
+
+Las ventas se leen del cuerpo del request de a una, sin cargar el payload completo,
+y se procesan en lotes de `SALES_BULK_BATCH`: sucursales, productos e ids de cliente se
+validan con una consulta por lote y las filas de inventario de cada sucursal se
+bloquean una sola vez por lote.
+"""
+from __future__ import annotations
+
+import codecs
+import json
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.core.transactions import retry_on_conflict
+from apps.inventory.models import Branch, InventoryMovement, Product
+from apps.inventory.services import StockLine, apply_stock_changes, lock_available_stock
+from .models import Sale, SaleItem
+from .rollups import record_sales
+
+CHUNK_SIZE = 64 * 1024
+STATUS_CREATED = 'created'
+STATUS_DUPLICATE = 'duplicate'
+STATUS_ERROR = 'error'
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def iter_ndjson(stream):
+    """Una venta por línea; las líneas inválidas se entregan como `InvalidRecord`."""
+    for number, raw in enumerate(iter(stream.readline, b''), start=1):
+        line = raw.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield InvalidRecord(f'Línea {number}: JSON inválido')
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE, max_record=None):
+    """Recorre un arreglo JSON de ventas leyendo el stream por bloques.
+
+    Si una venta no termina de decodificarse dentro de `max_record` caracteres se corta
+    la lectura, para no acumular en memoria el resto de un cuerpo malformado.
+    """
+    max_record = max_record or getattr(settings, 'SALES_BULK_MAX_RECORD', 1024 * 1024)
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer, pos, eof, started = '', 0, False, False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                if started:
+                    yield InvalidRecord('Arreglo JSON incompleto')
+                return
+            fill()
+            continue
+        if not started:
+            if buffer[pos] != '[':
+                yield InvalidRecord('Se esperaba un arreglo JSON')
+                return
+            started, pos = True, pos + 1
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            record, pos = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            if eof:
+                yield InvalidRecord('JSON inválido')
+                return
+            if len(buffer) - pos > max_record:
+                yield InvalidRecord(f'Venta inválida o mayor a {max_record} caracteres')
+                return
+            fill()
+            continue
+        yield record
+
+
+def _error(record, message):
+    client_id = record.get('client_id') if isinstance(record, dict) else None
+    return {'client_id': client_id, 'status': STATUS_ERROR, 'error': message}
+
+
+def _parse(record):
+    if isinstance(record, InvalidRecord):
+        raise record
+    if not isinstance(record, dict):
+        raise InvalidRecord('Cada venta debe ser un objeto JSON')
+    client_id = record.get('client_id')
+    if not isinstance(client_id, str) or not client_id or len(client_id) > 64:
+        raise InvalidRecord('client_id es obligatorio (máximo 64 caracteres)')
+    payment_method = record.get('payment_method')
+    if not isinstance(payment_method, str) or not payment_method:
+        raise InvalidRecord('payment_method es obligatorio')
+    created_at = None
+    if record.get('created_at'):
+        created_at = parse_datetime(str(record['created_at']))
+        if created_at is None:
+            raise InvalidRecord('created_at inválido')
+        if timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at)
+        if created_at > timezone.now():
+            raise InvalidRecord('La fecha de venta no puede estar en el futuro')
+    items = record.get('items')
+    if not isinstance(items, list) or not items:
+        raise InvalidRecord('Debe incluir items')
+    parsed_items = []
+    for item in items:
+        try:
+            quantity = int(item['quantity'])
+            unit_price = Decimal(str(item['unit_price']))
+            product = int(item['product'])
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            raise InvalidRecord('Cada item requiere product, quantity y unit_price') from None
+        if quantity < 1 or unit_price < 0:
+            raise InvalidRecord('Cantidad y precio inválidos')
+        parsed_items.append({'product': product, 'quantity': quantity, 'unit_price': unit_price})
+    try:
+        branch = int(record.get('branch'))
+    except (TypeError, ValueError):
+        raise InvalidRecord('Sucursal inválida') from None
+    return {
+        'client_id': client_id,
+        'branch': branch,
+        'payment_method': payment_method[:50],
+        'created_at': created_at,
+        'items': parsed_items,
+    }
+
+
+def ingest_sales(user, records, batch_size=None):
+    """Registra las ventas y genera un resultado por venta, en el orden recibido."""
+    batch_size = batch_size or getattr(settings, 'SALES_BULK_BATCH', 200)
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield from _ingest_batch(user, batch)
+
+
+def _ingest_batch(user, batch):
+    company = user.company
+    results, parsed = {}, []
+    for index, record in enumerate(batch):
+        try:
+            parsed.append((index, _parse(record)))
+        except InvalidRecord as exc:
+            results[index] = _error(record, str(exc))
+
+    branch_ids = {sale['branch'] for _, sale in parsed}
+    product_ids = {item['product'] for _, sale in parsed for item in sale['items']}
+    branches = Branch.objects.filter(company=company).in_bulk(branch_ids)
+    products = Product.objects.filter(company=company).in_bulk(product_ids)
+
+    by_branch = defaultdict(list)
+    for index, sale in parsed:
+        branch = branches.get(sale['branch'])
+        unknown = [item['product'] for item in sale['items'] if item['product'] not in products]
+        if branch is None:
+            results[index] = _error(sale, 'Sucursal inválida')
+        elif unknown:
+            results[index] = _error(sale, f'Producto inválido: {unknown[0]}')
+        else:
+            for item in sale['items']:
+                item['product'] = products[item['product']]
+            by_branch[branch].append((index, sale))
+
+    for branch, sales in by_branch.items():
+        try:
+            results.update(_save_branch_batch(user, branch, sales))
+        except IntegrityError:
+            # Otro request registró alguno de estos client_id entre medio: se recalculan como duplicados.
+            results.update(_save_branch_batch(user, branch, sales))
+    for index in range(len(batch)):
+        yield results[index]
+
+
+@retry_on_conflict('sales.bulk_ingest')
+def _save_branch_batch(user, branch, sales):
+    company = user.company
+    keys = {(branch.pk, item['product'].pk) for _, sale in sales for item in sale['items']}
+    available = lock_available_stock(company, keys)
+    existing = dict(
+        Sale.objects.filter(company=company, client_id__in=[sale['client_id'] for _, sale in sales]).values_list('client_id', 'id')
+    )
+
+    results, accepted, repeated = {}, {}, []
+    for index, sale in sales:
+        client_id = sale['client_id']
+        if client_id in existing:
+            results[index] = {'client_id': client_id, 'status': STATUS_DUPLICATE, 'id': existing[client_id]}
+            continue
+        if client_id in accepted:
+            repeated.append((index, client_id))
+            continue
+        needed = defaultdict(int)
+        for item in sale['items']:
+            needed[(branch.pk, item['product'].pk)] += item['quantity']
+        short = next((key for key, quantity in needed.items() if available.get(key, 0) < quantity), None)
+        if short is not None:
+            name = next(item['product'].name for item in sale['items'] if item['product'].pk == short[1])
+            results[index] = _error(sale, f'Stock insuficiente para {name}')
+            continue
+        for key, quantity in needed.items():
+            available[key] -= quantity
+        accepted[client_id] = (index, sale)
+
+    if accepted:
+        now = timezone.now()
+        created = Sale.objects.bulk_create(
+            [
+                Sale(
+                    company=company,
+                    branch=branch,
+                    seller=user,
+                    payment_method=sale['payment_method'],
+                    created_at=sale['created_at'] or now,
+                    client_id=sale['client_id'],
+                    total=sum((item['quantity'] * item['unit_price'] for item in sale['items']), Decimal('0')),
+                )
+                for _, sale in accepted.values()
+            ]
+        )
+        items = SaleItem.objects.bulk_create(
+            [SaleItem(sale=obj, **item) for obj, (_, sale) in zip(created, accepted.values()) for item in sale['items']]
+        )
+        by_sale = defaultdict(list)
+        for item in items:
+            by_sale[item.sale_id].append(item)
+        record_sales([(obj, by_sale[obj.pk]) for obj in created])
+        apply_stock_changes(
+            company,
+            [StockLine(branch, item['product'], -item['quantity']) for _, sale in accepted.values() for item in sale['items']],
+            InventoryMovement.MOV_SALE,
+            user,
+            reason='Venta POS offline',
+        )
+        for obj, (index, sale) in zip(created, accepted.values()):
+            results[index] = {'client_id': sale['client_id'], 'status': STATUS_CREATED, 'id': obj.pk}
+            existing[sale['client_id']] = obj.pk
+    for index, client_id in repeated:
+        results[index] = {'client_id': client_id, 'status': STATUS_DUPLICATE, 'id': existing[client_id]}
+    return results
@@ -0,0 +1,44 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.core.models import Company
+from apps.sales.rollups import rebuild_company
+
+
+def _worker_init():
+    django.setup()
+    # Cada proceso abre sus propias conexiones; las heredadas del padre no se comparten.
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los rollups diarios de ventas desde Sale, una compañía por tarea'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, action='append', help='Id de compañía (repetible); por defecto todas')
+        parser.add_argument('--workers', type=int, default=1, help='Procesos en paralelo; 1 ejecuta en este proceso')
+
+    def handle(self, *args, **options):
+        company_ids = options['company'] or list(Company.objects.order_by('id').values_list('id', flat=True))
+        start = time.perf_counter()
+        rows = 0
+        if options['workers'] <= 1:
+            for company_id in company_ids:
+                rows += self._report(company_id, rebuild_company(company_id))
+        else:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_worker_init) as pool:
+                futures = {pool.submit(rebuild_company, company_id): company_id for company_id in company_ids}
+                for future in as_completed(futures):
+                    rows += self._report(futures[future], future.result())
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{len(company_ids)} compañías, {rows} filas en {elapsed:.1f}s')
+
+    def _report(self, company_id, rows):
+        self.stdout.write(f'Compañía {company_id}: {rows} filas')
+        return rows
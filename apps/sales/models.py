@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from apps.core.models import Company
 from apps.inventory.models import Branch, Product
 
@@ -10,7 +11,18 @@ class Sale(models.Model):
     seller = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True)
     total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     payment_method = models.CharField(max_length=50)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # default en vez de auto_now_add: las ventas offline conservan la hora en que ocurrieron.
+    created_at = models.DateTimeField(default=timezone.now)
+    # Id generado por el POS para que reenviar una venta no la duplique.
+    client_id = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        unique_together = ('company', 'client_id')
+        indexes = [
+            models.Index(fields=['company', 'created_at'], name='sale_co_created_idx'),
+            models.Index(fields=['company', 'branch', 'created_at'], name='sale_co_branch_created_idx'),
+            models.Index(fields=['company', 'seller', 'created_at'], name='sale_co_seller_created_idx'),
+        ]
 
 
 class SaleItem(models.Model):
@@ -46,9 +58,55 @@ class Order(models.Model):
     total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'status'], name='order_co_status_idx'),
+            models.Index(fields=['company', 'created_at'], name='order_co_created_idx'),
+        ]
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     unit_price = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(0)])
+
+
+class DailySalesRollup(models.Model):
+    """Ventas por día, sucursal, vendedor y medio de pago; se actualiza en la transacción de cada venta."""
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    seller = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, related_name='+')
+    payment_method = models.CharField(max_length=50)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tickets = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('company', 'branch', 'day', 'seller', 'payment_method')
+        indexes = [models.Index(fields=['company', 'day'])]
+
+
+class DailyProductRollup(models.Model):
+    """Unidades e ingresos por día, sucursal y producto."""
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tickets = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('company', 'branch', 'day', 'product')
+        indexes = [models.Index(fields=['company', 'day'])]
+
+
+class SalesRollupState(models.Model):
+    """Marca que los rollups de la compañía fueron reconstruidos y cubren todo su historial."""
+
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, related_name='sales_rollup_state')
+    built_at = models.DateTimeField()
@@ -0,0 +1,211 @@
+"""Rollups diarios de ventas mantenidos en la misma transacción que cada venta.
+
+Cada venta suma sus montos con un `INSERT ... ON CONFLICT DO UPDATE` por tabla (SQLite y
+PostgreSQL). `rebuild_company` recalcula el historial de una compañía desde `Sale` y la
+marca como cubierta; desde entonces los reportes leen de los rollups. En PostgreSQL las ventas
+toman un advisory lock compartido de la compañía y la reconstrucción uno exclusivo: las ventas
+no se esperan entre sí, pero ninguna se cuela entre el borrado y el recálculo.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth
+from django.utils import timezone
+
+from apps.core.data_versions import bump_data_version
+from apps.core.dates import filter_days
+from apps.core.transactions import retry_on_conflict
+from .models import DailyProductRollup, DailySalesRollup, Sale, SaleItem, SalesRollupState
+
+BULK_BATCH = 1000
+# Primer entero de los advisory locks de rollups; el segundo es el id de la compañía.
+ROLLUP_LOCK_NAMESPACE = 4207
+
+
+def _lock_rollups(company_ids, shared):
+    """Advisory lock de transacción por compañía, compartido para ventas y exclusivo para reconstruir.
+
+    Solo en PostgreSQL; SQLite ya serializa las transacciones de escritura.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    function = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+    with connection.cursor() as cursor:
+        for company_id in sorted(company_ids):
+            cursor.execute(f'SELECT {function}(%s, %s)', [ROLLUP_LOCK_NAMESPACE, company_id])
+
+
+def _upsert(model, keys, values, rows):
+    """Inserta `rows` (`{campo: valor}`) y, si la llave ya existe, suma los campos de `values`."""
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    fields = [model._meta.get_field(name) for name in (*keys, *values)]
+    columns = ', '.join(quote(field.column) for field in fields)
+    conflict = ', '.join(quote(model._meta.get_field(name).column) for name in keys)
+    updates = ', '.join(
+        f'{quote(field.column)} = {table}.{quote(field.column)} + EXCLUDED.{quote(field.column)}' for field in fields[len(keys):]
+    )
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(rows))
+    params = [field.get_db_prep_save(row[field.name], connection) for row in rows for field in fields]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) VALUES {placeholders} ON CONFLICT ({conflict}) DO UPDATE SET {updates}', params
+        )
+
+
+def record_sales(entries, sign=1):
+    """Suma (o resta con `sign=-1`) a los rollups las ventas `[(sale, items)]`.
+
+    `items` son objetos `SaleItem`. Debe llamarse dentro de la transacción que guarda las ventas.
+    """
+    entries = list(entries)
+    # Espera solo a una reconstrucción en curso de la compañía, no a otras ventas.
+    _lock_rollups({sale.company_id for sale, _ in entries}, shared=True)
+    sales, products = defaultdict(lambda: [Decimal('0'), 0, 0]), defaultdict(lambda: [Decimal('0'), 0, 0])
+    for sale, items in entries:
+        day = timezone.localdate(sale.created_at)
+        totals = sales[(sale.company_id, sale.branch_id, day, sale.seller_id, sale.payment_method)]
+        totals[0] += sign * (sale.total or Decimal('0'))
+        totals[1] += sign
+        seen = set()
+        for item in items:
+            totals[2] += sign * item.quantity
+            line = products[(sale.company_id, sale.branch_id, day, item.product_id)]
+            line[0] += sign * item.quantity * item.unit_price
+            line[2] += sign * item.quantity
+            if item.product_id not in seen:
+                seen.add(item.product_id)
+                line[1] += sign
+    _upsert(
+        DailySalesRollup,
+        ('company', 'branch', 'day', 'seller', 'payment_method'),
+        ('revenue', 'tickets', 'units'),
+        [
+            {'company': company, 'branch': branch, 'day': day, 'seller': seller, 'payment_method': method,
+             'revenue': revenue, 'tickets': tickets, 'units': units}
+            for (company, branch, day, seller, method), (revenue, tickets, units) in sales.items()
+        ],
+    )
+    _upsert(
+        DailyProductRollup,
+        ('company', 'branch', 'day', 'product'),
+        ('revenue', 'tickets', 'units'),
+        [
+            {'company': company, 'branch': branch, 'day': day, 'product': product,
+             'revenue': revenue, 'tickets': tickets, 'units': units}
+            for (company, branch, day, product), (revenue, tickets, units) in products.items()
+        ],
+    )
+
+
+def remove_sale(sale):
+    """Descuenta de los rollups una venta que se va a eliminar o modificar."""
+    record_sales([(sale, list(sale.items.all()))], sign=-1)
+
+
+@retry_on_conflict('sales.rebuild_rollups')
+def rebuild_company(company_id) -> int:
+    """Recalcula los rollups de una compañía desde `Sale` y devuelve las filas escritas."""
+    # Con el lock exclusivo las ventas en curso ya confirmaron y quedan en el agregado; las nuevas esperan.
+    _lock_rollups([company_id], shared=False)
+    DailySalesRollup.objects.filter(company_id=company_id).delete()
+    DailyProductRollup.objects.filter(company_id=company_id).delete()
+    sales = Sale.objects.filter(company_id=company_id).annotate(day=TruncDate('created_at'))
+    by_key = {
+        (row['branch_id'], row['day'], row['seller_id'], row['payment_method']): row
+        for row in sales.values('branch_id', 'day', 'seller_id', 'payment_method').annotate(revenue=Sum('total'), tickets=Count('id'))
+    }
+    units = (
+        SaleItem.objects.filter(sale__company_id=company_id)
+        .annotate(day=TruncDate('sale__created_at'))
+        .values_list('sale__branch_id', 'day', 'sale__seller_id', 'sale__payment_method')
+        .annotate(units=Sum('quantity'))
+    )
+    units = {(branch_id, day, seller_id, method): total for branch_id, day, seller_id, method, total in units}
+    DailySalesRollup.objects.bulk_create(
+        [
+            DailySalesRollup(
+                company_id=company_id, branch_id=branch_id, day=day, seller_id=seller_id, payment_method=method,
+                revenue=row['revenue'] or 0, tickets=row['tickets'], units=units.get((branch_id, day, seller_id, method), 0),
+            )
+            for (branch_id, day, seller_id, method), row in by_key.items()
+        ],
+        batch_size=BULK_BATCH,
+    )
+    line_total = ExpressionWrapper(F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    products = (
+        SaleItem.objects.filter(sale__company_id=company_id)
+        .annotate(day=TruncDate('sale__created_at'))
+        .values('sale__branch_id', 'day', 'product_id')
+        .annotate(revenue=Sum(line_total), units=Sum('quantity'), tickets=Count('sale_id', distinct=True))
+    )
+    created = DailyProductRollup.objects.bulk_create(
+        [
+            DailyProductRollup(
+                company_id=company_id, branch_id=row['sale__branch_id'], day=row['day'], product_id=row['product_id'],
+                revenue=row['revenue'] or 0, units=row['units'], tickets=row['tickets'],
+            )
+            for row in products
+        ],
+        batch_size=BULK_BATCH,
+    )
+    SalesRollupState.objects.update_or_create(company_id=company_id, defaults={'built_at': timezone.now()})
+    bump_data_version(company_id)
+    return len(by_key) + len(created)
+
+
+def rollup_ready(company_id) -> bool:
+    return SalesRollupState.objects.filter(company_id=company_id).exists()
+
+
+def _as_period(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def sales_series(company_id, group='day', branch_id=None, date_from=None, date_to=None):
+    """Total vendido por día o mes; lee de los rollups si la compañía ya está cubierta."""
+    if not rollup_ready(company_id):
+        qs = Sale.objects.filter(company_id=company_id)
+        if branch_id:
+            qs = qs.filter(branch_id=branch_id)
+        qs = filter_days(qs, 'created_at', date_from, date_to)
+        annotator = TruncDay('created_at') if group == 'day' else TruncMonth('created_at')
+        return list(qs.annotate(period=annotator).values('period').annotate(total=Sum('total')).order_by('period'))
+
+    qs = DailySalesRollup.objects.filter(company_id=company_id)
+    if branch_id:
+        qs = qs.filter(branch_id=branch_id)
+    if date_from:
+        qs = qs.filter(day__gte=date_from)
+    if date_to:
+        qs = qs.filter(day__lte=date_to)
+    period = F('day') if group == 'day' else TruncMonth('day')
+    rows = (
+        qs.annotate(period=period).values('period').annotate(total=Sum('revenue'), tickets=Sum('tickets'))
+        .filter(tickets__gt=0).order_by('period')
+    )
+    return [{'period': _as_period(row['period']), 'total': row['total']} for row in rows]
+
+
+def sales_count(company_id, day=None, seller=None) -> int:
+    """Cantidad de ventas (del día o del vendedor); usa los rollups si están disponibles."""
+    if rollup_ready(company_id):
+        qs = DailySalesRollup.objects.filter(company_id=company_id)
+        if day:
+            qs = qs.filter(day=day)
+        if seller:
+            qs = qs.filter(seller=seller)
+        return qs.aggregate(total=Sum('tickets'))['total'] or 0
+    qs = Sale.objects.filter(company_id=company_id)
+    if day:
+        qs = filter_days(qs, 'created_at', day, day)
+    if seller:
+        qs = qs.filter(seller=seller)
+    return qs.count()
@@ -1,43 +1,39 @@
 from decimal import Decimal
 
-from django.db import transaction
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
-from apps.inventory.models import Inventory, InventoryMovement
+from apps.core.transactions import retry_on_conflict
+from apps.inventory.models import InventoryMovement
+from apps.inventory.services import StockLine, apply_stock_changes
 from .models import Sale, SaleItem
+from .rollups import record_sales
 
 
-def create_sale(validated_data, user):
+def create_sale(validated_data, user, mode=None):
     items_data = list(validated_data.pop('items'))
     branch = validated_data['branch']
     if branch.company != user.company:
         raise ValidationError('Sucursal inválida')
-    total = Decimal('0')
-    with transaction.atomic():
-        sale = Sale.objects.create(company=user.company, seller=user, **validated_data)
-        for item in items_data:
-            product = item['product']
-            quantity = item['quantity']
-            unit_price = item['unit_price']
-            inventory = Inventory.objects.select_for_update().get(company=user.company, branch=branch, product=product)
-            if inventory.stock < quantity:
-                raise ValidationError('Stock insuficiente')
-            inventory.stock -= quantity
-            inventory.save()
-            SaleItem.objects.create(sale=sale, **item)
-            InventoryMovement.objects.create(
-                company=user.company,
-                branch=branch,
-                product=product,
-                movement_type=InventoryMovement.MOV_SALE,
-                quantity_delta=-quantity,
-                reason='Venta',
-                created_by=user,
-            )
-            total += quantity * unit_price
-        sale.total = total
-        sale.save()
-        if sale.created_at > timezone.now():
-            raise ValidationError('La fecha de venta no puede estar en el futuro')
+    return _save_sale(validated_data, items_data, user, mode)
+
+
+@retry_on_conflict('sales.create_sale')
+def _save_sale(sale_data, items_data, user, mode):
+    branch = sale_data['branch']
+    sale = Sale.objects.create(company=user.company, seller=user, **sale_data)
+    apply_stock_changes(
+        user.company,
+        [StockLine(branch, item['product'], -item['quantity']) for item in items_data],
+        InventoryMovement.MOV_SALE,
+        user,
+        reason='Venta',
+        mode=mode,
+    )
+    items = SaleItem.objects.bulk_create([SaleItem(sale=sale, **item) for item in items_data])
+    sale.total = sum((item['quantity'] * item['unit_price'] for item in items_data), Decimal('0'))
+    sale.save(update_fields=['total'])
+    record_sales([(sale, items)])
+    if sale.created_at > timezone.now():
+        raise ValidationError('La fecha de venta no puede estar en el futuro')
     return sale
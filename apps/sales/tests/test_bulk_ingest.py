@@ -0,0 +1,112 @@
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.core.models import Company, Plan, Subscription
+from apps.inventory.models import Branch, Inventory, InventoryMovement, Product
+from apps.sales import ingest
+from apps.sales.ingest import InvalidRecord, iter_json_array
+from apps.sales.models import Sale
+
+User = get_user_model()
+
+
+class BulkSaleIngestTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        Subscription.objects.create(
+            company=self.company,
+            plan=plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='vendedor', password='pass1234', role=User.ROLE_VENDEDOR, email='v@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        self.product = Product.objects.create(company=self.company, sku='P1', name='Producto 1', price=Decimal('100'), cost=Decimal('50'))
+        Inventory.objects.create(company=self.company, branch=self.branch, product=self.product, stock=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _sale(self, client_id, quantity=1, **extra):
+        sale = {
+            'client_id': client_id,
+            'branch': self.branch.pk,
+            'payment_method': 'efectivo',
+            'items': [{'product': self.product.pk, 'quantity': quantity, 'unit_price': '100'}],
+        }
+        sale.update(extra)
+        return sale
+
+    def _post(self, body, content_type):
+        response = self.client.generic('POST', reverse('sale-bulk'), body, content_type=content_type)
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_ndjson_upload_is_idempotent(self):
+        lines = [
+            self._sale('pos1-1', 2, created_at='2024-03-01T10:00:00'),
+            self._sale('pos1-2', 2),
+            self._sale('pos1-1', 2),
+            self._sale('pos1-3', 2),
+        ]
+        body = '\n'.join(json.dumps(line) for line in lines) + '\n{roto\n'
+        results = self._post(body, 'application/x-ndjson')
+        self.assertEqual([r['status'] for r in results], ['created', 'created', 'duplicate', 'error', 'error'])
+        self.assertEqual(results[2]['id'], results[0]['id'])
+        self.assertIn('Stock insuficiente', results[3]['error'])
+        self.assertEqual(Inventory.objects.get(branch=self.branch, product=self.product).stock, 1)
+        self.assertEqual(InventoryMovement.objects.filter(movement_type=InventoryMovement.MOV_SALE).count(), 2)
+        self.assertEqual(Sale.objects.get(client_id='pos1-1').created_at.date(), date(2024, 3, 1))
+
+        results = self._post(json.dumps(lines[0]), 'application/x-ndjson')
+        self.assertEqual(results[0]['status'], 'duplicate')
+        self.assertEqual(Sale.objects.count(), 2)
+
+    def test_json_array_upload_validates_branch(self):
+        body = json.dumps([self._sale('a-1'), self._sale('a-2', branch=999999)])
+        results = self._post(body, 'application/json')
+        self.assertEqual([r['status'] for r in results], ['created', 'error'])
+        self.assertEqual(results[1]['error'], 'Sucursal inválida')
+
+    def test_json_array_parser_reads_in_chunks(self):
+        records = [self._sale(f'c-{i}', created_at='2024-03-01T10:00:00') for i in range(5)]
+        parsed = list(iter_json_array(BytesIO(json.dumps(records).encode()), chunk_size=7))
+        self.assertEqual(parsed, records)
+        parsed = list(iter_json_array(BytesIO(b'[{"a": 1}, {"b"')))
+        self.assertEqual(parsed[0], {'a': 1})
+        self.assertIsInstance(parsed[1], InvalidRecord)
+
+    def test_json_array_parser_stops_on_oversized_record(self):
+        stream = BytesIO(b'[{"a": 1}, {"b": "' + b'x' * 100)
+        parsed = list(iter_json_array(stream, chunk_size=8, max_record=32))
+        self.assertEqual(parsed[0], {'a': 1})
+        self.assertIsInstance(parsed[1], InvalidRecord)
+        self.assertLess(stream.tell(), 100)
+
+    @override_settings(SALES_BULK_BATCH=1)
+    def test_failure_mid_stream_ends_with_error_record(self):
+        save = ingest._save_branch_batch
+        calls = []
+
+        def flaky(user, branch, sales):
+            calls.append(1)
+            if len(calls) > 1:
+                raise RuntimeError('falla')
+            return save(user, branch, sales)
+
+        body = '\n'.join(json.dumps(self._sale(f'm-{i}')) for i in range(3))
+        with mock.patch('apps.sales.ingest._save_branch_batch', side_effect=flaky), self.assertLogs('apps.sales.views', level='ERROR'):
+            results = self._post(body, 'application/x-ndjson')
+        self.assertEqual([r['status'] for r in results], ['created', 'error'])
+        self.assertIsNone(results[1]['client_id'])
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import TestCase
+
+from apps.core.dates import day_start, filter_days
+from apps.core.models import Company
+from apps.inventory.models import Branch, InventoryMovement
+from apps.sales.models import Order, Sale
+
+
+class QueryPlanTests(TestCase):
+    """El planificador debe usar los índices compuestos en los filtros habituales por compañía."""
+
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        if connection.vendor == 'postgresql':
+            # Con tablas casi vacías PostgreSQL prefiere un seq scan; se desactiva para ver el índice elegido.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, qs, index_name):
+        plan = qs.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_sale_date_range_uses_company_indexes(self):
+        today = date.today()
+        sales = filter_days(Sale.objects.filter(company=self.company), 'created_at', today - timedelta(days=7), today)
+        self.assertUsesIndex(sales, 'sale_co_created_idx')
+        self.assertUsesIndex(sales.filter(branch=self.branch), 'sale_co_branch_created_idx')
+
+    def test_half_open_range_keeps_boundaries(self):
+        sql = str(filter_days(Sale.objects.all(), 'created_at', '2024-03-01', '2024-03-31').query)
+        self.assertIn('"sales_sale"."created_at" >=', sql)
+        self.assertIn('"sales_sale"."created_at" <', sql)
+        self.assertNotIn('django_datetime_cast_date', sql)
+
+    def test_order_status_and_movement_history_use_indexes(self):
+        self.assertUsesIndex(Order.objects.filter(company=self.company, status=Order.STATUS_PENDING), 'order_co_status_idx')
+        movements = InventoryMovement.objects.filter(
+            company=self.company, branch=self.branch, product_id=1, created_at__gte=day_start(date.today())
+        )
+        self.assertUsesIndex(movements, 'invmov_co_br_prod_created_idx')
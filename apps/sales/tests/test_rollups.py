@@ -0,0 +1,141 @@
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.core.models import Company, Plan, PlanFeature, Subscription
+from apps.inventory.models import Branch, Inventory, Product
+from apps.sales import rollups
+from apps.sales.models import DailyProductRollup, DailySalesRollup
+from apps.sales.services import create_sale
+
+User = get_user_model()
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company = Company.objects.create(name='ACME', rut='12345678-5')
+            reports, _ = PlanFeature.objects.get_or_create(code='reports', defaults={'label': 'Reportes'})
+            plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+            plan.features.add(reports)
+            Subscription.objects.create(
+                company=self.company,
+                plan=plan,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=30),
+            )
+            self.user = User.objects.create_user(
+                username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+                company=self.company,
+            )
+            self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+            self.products = [
+                Product.objects.create(company=self.company, sku=f'P{i}', name=f'Producto {i}', price=Decimal('100'), cost=Decimal('50'))
+                for i in range(2)
+            ]
+            for product in self.products:
+                Inventory.objects.create(company=self.company, branch=self.branch, product=product, stock=100)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def _sale(self, quantity, method='efectivo'):
+        items = [{'product': p, 'quantity': quantity, 'unit_price': p.price} for p in self.products]
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_sale({'branch': self.branch, 'payment_method': method, 'items': items}, self.user)
+
+    def _snapshot(self):
+        sales = DailySalesRollup.objects.filter(tickets__gt=0).values_list('payment_method', 'revenue', 'tickets', 'units')
+        products = DailyProductRollup.objects.filter(tickets__gt=0).values_list('product_id', 'revenue', 'tickets', 'units')
+        return sorted(sales), sorted(products)
+
+    def test_sales_update_rollups_and_backfill_matches(self):
+        self._sale(1)
+        self._sale(2)
+        self._sale(3, method='debito')
+        incremental = self._snapshot()
+        self.assertEqual(incremental[0], [('debito', Decimal('600.00'), 1, 6), ('efectivo', Decimal('600.00'), 2, 6)])
+
+        out = StringIO()
+        call_command('backfill_sales_rollups', stdout=out)
+        self.assertIn('1 compañías', out.getvalue())
+        self.assertEqual(self._snapshot(), incremental)
+
+    def test_report_reads_rollup_and_tracks_deletes(self):
+        sale = self._sale(1)
+        self._sale(2)
+        raw = self.api.get(reverse('report-sales')).json()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('backfill_sales_rollups', stdout=StringIO())
+        self.assertEqual(self.api.get(reverse('report-sales')).json(), raw)
+        self.assertEqual(raw[0]['total'], 600.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.api.delete(reverse('sale-detail', args=[sale.pk])).status_code, 204)
+        report = self.api.get(reverse('report-sales')).json()
+        self.assertEqual(report[0]['total'], 400.0)
+
+    def test_sales_lock_shared_and_rebuild_exclusive(self):
+        with mock.patch('apps.sales.rollups._lock_rollups', wraps=rollups._lock_rollups) as lock:
+            self._sale(1)
+            rollups.rebuild_company(self.company.pk)
+        self.assertEqual(
+            lock.call_args_list, [mock.call({self.company.pk}, shared=True), mock.call([self.company.pk], shared=False)]
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Los advisory locks compartidos solo existen en PostgreSQL')
+class ConcurrentRollupTests(TransactionTestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        self.user = User.objects.create_user(
+            username='gerente', password='pass1234', role=User.ROLE_GERENTE, email='g@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.product = Product.objects.create(company=self.company, sku='P1', name='Producto 1', price=Decimal('100'), cost=Decimal('50'))
+        self.branches = [Branch.objects.create(company=self.company, name=f'Sucursal {i}', address='Calle 1') for i in range(2)]
+        for branch in self.branches:
+            Inventory.objects.create(company=self.company, branch=branch, product=self.product, stock=10)
+
+    def _sale(self, branch):
+        items = [{'product': self.product, 'quantity': 1, 'unit_price': self.product.price}]
+        return create_sale({'branch': branch, 'payment_method': 'efectivo', 'items': items}, self.user)
+
+    def test_sales_in_different_branches_do_not_block_each_other(self):
+        recorded, release = threading.Event(), threading.Event()
+
+        def open_sale():
+            try:
+                with transaction.atomic():
+                    self._sale(self.branches[0])
+                    recorded.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        def other_sale():
+            try:
+                self._sale(self.branches[1])
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=open_sale)
+        first.start()
+        self.assertTrue(recorded.wait(10))
+        second = threading.Thread(target=other_sale)
+        second.start()
+        second.join(5)
+        finished = not second.is_alive()
+        release.set()
+        first.join()
+        second.join()
+        self.assertTrue(finished)
+        self.assertEqual(DailySalesRollup.objects.filter(company=self.company).count(), 2)
@@ -1,11 +1,14 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import SaleViewSet, CartAddView, CheckoutView
+from .views import SaleViewSet, SaleBulkIngestView, CartAddView, CartReserveView, CheckoutView
 
 router = DefaultRouter()
 router.register(r'sales', SaleViewSet, basename='sale')
 
-urlpatterns = router.urls + [
+urlpatterns = [
+    path('sales/bulk/', SaleBulkIngestView.as_view(), name='sale-bulk'),
+] + router.urls + [
     path('cart/add/', CartAddView.as_view(), name='cart-add'),
+    path('cart/reserve/', CartReserveView.as_view(), name='cart-reserve'),
     path('cart/checkout/', CheckoutView.as_view(), name='cart-checkout'),
 ]
@@ -1,18 +1,31 @@
+import json
+import logging
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, status, generics
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.db import transaction
+from apps.core.dates import filter_days
+from apps.core.transactions import retry_on_conflict
 from apps.core.permissions import IsActive
 from apps.accounts.permissions import IsAdminOrGerente, IsInternal
-from apps.inventory.models import Inventory, InventoryMovement, Product, Branch
-from .models import Sale, SaleItem, CartItem, Order, OrderItem
+from apps.inventory.models import InventoryMovement, Branch
+from apps.inventory.services import StockLine, apply_stock_changes, reserve_stock
+from .ingest import STATUS_ERROR, ingest_sales, iter_json_array, iter_ndjson
+from .models import Sale, CartItem, Order, OrderItem
+from .rollups import record_sales, remove_sale
 from .serializers import SaleSerializer, CartItemSerializer, OrderSerializer
 from .services import create_sale
 
+logger = logging.getLogger(__name__)
+
 
 class SaleViewSet(viewsets.ModelViewSet):
     serializer_class = SaleSerializer
+    cursor_ordering = ('-created_at', '-id')
 
     def get_permissions(self):
         if self.action == 'list':
@@ -20,21 +33,63 @@ class SaleViewSet(viewsets.ModelViewSet):
         return [IsActive(), IsInternal()]
 
     def get_queryset(self):
-        qs = Sale.objects.filter(company=self.request.user.company)
+        qs = Sale.objects.filter(company_id=self.request.user.company_id)
         branch = self.request.query_params.get('branch')
         date_from = self.request.query_params.get('date_from')
         date_to = self.request.query_params.get('date_to')
         if branch:
             qs = qs.filter(branch_id=branch)
-        if date_from:
-            qs = qs.filter(created_at__date__gte=date_from)
-        if date_to:
-            qs = qs.filter(created_at__date__lte=date_to)
-        return qs
+        try:
+            return filter_days(qs, 'created_at', date_from, date_to)
+        except ValueError:
+            raise ValidationError({'detail': 'Fecha inválida, usa AAAA-MM-DD'})
 
     def perform_create(self, serializer):
         return create_sale(serializer.validated_data, self.request.user)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        remove_sale(serializer.instance)
+        sale = serializer.save()
+        record_sales([(sale, list(sale.items.all()))])
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        remove_sale(instance)
+        instance.delete()
+
+
+class SaleBulkIngestView(generics.GenericAPIView):
+    """Carga de ventas del POS offline en NDJSON o arreglo JSON; responde un resultado NDJSON por venta."""
+
+    permission_classes = [IsActive, IsInternal]
+
+    def post(self, request):
+        if not request.user.company_id:
+            return Response({'detail': 'Usuario sin compañía'}, status=status.HTTP_400_BAD_REQUEST)
+        content_type = (request.content_type or '').split(';')[0].strip()
+        stream = request.stream
+        if stream is None:
+            return Response({'detail': 'Cuerpo vacío'}, status=status.HTTP_400_BAD_REQUEST)
+        if content_type in ('application/x-ndjson', 'application/jsonl'):
+            records = iter_ndjson(stream)
+        elif content_type == 'application/json':
+            records = iter_json_array(stream)
+        else:
+            return Response({'detail': 'Use application/x-ndjson o application/json'}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        return StreamingHttpResponse(self._stream(ingest_sales(request.user, records)), content_type='application/x-ndjson')
+
+    @staticmethod
+    def _stream(results):
+        """Serializa los resultados; si la carga falla a mitad de camino cierra con un registro de error."""
+        try:
+            for result in results:
+                yield json.dumps(result, cls=DjangoJSONEncoder) + '\n'
+        except Exception:
+            logger.exception('Carga masiva de ventas interrumpida')
+            # Las ventas sin resultado no se registraron en el lote fallido; el POS puede reenviarlas.
+            yield json.dumps({'client_id': None, 'status': STATUS_ERROR, 'error': 'Carga interrumpida; reenvíe las ventas sin resultado'}) + '\n'
+
 
 class CartAddView(generics.GenericAPIView):
     serializer_class = CartItemSerializer
@@ -45,13 +100,36 @@ class CartAddView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         product = serializer.validated_data['product']
         quantity = serializer.validated_data['quantity']
-        cart_item, created = CartItem.objects.get_or_create(user=request.user, product=product, defaults={'quantity': quantity})
-        if not created:
-            cart_item.quantity = quantity
-            cart_item.save()
+        branch = None
+        if request.data.get('branch_id'):
+            branch = Branch.objects.filter(id=request.data['branch_id'], company_id=request.user.company_id).first()
+            if not branch:
+                return Response({'detail': 'Sucursal inválida'}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            cart_item, created = CartItem.objects.get_or_create(user=request.user, product=product, defaults={'quantity': quantity})
+            if not created:
+                cart_item.quantity = quantity
+                cart_item.save()
+            if branch:
+                reserved_until = reserve_stock(request.user.company, request.user, branch, [(product, quantity)])
+                return Response({'detail': 'Agregado al carrito', 'reserved_until': reserved_until})
         return Response({'detail': 'Agregado al carrito'})
 
 
+class CartReserveView(generics.GenericAPIView):
+    permission_classes = [IsActive]
+
+    def post(self, request):
+        branch = Branch.objects.filter(id=request.data.get('branch_id'), company_id=request.user.company_id).first()
+        if not branch:
+            return Response({'detail': 'Sucursal inválida'}, status=status.HTTP_400_BAD_REQUEST)
+        cart_items = CartItem.objects.filter(user=request.user).select_related('product')
+        if not cart_items:
+            return Response({'detail': 'Carrito vacío'}, status=status.HTTP_400_BAD_REQUEST)
+        reserved_until = reserve_stock(request.user.company, request.user, branch, [(ci.product, ci.quantity) for ci in cart_items])
+        return Response({'detail': 'Stock reservado', 'reserved_until': reserved_until})
+
+
 class CheckoutView(generics.GenericAPIView):
     permission_classes = [IsActive]
 
@@ -60,31 +138,28 @@ class CheckoutView(generics.GenericAPIView):
         branch = Branch.objects.filter(id=branch_id, company=request.user.company).first()
         if not branch:
             return Response({'detail': 'Sucursal inválida'}, status=status.HTTP_400_BAD_REQUEST)
-        cart_items = CartItem.objects.filter(user=request.user)
+        cart_items = CartItem.objects.filter(user=request.user).select_related('product')
         if not cart_items:
             return Response({'detail': 'Carrito vacío'}, status=status.HTTP_400_BAD_REQUEST)
-        total = 0
-        with transaction.atomic():
-            order = Order.objects.create(company=request.user.company, branch=branch, customer_name=request.user.username, customer_email=request.user.email, total=0)
-            for ci in cart_items:
-                inventory = Inventory.objects.select_for_update().get(company=request.user.company, branch=branch, product=ci.product)
-                if inventory.stock < ci.quantity:
-                    raise ValidationError('Stock insuficiente')
-                inventory.stock -= ci.quantity
-                inventory.save()
-                price = ci.product.price
-                total += price * ci.quantity
-                OrderItem.objects.create(order=order, product=ci.product, quantity=ci.quantity, unit_price=price)
-                InventoryMovement.objects.create(
-                    company=request.user.company,
-                    branch=branch,
-                    product=ci.product,
-                    movement_type=InventoryMovement.MOV_SALE,
-                    quantity_delta=-ci.quantity,
-                    reason='Checkout',
-                    created_by=request.user,
-                )
-            order.total = total
-            order.save()
-            cart_items.delete()
-        return Response(OrderSerializer(order).data)
+        company = request.user.company
+
+        @retry_on_conflict('sales.checkout')
+        def place_order():
+            order = Order.objects.create(company=company, branch=branch, customer_name=request.user.username, customer_email=request.user.email, total=0)
+            apply_stock_changes(
+                company,
+                [StockLine(branch, ci.product, -ci.quantity) for ci in cart_items],
+                InventoryMovement.MOV_SALE,
+                request.user,
+                reason='Checkout',
+                reserved_by=request.user,
+            )
+            OrderItem.objects.bulk_create(
+                [OrderItem(order=order, product=ci.product, quantity=ci.quantity, unit_price=ci.product.price) for ci in cart_items]
+            )
+            order.total = sum(ci.product.price * ci.quantity for ci in cart_items)
+            order.save(update_fields=['total'])
+            CartItem.objects.filter(pk__in=[ci.pk for ci in cart_items]).delete()
+            return order
+
+        return Response(OrderSerializer(place_order()).data)
@@ -7,6 +7,8 @@ from django.db.models import Sum
 
 from apps.accounts.models import User
 from apps.inventory.models import Branch, Product
+from apps.core.dates import filter_days
+from apps.core.pagination import paginate_keyset
 from apps.inventory.web_views import _guard_role
 from .models import Sale
 from .serializers import SaleSerializer
@@ -42,17 +44,14 @@ def sales_list(request):
             messages.warning(request, f'Fecha inválida: {value}')
             return None
 
-    date_from_parsed = parse_date(date_from)
-    date_to_parsed = parse_date(date_to)
-    if date_from_parsed:
-        qs = qs.filter(created_at__date__gte=date_from_parsed)
-    if date_to_parsed:
-        qs = qs.filter(created_at__date__lte=date_to_parsed)
+    qs = filter_days(qs, 'created_at', parse_date(date_from), parse_date(date_to))
 
-    sales = qs.select_related('branch', 'seller').annotate(item_count=Sum('items__quantity')).order_by('-created_at')
+    sales = qs.select_related('branch', 'seller').annotate(item_count=Sum('items__quantity'))
+    page = paginate_keyset(request, sales, ('-created_at', '-id'))
 
     context = {
-        'sales': sales,
+        'sales': page.items,
+        'page': page,
         'branches': branches,
         'selected_branch_id': branch_id,
         'date_from': date_from,
@@ -0,0 +1,84 @@
+"""KPIs del dashboard en una sola consulta, servidos desde cache con stale-while-revalidate.
+
+Cada conteo es una subconsulta sobre índices por compañía dentro del mismo SELECT. El
+snapshot se sirve fresco durante `DASHBOARD_KPI_FRESH` segundos; pasado ese plazo un
+único request lo recalcula (`apps.core.singleflight`) mientras los demás siguen mostrando
+el anterior.
+"""
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.core.dates import day_start
+from apps.core.models import Company
+from apps.core.singleflight import single_flight
+from apps.inventory.models import Branch, Inventory, Product, Supplier
+from apps.sales.models import CartItem, DailySalesRollup, Order, Sale, SalesRollupState
+
+
+def count_subquery(qs, field='company_id'):
+    rows = qs.order_by().values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def sum_subquery(qs, column, field='company_id'):
+    rows = qs.order_by().values(field).annotate(total=Sum(column)).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def load_kpis(company_id, user_id=None) -> dict:
+    """Calcula los KPIs de la compañía (y del vendedor `user_id`) en una consulta."""
+    company = OuterRef('pk')
+    today = timezone.localdate()
+    start = day_start(today)
+    annotations = {
+        'products': count_subquery(Product.objects.filter(company_id=company)),
+        'suppliers': count_subquery(Supplier.objects.filter(company_id=company)),
+        'branches': count_subquery(Branch.objects.filter(company_id=company)),
+        'low_stock': count_subquery(Inventory.objects.filter(company_id=company).with_available().filter(available__lte=F('reorder_point'))),
+        'has_inventory': Exists(Inventory.objects.filter(company_id=company)),
+        'sales_today': count_subquery(Sale.objects.filter(company_id=company, created_at__gte=start, created_at__lt=day_start(today + timedelta(days=1)))),
+        'pending_orders': count_subquery(Order.objects.filter(company_id=company, status=Order.STATUS_PENDING)),
+    }
+    if user_id:
+        annotations.update(
+            cart_items=count_subquery(CartItem.objects.filter(user_id=user_id, product__company_id=company), field='user_id'),
+            rollup_ready=Exists(SalesRollupState.objects.filter(company_id=company)),
+            my_sales_rollup=sum_subquery(DailySalesRollup.objects.filter(company_id=company, seller_id=user_id), 'tickets'),
+            my_sales_raw=count_subquery(Sale.objects.filter(company_id=company, seller_id=user_id)),
+        )
+    # Prefijo: varias llaves coinciden con relaciones inversas de Company (products, suppliers...).
+    row = Company.objects.filter(pk=company_id).values(**{f'kpi_{name}': value for name, value in annotations.items()}).first()
+    row = {name[len('kpi_'):]: value for name, value in (row or {}).items()}
+    if user_id and row:
+        ready, rollup, raw = row.pop('rollup_ready'), row.pop('my_sales_rollup'), row.pop('my_sales_raw')
+        row['my_sales'] = rollup if ready else raw
+    return row
+
+
+def _cache():
+    return caches['default']
+
+
+def dashboard_kpis(company_id, user_id=None) -> dict:
+    """Snapshot de KPIs desde cache; lo recalcula un solo request cuando está vencido."""
+    cache = _cache()
+    scope = f'{company_id}:{user_id or 0}'
+    key = f'dashboard:kpis:{scope}'
+    entry = cache.get(key)
+    stale = None
+    if entry is not None:
+        computed_at, stale = entry
+        if time.time() - computed_at < settings.DASHBOARD_KPI_FRESH:
+            return stale
+    values = single_flight('dashboard_kpis', scope, lambda: load_kpis(company_id, user_id), stale=stale)
+    if values is not stale:
+        cache.set(key, (time.time(), values), timeout=settings.DASHBOARD_KPI_TIMEOUT)
+    return values
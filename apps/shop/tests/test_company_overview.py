@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.core.models import Company, Plan, Subscription
+from apps.inventory.models import Branch
+from apps.sales.models import Sale
+from apps.shop.overview import company_overview
+
+User = get_user_model()
+
+
+class CompanyOverviewTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='root', password='pass1234', role=User.ROLE_SUPER_ADMIN, email='r@example.com', rut='11111111-1',
+        )
+        plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        self.companies = []
+        for index, (name, rut) in enumerate((('Alfa', '12345678-5'), ('Beta', '76543210-3'), ('Gamma', '22222222-2'))):
+            company = Company.objects.create(name=name, rut=rut)
+            Subscription.objects.create(
+                company=company, plan=plan, start_date=date.today(), end_date=date.today() + timedelta(days=30)
+            )
+            branch = Branch.objects.create(company=company, name='Centro', address='Calle 1')
+            for user_index in range(index + 1):
+                self._user(company, f'{name}{user_index}', User.ROLE_VENDEDOR if user_index else User.ROLE_ADMIN_CLIENTE)
+            Sale.objects.create(company=company, branch=branch, payment_method='efectivo', total=Decimal(100 * (3 - index)))
+            self.companies.append(company)
+
+    def _user(self, company, username, role):
+        return User.objects.create_user(
+            username=username, password='pass1234', role=role, email=f'{username}@example.com', rut='11111111-1', company=company,
+        )
+
+    def test_overview_annotates_counts_and_revenue(self):
+        rows = {c.name: c for c in company_overview()}
+        gamma = rows['Gamma']
+        self.assertEqual((gamma.user_count, gamma.admin_count, gamma.seller_count, gamma.branch_count), (3, 1, 2, 1))
+        self.assertEqual((gamma.plan_name, gamma.subscription_status), ('Prueba', Subscription.STATUS_ACTIVE))
+        self.assertEqual(rows['Alfa'].revenue_30d, Decimal('300'))
+        self.assertEqual([c.name for c in company_overview('765')], ['Beta'])
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('super_admin_dashboard'))
+        self.assertEqual([c.name for c in response.context['companies']], ['Alfa', 'Beta', 'Gamma'])
+
+    def test_companies_page_sorts_paginates_and_ignores_user_volume(self):
+        self.client.force_login(self.admin)
+        url = reverse('super_admin_companies')
+        first = self.client.get(url, {'sort': '-users', 'page_size': 2})
+        self.assertEqual([c.name for c in first.context['companies']], ['Gamma', 'Beta'])
+        second = self.client.get(url, {'sort': '-users', 'page_size': 2, 'after': first.context['page'].next_cursor})
+        self.assertEqual([c.name for c in second.context['companies']], ['Alfa'])
+
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url, {'page_size': 2})
+        for i in range(20):
+            self._user(self.companies[0], f'extra{i}', User.ROLE_VENDEDOR)
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url, {'page_size': 2})
+        self.assertEqual(len(after.captured_queries), len(before.captured_queries))
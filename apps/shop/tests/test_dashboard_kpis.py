@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.core.models import Company, Plan, Subscription
+from apps.core.singleflight import lock_key
+from apps.inventory.models import Branch, Inventory, Product
+from apps.sales.models import Order
+from apps.sales.services import create_sale
+from apps.shop.kpis import dashboard_kpis, load_kpis
+
+User = get_user_model()
+
+
+class DashboardKpiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name='ACME', rut='12345678-5')
+        plan = Plan.objects.create(code='PRUEBA', name='Prueba')
+        Subscription.objects.create(
+            company=self.company,
+            plan=plan,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+        )
+        self.user = User.objects.create_user(
+            username='vendedor', password='pass1234', role=User.ROLE_VENDEDOR, email='v@example.com', rut='11111111-1',
+            company=self.company,
+        )
+        self.branch = Branch.objects.create(company=self.company, name='Centro', address='Calle 1')
+        self.products = [
+            Product.objects.create(company=self.company, sku=f'P{i}', name=f'Producto {i}', price=Decimal('100'), cost=Decimal('50'))
+            for i in range(3)
+        ]
+        for i, product in enumerate(self.products):
+            Inventory.objects.create(company=self.company, branch=self.branch, product=product, stock=10, reorder_point=i * 5)
+        Order.objects.create(company=self.company, branch=self.branch, status=Order.STATUS_PENDING)
+        items = [{'product': self.products[0], 'quantity': 1, 'unit_price': Decimal('100')}]
+        create_sale({'branch': self.branch, 'payment_method': 'efectivo', 'items': items}, self.user)
+
+    def test_kpis_are_loaded_in_one_query(self):
+        with self.assertNumQueries(1):
+            kpis = load_kpis(self.company.id, self.user.pk)
+        self.assertEqual(
+            kpis,
+            {
+                'products': 3, 'suppliers': 0, 'branches': 1, 'low_stock': 1, 'has_inventory': True, 'sales_today': 1,
+                'pending_orders': 1, 'cart_items': 0, 'my_sales': 1,
+            },
+        )
+
+    @override_settings(DASHBOARD_KPI_FRESH=30)
+    def test_stale_snapshot_is_served_while_another_request_refreshes(self):
+        with mock.patch('apps.shop.kpis.time.time', return_value=1000):
+            self.assertEqual(dashboard_kpis(self.company.id)['products'], 3)
+        Product.objects.create(company=self.company, sku='P9', name='Nuevo', price=Decimal('1'), cost=Decimal('1'))
+        with mock.patch('apps.shop.kpis.time.time', return_value=1010), self.assertNumQueries(0):
+            self.assertEqual(dashboard_kpis(self.company.id)['products'], 3)
+        with mock.patch('apps.shop.kpis.time.time', return_value=1040):
+            cache.add(lock_key('dashboard_kpis', f'{self.company.id}:0'), 1)
+            with self.assertNumQueries(0):
+                self.assertEqual(dashboard_kpis(self.company.id)['products'], 3)
+            cache.delete(lock_key('dashboard_kpis', f'{self.company.id}:0'))
+            with self.assertNumQueries(1):
+                self.assertEqual(dashboard_kpis(self.company.id)['products'], 4)
+
+    def test_dashboard_renders_snapshot(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'Mis ventas')
+        self.assertEqual([kpi['value'] for kpi in response.context['kpis']], [3, 0, 1, 1])
@@ -22,6 +22,7 @@ urlpatterns = [
     path('shop/orders/', views.orders_list_view, name='shop_orders'),
     path('shop/orders/<int:pk>/', views.order_detail_view, name='shop_order_detail'),
     path('purchases/new/', inventory_views.purchase_create, name='purchase_create'),
+    path('purchases/import/', inventory_views.purchase_import, name='purchase_import'),
     path('sales/', sales_web_views.sales_list, name='sales_list'),
     path('reports/stock/', reports_web_views.stock_report, name='report_stock'),
     path('reports/suppliers/', reports_web_views.suppliers_report, name='report_suppliers'),
@@ -35,5 +36,6 @@ urlpatterns = [
     path('suppliers/create/', inventory_views.supplier_create, name='suppliers_create'),
     path('inventory/', inventory_views.inventory_by_branch, name='inventory_by_branch'),
     path('inventory/transfer/', inventory_views.transfer_stock, name='inventory_transfer'),
+    path('inventory/transfer/<int:pk>/receive/', inventory_views.transfer_receive, name='inventory_transfer_receive'),
     path('logout/', views.logout_view, name='logout'),
 ]
@@ -4,22 +4,28 @@ from decimal import Decimal
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
-from django.db.models import F
+from django.db.models import Min
 from django.http import Http404
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
 
 from apps.accounts.models import User
 from apps.accounts.serializers import UserSerializer
 from rest_framework.exceptions import ValidationError
 
-from apps.core.access import plan_allows
+from apps.core.access import companies_with_feature
+from apps.core.pagination import keyset_page, paginate_keyset
+from apps.core.transactions import retry_on_conflict
 from apps.core.forms import PlanForm, SubscriptionAdminForm
-from apps.core.models import Company, Plan, PlanFeature, Subscription
-from apps.inventory.models import Branch, Inventory, InventoryMovement, Product, Supplier
+from apps.core.models import Plan, PlanFeature, Subscription
+from apps.inventory.models import Branch, InventoryMovement, Product, StockReservation
+from apps.inventory.services import InsufficientStock, StockLine, apply_stock_changes, reserve_stock
 from apps.inventory.web_views import _guard_role
 from apps.sales.models import CartItem, Order, OrderItem, Sale, SaleItem
+from apps.sales.rollups import record_sales
+from .kpis import dashboard_kpis
+from .overview import company_overview, overview_ordering
 
 
 def login_view(request):
@@ -47,27 +53,18 @@ def dashboard(request):
         context = {'missing_company': True}
         return render(request, 'dashboard.html', context)
 
-    products = Product.objects.filter(company=company)
-    suppliers = Supplier.objects.filter(company=company)
-    branches = Branch.objects.filter(company=company)
-    inventories = Inventory.objects.filter(company=company)
-    low_stock = inventories.filter(stock__lte=F('reorder_point'))
-
-    today = timezone.now().date()
-    sales_today = Sale.objects.filter(company=company, created_at__date=today)
-    pending_orders = Order.objects.filter(company=company, status=Order.STATUS_PENDING)
-
     role = request.user.role
-    has_data = products.exists() or suppliers.exists() or inventories.exists()
+    stats = dashboard_kpis(company.id, request.user.pk if role == User.ROLE_VENDEDOR else None)
+    has_data = bool(stats['products'] or stats['suppliers'] or stats['has_inventory'])
 
-    reports_enabled = plan_allows(request.user, 'reports')
+    reports_enabled = request.entitlements.allows('reports')
 
     if role == User.ROLE_VENDEDOR:
         kpis = [
-            {'title': 'Productos disponibles', 'value': products.count()},
-            {'title': 'Ítems en carrito', 'value': CartItem.objects.filter(user=request.user, product__company=company).count()},
-            {'title': 'Mis ventas', 'value': Sale.objects.filter(company=company, seller=request.user).count()},
-            {'title': 'Órdenes pendientes', 'value': pending_orders.count()},
+            {'title': 'Productos disponibles', 'value': stats['products']},
+            {'title': 'Ítems en carrito', 'value': stats['cart_items']},
+            {'title': 'Mis ventas', 'value': stats['my_sales']},
+            {'title': 'Órdenes pendientes', 'value': stats['pending_orders']},
         ]
         quick_actions = [
             {'label': 'Productos', 'url': 'shop-products'},
@@ -77,11 +74,11 @@ def dashboard(request):
         ]
     elif role == User.ROLE_GERENTE:
         kpis = [
-            {'title': 'Productos', 'value': products.count()},
-            {'title': 'Proveedores', 'value': suppliers.count()},
-            {'title': 'Stock bajo', 'value': low_stock.count()},
-            {'title': 'Ventas de hoy', 'value': sales_today.count()},
-            {'title': 'Órdenes pendientes', 'value': pending_orders.count()},
+            {'title': 'Productos', 'value': stats['products']},
+            {'title': 'Proveedores', 'value': stats['suppliers']},
+            {'title': 'Stock bajo', 'value': stats['low_stock']},
+            {'title': 'Ventas de hoy', 'value': stats['sales_today']},
+            {'title': 'Órdenes pendientes', 'value': stats['pending_orders']},
         ]
         quick_actions = [
             {'label': 'Inventario', 'url': 'inventory_by_branch'},
@@ -92,12 +89,12 @@ def dashboard(request):
             quick_actions.insert(2, {'label': 'Reportes', 'url': 'report_stock'})
     else:
         kpis = [
-            {'title': 'Productos', 'value': products.count()},
-            {'title': 'Proveedores', 'value': suppliers.count()},
-            {'title': 'Sucursales', 'value': branches.count()},
-            {'title': 'Stock bajo', 'value': low_stock.count()},
-            {'title': 'Ventas de hoy', 'value': sales_today.count()},
-            {'title': 'Órdenes pendientes', 'value': pending_orders.count()},
+            {'title': 'Productos', 'value': stats['products']},
+            {'title': 'Proveedores', 'value': stats['suppliers']},
+            {'title': 'Sucursales', 'value': stats['branches']},
+            {'title': 'Stock bajo', 'value': stats['low_stock']},
+            {'title': 'Ventas de hoy', 'value': stats['sales_today']},
+            {'title': 'Órdenes pendientes', 'value': stats['pending_orders']},
         ]
         quick_actions = [
             {'label': 'Sucursales', 'url': 'branches_list'},
@@ -210,48 +207,59 @@ def checkout_view(request):
             return redirect('shop-cart')
         if not selected_branch:
             messages.error(request, 'Selecciona una sucursal válida.')
-        else:
+        elif request.POST.get('step') == 'reserve':
+            # Al elegir sucursal se reserva el carrito para que no se agote mientras se confirma.
             try:
-                with transaction.atomic():
-                    order = Order.objects.create(
-                        company=company,
-                        branch=selected_branch,
-                        customer_name=request.user.username or 'Cliente',
-                        customer_email=request.user.email or '',
-                        total=0,
-                    )
-                    sale = Sale.objects.create(
-                        company=company,
-                        branch=selected_branch,
-                        seller=request.user,
-                        payment_method='tienda',
-                        total=0,
+                reserve_stock(company, request.user, selected_branch, [(line['item'].product, line['item'].quantity) for line in cart_lines])
+            except InsufficientStock as exc:
+                messages.error(request, f'Stock insuficiente para {exc.line.product.name} (disponible: {exc.available}).')
+            return redirect(f"{reverse('shop-checkout')}?branch={selected_branch.pk}")
+        else:
+            @retry_on_conflict('shop.checkout')
+            def place_order():
+                order = Order.objects.create(
+                    company=company,
+                    branch=selected_branch,
+                    customer_name=request.user.username or 'Cliente',
+                    customer_email=request.user.email or '',
+                    total=0,
+                )
+                sale = Sale.objects.create(
+                    company=company,
+                    branch=selected_branch,
+                    seller=request.user,
+                    payment_method='tienda',
+                    total=0,
+                )
+                locked = list(items.select_for_update())
+                try:
+                    apply_stock_changes(
+                        company,
+                        [StockLine(selected_branch, ci.product, -ci.quantity) for ci in locked],
+                        InventoryMovement.MOV_SALE,
+                        request.user,
+                        reason='Checkout',
+                        reserved_by=request.user,
                     )
-                    running_total = Decimal('0')
-                    for ci in items.select_for_update():
-                        inventory = Inventory.objects.select_for_update().get(company=company, branch=selected_branch, product=ci.product)
-                        if inventory.stock < ci.quantity:
-                            raise ValidationError('Stock insuficiente para ' + ci.product.name)
-                        inventory.stock -= ci.quantity
-                        inventory.save()
-                        price = ci.product.price
-                        running_total += price * ci.quantity
-                        OrderItem.objects.create(order=order, product=ci.product, quantity=ci.quantity, unit_price=price)
-                        SaleItem.objects.create(sale=sale, product=ci.product, quantity=ci.quantity, unit_price=price)
-                        InventoryMovement.objects.create(
-                            company=company,
-                            branch=selected_branch,
-                            product=ci.product,
-                            movement_type=InventoryMovement.MOV_SALE,
-                            quantity_delta=-ci.quantity,
-                            reason='Checkout',
-                            created_by=request.user,
-                        )
-                    order.total = running_total
-                    order.save()
-                    sale.total = running_total
-                    sale.save()
-                    items.delete()
+                except InsufficientStock as exc:
+                    raise ValidationError('Stock insuficiente para ' + exc.line.product.name)
+                OrderItem.objects.bulk_create(
+                    [OrderItem(order=order, product=ci.product, quantity=ci.quantity, unit_price=ci.product.price) for ci in locked]
+                )
+                sale_items = SaleItem.objects.bulk_create(
+                    [SaleItem(sale=sale, product=ci.product, quantity=ci.quantity, unit_price=ci.product.price) for ci in locked]
+                )
+                running_total = sum((ci.product.price * ci.quantity for ci in locked), Decimal('0'))
+                order.total = running_total
+                order.save(update_fields=['total'])
+                sale.total = running_total
+                sale.save(update_fields=['total'])
+                record_sales([(sale, sale_items)])
+                items.delete()
+                return order
+
+            try:
+                order = place_order()
                 messages.success(request, f'Orden #{order.id} creada')
                 return redirect('shop_orders')
             except Exception as exc:
@@ -266,12 +274,21 @@ def checkout_view(request):
         }
         return render(request, 'shop/checkout.html', context)
 
+    # El GET solo muestra la reserva vigente; se crea o renueva con el POST `step=reserve`.
+    selected_branch_id = request.GET.get('branch')
+    reserved_until = None
+    if selected_branch_id and selected_branch_id.isdigit() and cart_lines:
+        reserved_until = StockReservation.objects.filter(
+            company=company, user=request.user, branch_id=selected_branch_id, expires_at__gt=timezone.now()
+        ).aggregate(until=Min('expires_at'))['until']
+
     context = {
         'cart_lines': cart_lines,
         'branches': branches,
         'total': total,
         'has_items': bool(cart_lines),
-        'selected_branch_id': None,
+        'selected_branch_id': selected_branch_id,
+        'reserved_until': reserved_until,
     }
     return render(request, 'shop/checkout.html', context)
 
@@ -283,8 +300,9 @@ def orders_list_view(request):
         messages.warning(request, 'Asocia el usuario a una compañía para ver tus órdenes.')
         orders = Order.objects.none()
     else:
-        orders = Order.objects.filter(company=company).select_related('branch').order_by('-created_at')
-    return render(request, 'shop/orders.html', {'orders': orders})
+        orders = Order.objects.filter(company=company).select_related('branch')
+    page = paginate_keyset(request, orders, ('-created_at', '-id'))
+    return render(request, 'shop/orders.html', {'orders': page.items, 'page': page})
 
 
 @login_required
@@ -363,12 +381,12 @@ def super_admin_dashboard(request):
     if denial:
         return denial
 
-    companies = Company.objects.all().prefetch_related('users', 'subscription__plan')
+    companies = keyset_page(company_overview(), overview_ordering('-revenue'), size=10)
     user_count = User.objects.filter(role=User.ROLE_ADMIN_CLIENTE).count()
     active_subscriptions = Subscription.objects.filter(status=Subscription.STATUS_ACTIVE).count()
     plan_count = Plan.objects.count()
     context = {
-        'companies': companies,
+        'companies': companies.items,
         'user_count': user_count,
         'active_subscriptions': active_subscriptions,
         'plan_count': plan_count,
@@ -489,10 +507,27 @@ def super_admin_companies(request):
     if denial:
         return denial
 
-    companies = Company.objects.all().prefetch_related('users', 'subscription__plan')
+    search = request.GET.get('q', '').strip()
+    sort = request.GET.get('sort', 'name')
+    companies = company_overview(search)
+    feature_code = request.GET.get('feature')
+    if feature_code:
+        companies = companies_with_feature(feature_code, companies)
+    page = paginate_keyset(request, companies, overview_ordering(sort))
     context = {
-        'companies': companies,
-        'total_companies': companies.count(),
+        'companies': page.items,
+        'page': page,
+        'features': PlanFeature.objects.order_by('label'),
+        'selected_feature': feature_code,
+        'search': search,
+        'sort': sort,
+        'sorts': [
+            ('name', 'Nombre (A-Z)'),
+            ('-revenue', 'Ingresos 30 días'),
+            ('-users', 'Más usuarios'),
+            ('-branches', 'Más sucursales'),
+            ('-created', 'Más recientes'),
+        ],
     }
     return render(request, 'super_admin/companies.html', context)
 
@@ -34,6 +34,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.middleware.EntitlementsMiddleware',
+    'apps.core.middleware.RetryViewMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -70,6 +72,72 @@ DATABASES = {
     }
 }
 
+# Con varios workers de gunicorn usar un backend compartido (archivo o Redis):
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache CACHE_LOCATION=/var/tmp/erp-cache
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'erp-default'),
+    }
+}
+
+ENTITLEMENTS_CACHE_ALIAS = 'default'
+ENTITLEMENTS_CACHE_TIMEOUT = int(os.environ.get('ENTITLEMENTS_CACHE_TIMEOUT', '300'))
+
+# ModelBackend se mantiene para que las sesiones iniciadas antes del backend con cache sigan siendo válidas.
+AUTHENTICATION_BACKENDS = [
+    'apps.accounts.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', '60'))
+
+# SESSION_CACHE_MODE=cached_db guarda la sesión en cache y base; =cache solo en cache.
+SESSION_CACHE_MODE = os.environ.get('SESSION_CACHE_MODE', '')
+if SESSION_CACHE_MODE in {'cached_db', 'cache'}:
+    SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_CACHE_MODE}'
+
+# STOCK_CONCURRENCY_MODE=conditional descuenta stock con UPDATE condicionado en vez de
+# bloquear las filas con select_for_update (modo `lock`, por defecto).
+STOCK_CONCURRENCY_MODE = os.environ.get('STOCK_CONCURRENCY_MODE', 'lock')
+# Franjas de stock por sucursal/producto para productos con `stock_ledger` (ver compact_stock_ledger).
+STOCK_LEDGER_STRIPES = int(os.environ.get('STOCK_LEDGER_STRIPES', '4'))
+# Segundos que dura una reserva de stock del carrito (ver sweep_reservations).
+STOCK_RESERVATION_TTL = int(os.environ.get('STOCK_RESERVATION_TTL', '900'))
+# INVENTORY_MOVEMENT_WRITE_BEHIND=1 guarda los movimientos en una outbox que vuelca flush_movements.
+INVENTORY_MOVEMENT_WRITE_BEHIND = os.environ.get('INVENTORY_MOVEMENT_WRITE_BEHIND', '0') == '1'
+INVENTORY_MOVEMENT_FLUSH_BATCH = int(os.environ.get('INVENTORY_MOVEMENT_FLUSH_BATCH', '500'))
+
+# Reintentos de transacciones de stock ante deadlocks o fallas de serialización (apps.core.transactions).
+TX_RETRY_ATTEMPTS = int(os.environ.get('TX_RETRY_ATTEMPTS', '5'))
+TX_RETRY_BASE_DELAY = float(os.environ.get('TX_RETRY_BASE_DELAY', '0.02'))
+TX_RETRY_MAX_DELAY = float(os.environ.get('TX_RETRY_MAX_DELAY', '0.5'))
+# Ventas por lote en la ingesta masiva del POS offline (POST /api/sales/bulk/).
+SALES_BULK_BATCH = int(os.environ.get('SALES_BULK_BATCH', '200'))
+# Tamaño máximo de una venta en el arreglo JSON; sobre ese tamaño se corta la lectura.
+SALES_BULK_MAX_RECORD = int(os.environ.get('SALES_BULK_MAX_RECORD', str(1024 * 1024)))
+# Filas por lectura del cursor en los exports en streaming (/api/reports/export/...).
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '2000'))
+# Filas por página de los listados de la API y HTML (`?page_size=` hasta el máximo).
+LIST_PAGE_SIZE = int(os.environ.get('LIST_PAGE_SIZE', '50'))
+LIST_MAX_PAGE_SIZE = int(os.environ.get('LIST_MAX_PAGE_SIZE', '500'))
+# KPIs del dashboard: segundos que el snapshot se sirve fresco y hasta cuándo se sirve vencido mientras se recalcula.
+DASHBOARD_KPI_FRESH = int(os.environ.get('DASHBOARD_KPI_FRESH', '30'))
+DASHBOARD_KPI_TIMEOUT = int(os.environ.get('DASHBOARD_KPI_TIMEOUT', '600'))
+# Cache de reportes en memoria de cada worker: {'stock': (segundos, entradas máximas), ...} reemplaza los valores por defecto.
+REPORT_CACHE_LIMITS = {}
+# Single-flight: segundos que un request espera el cálculo de otro, vida del lock y del resultado compartido.
+SINGLE_FLIGHT_WAIT = float(os.environ.get('SINGLE_FLIGHT_WAIT', '2'))
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_LOCK_TIMEOUT', '30'))
+SINGLE_FLIGHT_RESULT_TTL = int(os.environ.get('SINGLE_FLIGHT_RESULT_TTL', '30'))
+# Reportes en segundo plano (/api/reports/jobs/): hilos por proceso, carpeta de resultados,
+# segundos que se conserva cada archivo, sin señal de vida tras los que otro pedido lo retoma
+# y tras los que cleanup_report_jobs lo da por perdido.
+REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', '2'))
+REPORT_JOB_DIR = Path(os.environ.get('REPORT_JOB_DIR', BASE_DIR / 'var' / 'report_jobs'))
+REPORT_JOB_TTL = int(os.environ.get('REPORT_JOB_TTL', '86400'))
+REPORT_JOB_HEARTBEAT = int(os.environ.get('REPORT_JOB_HEARTBEAT', '60'))
+REPORT_JOB_STALE = int(os.environ.get('REPORT_JOB_STALE', '3600'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -93,13 +161,14 @@ AUTH_USER_MODEL = 'accounts.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.EntitlementJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_PAGINATION_CLASS': 'apps.core.pagination.KeysetPagination',
 }
 
 SIMPLE_JWT = {
@@ -107,6 +176,12 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# Tokens autocontenidos: rol, compañía y entitlements viajan como claims y la API
+# no consulta usuario ni suscripción en cada request.
+JWT_ENTITLEMENT_CLAIMS = os.environ.get('JWT_ENTITLEMENT_CLAIMS', '0') == '1'
+if JWT_ENTITLEMENT_CLAIMS:
+    SIMPLE_JWT['TOKEN_OBTAIN_SERIALIZER'] = 'apps.accounts.tokens.EntitlementTokenObtainPairSerializer'
+
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 LOGIN_URL = '/login/'